@@ -0,0 +1,119 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+from agent.metrics import REGISTRY
+from agent.models import Restaurant
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SearchCoalescer:
+    """
+    Merges concurrent single searches into batched vector store calls
+    Worker threads calling search_restaurants enqueue their request and wait; a dispatcher
+    thread collects the requests that arrive within window_ms of the first one (up to
+    max_batch) and sends them as one search_restaurants_batch call, which encodes them in one
+    batched encoder call and searches each (collection, filter) group with one multi-vector request.
+    """
+
+    def __init__(self, store, window_ms: float = 2.0, max_batch: int = 64):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.store = store
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._largest_batch = 0
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="search-coalescer", daemon=True)
+        self._dispatcher.start()
+
+    def search_restaurants(
+        self,
+        query: str,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        limit: int = 10,
+        exact_location: bool = False,
+        min_score: Optional[float] = None,
+    ) -> List[Restaurant]:
+        """Same contract as the vector store's search_restaurants, answered from a shared batch"""
+        if self._closed:
+            raise RuntimeError("Search coalescer is closed")
+        future: Future = Future()
+        self._pending.put(({
+            "query": query,
+            "food_type": food_type,
+            "location": location,
+            "limit": limit,
+            "exact_location": exact_location,
+            "min_score": min_score,
+        }, future))
+        return future.result()
+
+    def _collect(self, first) -> List:
+        """Gather requests arriving within the window after the first one"""
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Closing: answer what we have, then stop on the next loop
+                self._pending.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _dispatch_loop(self):
+        while True:
+            first = self._pending.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            requests = [request for request, _ in batch]
+            REGISTRY.observe("coalesced_batch_size", len(batch))
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+
+            try:
+                results = self.store.search_restaurants_batch(requests)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), restaurants in zip(batch, results):
+                future.set_result(restaurants)
+
+    def get_stats(self) -> Dict:
+        """Return batch counters: how many searches were merged into how many calls"""
+        with self._lock:
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "batches": self._batches,
+                "requests": self._requests,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+            }
+
+    def close(self):
+        """Answer the queued searches and stop the dispatcher thread"""
+        if not self._closed:
+            self._closed = True
+            self._pending.put(None)
+            self._dispatcher.join()
@@ -0,0 +1,127 @@
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import Dict, Sequence
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def text_key(text: str) -> str:
+    """Content address of an embedded text"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """
+    Content-addressed on-disk store of document embeddings
+    Vectors live in an append-only float32 matrix read through a memory map, and an index file
+    lists the text hash of each row. One pair of files is kept per model, since embeddings
+    from different models are not interchangeable. Several processes can share a store
+    (server workers, an ingest run): writes hold an exclusive lock on the files and first pick
+    up the rows other writers appended.
+    """
+
+    def __init__(self, path: str, dimension: int, model_name: str = "default"):
+        os.makedirs(path, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.dimension = dimension
+        self.matrix_path = os.path.join(path, f"{slug}-{dimension}.f32")
+        self.index_path = os.path.join(path, f"{slug}-{dimension}.idx")
+        self.lock_path = os.path.join(path, f"{slug}-{dimension}.lock")
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        # Bytes of the index file already read into _index
+        self._index_bytes = 0
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        with self._lock, self._file_lock():
+            self._sync()
+            self._truncate_matrix()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the store files, held across processes"""
+        with open(self.lock_path, "a") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def _sync(self):
+        """
+        Read index lines appended since the last sync, by this or another process
+        Must hold the file lock. A partial last line is left by an interrupted write and is dropped.
+        """
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as file:
+            file.seek(self._index_bytes)
+            tail = file.read()
+        complete = tail[:tail.rfind(b"\n") + 1]
+        if len(complete) != len(tail):
+            with open(self.index_path, "r+b") as file:
+                file.truncate(self._index_bytes + len(complete))
+        hashes = [line.strip() for line in complete.decode("ascii").splitlines() if line.strip()]
+        self._index_bytes += len(complete)
+        if not hashes:
+            return
+
+        # Map the new rows before publishing their keys, so readers never look up a row past the mapping
+        start_row = len(self._matrix)
+        self._matrix = np.memmap(
+            self.matrix_path, dtype=np.float32, mode="r", shape=(start_row + len(hashes), self.dimension)
+        )
+        for offset, key in enumerate(hashes):
+            self._index.setdefault(key, start_row + offset)
+
+    def _truncate_matrix(self):
+        """Drop matrix rows without an index entry, left by an interrupted write; must hold the file lock"""
+        # The matrix is written before the index, so it can only have extra rows
+        row_bytes = self.dimension * 4
+        if os.path.exists(self.matrix_path) and os.path.getsize(self.matrix_path) > len(self._matrix) * row_bytes:
+            with open(self.matrix_path, "r+b") as file:
+                file.truncate(len(self._matrix) * row_bytes)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return the stored embedding of each key that is present"""
+        with self._lock:
+            matrix, index = self._matrix, self._index
+        # Keys published after this mapping was taken point past its end; treat them as missing
+        rows = len(matrix)
+        found = {}
+        for key in keys:
+            row = index.get(key)
+            if row is not None and row < rows:
+                found[key] = np.array(matrix[row])
+        return found
+
+    def put_many(self, keys: Sequence[str], embeddings: Sequence) -> int:
+        """Append embeddings for keys not stored yet; returns the number of rows written"""
+        with self._lock, self._file_lock():
+            # Other processes may have appended rows since this store last looked
+            self._sync()
+            new_rows = {}
+            for key, embedding in zip(keys, embeddings):
+                if key not in self._index and key not in new_rows:
+                    new_rows[key] = embedding
+            if not new_rows:
+                return 0
+
+            self._truncate_matrix()
+            block = np.asarray(list(new_rows.values()), dtype=np.float32).reshape(len(new_rows), self.dimension)
+            with open(self.matrix_path, "ab") as file:
+                file.write(block.tobytes())
+                file.flush()
+                os.fsync(file.fileno())
+            with open(self.index_path, "a", encoding="ascii") as file:
+                file.writelines(f"{key}\n" for key in new_rows)
+            self._sync()
+            return len(new_rows)
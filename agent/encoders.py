@@ -0,0 +1,80 @@
+import logging
+from typing import Callable, Dict, NamedTuple
+from agent.onnx_encoder import OnnxEncoder
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EncoderSpec(NamedTuple):
+    """A registered embedding model: how to build it and the vectors it produces"""
+    name: str
+    model_name: str
+    dimension: int
+    factory: Callable[[], object]
+    description: str = ""
+
+# Encoder used when none is configured; its collections keep their original names
+DEFAULT_ENCODER = "default"
+
+ENCODERS: Dict[str, EncoderSpec] = {}
+
+def register_encoder(name: str, model_name: str, dimension: int, factory: Callable[[], object], description: str = ""):
+    """Make an encoder selectable by name (EMBEDDING_MODEL, --encoder in the benchmarks)"""
+    ENCODERS[name] = EncoderSpec(name, model_name, dimension, factory, description)
+
+def _default():
+    # The model of pymilvus' DefaultEmbeddingFunction, which runs it once per text, batched into
+    # one inference per chunk. Truncating at the tokenizer's 512 tokens like pymilvus keeps the
+    # vectors of existing collections and embedding stores valid
+    return OnnxEncoder.from_pretrained(max_length=512)
+
+def _minilm():
+    # Needs sentence-transformers (and torch), which aren't required by the default encoder.
+    # Import it first: the pymilvus wrapper would otherwise try to pip install it at runtime
+    import sentence_transformers  # noqa: F401
+    from pymilvus.model.dense import SentenceTransformerEmbeddingFunction
+    return SentenceTransformerEmbeddingFunction("all-MiniLM-L6-v2", device="cpu")
+
+def _onnx_int8():
+    from agent.onnx_encoder import QuantizedOnnxEncoder
+    return QuantizedOnnxEncoder.from_pretrained()
+
+register_encoder(
+    DEFAULT_ENCODER,
+    "GPTCache/paraphrase-albert-onnx",
+    768,
+    _default,
+    "ALBERT paraphrase model (the pymilvus default) through ONNX Runtime, with batched inference",
+)
+register_encoder(
+    "minilm",
+    "sentence-transformers/all-MiniLM-L6-v2",
+    384,
+    _minilm,
+    "MiniLM-L6 through sentence-transformers: half the dimensions, faster per query",
+)
+register_encoder(
+    "onnx_int8",
+    "GPTCache/paraphrase-albert-onnx",
+    768,
+    _onnx_int8,
+    "The default model quantized to int8",
+)
+
+def create_encoder(name: str = DEFAULT_ENCODER):
+    """Build a registered encoder"""
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown encoder '{name}'. Expected one of {tuple(ENCODERS)}")
+    spec = ENCODERS[name]
+    try:
+        encoder = spec.factory()
+    except ImportError as e:
+        raise RuntimeError(f"Encoder '{name}' needs an optional dependency: {e}") from e
+    logger.info(f"Loaded encoder {name} ({spec.model_name}, {spec.dimension} dimensions)")
+    return encoder
+
+def encoder_dimension(encoder, default: int) -> int:
+    """Vector size produced by an encoder, read from its `dim` attribute when it has one"""
+    dim = getattr(encoder, "dim", None)
+    return dim if isinstance(dim, int) else default
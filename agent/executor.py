@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WorkflowExecutor:
+    """Runs blocking workflow calls outside the event loop with bounded concurrency"""
+
+    MODES = ("inline", "threadpool")
+
+    def __init__(self, mode: str = "threadpool", max_concurrency: int = 4):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown execution mode '{mode}'. Expected one of {self.MODES}")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.mode = mode
+        self.max_concurrency = max_concurrency
+        self._pool = None
+        if mode == "threadpool":
+            self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent-worker")
+
+        # Counters guarded by a lock because they are updated from worker threads
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+
+    async def run(self, func: Callable, *args):
+        """Run func(*args) according to the execution mode and return its result"""
+        if self._pool is None:
+            # Inline mode keeps the previous behaviour: run on the event loop thread
+            return self._execute(func, *args)
+
+        with self._lock:
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._execute_queued, func, *args)
+
+    def _execute_queued(self, func: Callable, *args):
+        with self._lock:
+            self._queued -= 1
+        return self._execute(func, *args)
+
+    def _execute(self, func: Callable, *args):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            result = func(*args)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+        return result
+
+    def get_stats(self) -> Dict:
+        """Return a snapshot of the executor counters"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_concurrency": self.max_concurrency,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queue_depth,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running calls to finish"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
@@ -0,0 +1,104 @@
+import math
+from typing import Dict, Sequence
+
+# Index profiles that can be selected on MilvusClient
+INDEX_PROFILES = ("auto", "flat", "ivf_flat", "hnsw", "ivf_sq8", "ivf_pq")
+
+# Inverted-file indexes share the nlist/nprobe parameters. IVF_SQ8 stores one byte per
+# dimension (4x smaller than IVF_FLAT), IVF_PQ one byte per PQ segment
+IVF_INDEX_TYPES = ("IVF_FLAT", "IVF_SQ8", "IVF_PQ")
+
+# Index types each backend can build. Milvus Lite (local mode) rejects everything but FLAT,
+# IVF_FLAT and AUTOINDEX, so quantized and graph indexes need a Milvus server
+LITE_INDEX_TYPES = ("FLAT", "IVF_FLAT")
+SERVER_INDEX_TYPES = ("FLAT", "IVF_FLAT", "HNSW", "IVF_SQ8", "IVF_PQ")
+
+# Index types the auto profile may pick on Milvus Lite. Lite accepts IVF_FLAT but ignores its
+# parameters and still searches every vector, so switching to it would only take the collection
+# offline for a rebuild; Lite collections always search exactly
+LITE_AUTO_INDEX_TYPES = ("FLAT",)
+
+# Dimensions per PQ segment: 768-d vectors become 96 one-byte codes (32x smaller)
+PQ_DIMENSIONS_PER_SEGMENT = 8
+
+# Row counts where the auto profile switches index type:
+# brute force is exact and fast enough for small collections, HNSW gives the lowest latency
+# for mid-sized ones, and IVF keeps memory bounded for very large ones (and replaces HNSW
+# on backends that can't build it). With only FLAT supported, auto stays on FLAT
+FLAT_MAX_ROWS = 10_000
+HNSW_MAX_ROWS = 1_000_000
+
+# IVF collections are rebuilt when the ideal nlist drifts this far from the current one
+NLIST_REBUILD_FACTOR = 2
+
+def choose_index_type(row_count: int, profile: str = "auto", supported: Sequence[str] = SERVER_INDEX_TYPES) -> str:
+    """
+    Return the Milvus index type for a profile and collection size
+    The auto profile only picks types in `supported`; forcing an unsupported type raises ValueError.
+    """
+    if profile not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile '{profile}'. Expected one of {INDEX_PROFILES}")
+
+    if profile != "auto":
+        if profile.upper() not in supported:
+            raise ValueError(f"Index type {profile.upper()} isn't supported by this backend. Expected one of {tuple(supported)}")
+        return profile.upper()
+    if row_count >= FLAT_MAX_ROWS:
+        if row_count < HNSW_MAX_ROWS and "HNSW" in supported:
+            return "HNSW"
+        if "IVF_FLAT" in supported:
+            return "IVF_FLAT"
+    return "FLAT"
+
+def pq_segments(dimension: int) -> int:
+    """Number of PQ segments: the largest divisor of the dimension with at least 8 dimensions each"""
+    for m in range(max(dimension // PQ_DIMENSIONS_PER_SEGMENT, 1), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def build_index_params(index_type: str, row_count: int, dimension: int = 768) -> Dict:
+    """Derive index build parameters from the collection size"""
+    if index_type in IVF_INDEX_TYPES:
+        # Rule of thumb: about 4 * sqrt(n) lists, so each list holds a few hundred vectors at most
+        params = {"nlist": int(min(max(4 * math.sqrt(max(row_count, 1)), 16), 65536))}
+        if index_type == "IVF_PQ":
+            params.update({"m": pq_segments(dimension), "nbits": 8})
+        return params
+    if index_type == "HNSW":
+        return {"M": 16, "efConstruction": 200}
+    return {}
+
+def build_search_params(index_type: str, index_params: Dict, row_count: int, limit: int) -> Dict:
+    """Derive search parameters from the index build parameters and collection size"""
+    params = {}
+    if index_type in IVF_INDEX_TYPES:
+        nlist = int(index_params.get("nlist", 1024))
+        # Probe about 1/32 of the lists, never fewer than 8 (or all of them for tiny nlist)
+        params["nprobe"] = min(nlist, max(8, nlist // 32))
+    elif index_type == "HNSW":
+        # Wider beam for bigger graphs; ef must always be at least the number of results
+        ef = int(min(max(16 * math.log2(max(row_count, 2)), 64), 512))
+        params["ef"] = max(ef, limit)
+    return {"metric_type": "L2", "params": params}
+
+def needs_rebuild(
+    current_type: str,
+    current_params: Dict,
+    row_count: int,
+    profile: str = "auto",
+    supported: Sequence[str] = SERVER_INDEX_TYPES,
+) -> bool:
+    """
+    Check if an existing index no longer fits the collection size
+    IVF indexes whose nlist is unknown are always rebuilt, so their params are known afterwards
+    """
+    desired_type = choose_index_type(row_count, profile, supported)
+    if desired_type != current_type:
+        return True
+    if desired_type in IVF_INDEX_TYPES:
+        current_nlist = int(current_params.get("nlist", 0)) or 1
+        desired_nlist = build_index_params(desired_type, row_count)["nlist"]
+        ratio = max(desired_nlist, current_nlist) / min(desired_nlist, current_nlist)
+        return ratio >= NLIST_REBUILD_FACTOR
+    return False
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import re
+from typing import Dict, Iterator, TextIO
+from agent.models import Restaurant, RestaurantType
+
+# JSON files bundled with the app and the restaurant type each one holds
+DATA_SOURCES = [
+    ("hamburguesas.json", RestaurantType.HAMBURGUESAS),
+    ("pizzas.json", RestaurantType.PIZZAS),
+    ("completos.json", RestaurantType.COMPLETOS),
+]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+def _iter_json_array(file: TextIO, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    Yield the elements of a top-level JSON array without loading the whole file
+    Only one chunk plus the element being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+    started = eof = False
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer):
+            char = buffer[pos]
+            if not started:
+                if char != "[":
+                    raise ValueError("Expected a JSON array of restaurants")
+                started = True
+                pos += 1
+                continue
+            if char == ",":
+                pos += 1
+                continue
+            if char == "]":
+                return
+            try:
+                item, pos_end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                if eof:
+                    raise
+            else:
+                pos = pos_end
+                yield item
+                continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON array")
+
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+def iter_json_records(filename: str) -> Iterator[Dict]:
+    """Stream records from a JSON array file or a JSONL file (one object per line)"""
+    with open(filename, "r", encoding="utf-8") as file:
+        if filename.endswith((".jsonl", ".ndjson")):
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(file)
+
+def restaurant_from_record(item: Dict, restaurant_type: RestaurantType) -> Restaurant:
+    """Build a Restaurant from a raw catalog record"""
+    # TODO✅: Add restaurants to the list
+    # Extract street and municipality from full address
+    full_address = item.get("address")
+    street = full_address.split(",")[0] if full_address else ""
+    municipality = full_address.split(",")[1].strip() if full_address else ""
+    # Create Restaurant object
+    return Restaurant(
+        name=item.get("name"),
+        street=street,
+        municipality=municipality,
+        full_address=full_address,
+        score=item.get("score"),
+        type=restaurant_type,
+    )
+
+def iter_restaurants(filename: str, restaurant_type: RestaurantType) -> Iterator[Restaurant]:
+    """Stream restaurants of a given type from a JSON or JSONL file"""
+    for item in iter_json_records(filename):
+        yield restaurant_from_record(item, restaurant_type)
+
+def content_hash(restaurant: Restaurant) -> str:
+    """Hash of every stored restaurant field, used to detect new and changed rows"""
+    content = "\x1f".join([
+        restaurant.name,
+        restaurant.full_address,
+        repr(float(restaurant.score)),
+        restaurant.type.value,
+    ])
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def write_snapshot_from_catalogs(path: str, encoder=None, encoder_name: str = None, embedding_store_path: str = None) -> Dict:
+    """Embed the bundled catalogs and write them as a snapshot for read-only serving processes"""
+    from agent.encoders import DEFAULT_ENCODER
+    from agent.vector_store import InMemoryVectorStore
+
+    store = InMemoryVectorStore(
+        encoder=encoder,
+        encoder_name=encoder_name or DEFAULT_ENCODER,
+        embedding_store_path=embedding_store_path,
+    )
+    report = store.sync_restaurant_data()
+    return {"sync": report, "snapshot": store.export_snapshot(path)}
+
+def main():
+    """Sync the bundled catalogs into Milvus, embedding only new or changed restaurants"""
+    import argparse
+    from agent.encoders import DEFAULT_ENCODER, ENCODERS
+    from agent.milvus_client import MilvusClient
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--db-path", default="./milvus.db")
+    parser.add_argument("--unified-collection", action="store_true")
+    parser.add_argument("--hybrid-search", action="store_true")
+    parser.add_argument("--encoder", choices=list(ENCODERS), default=DEFAULT_ENCODER)
+    parser.add_argument("--snapshot", help="Write a snapshot directory for serve.py instead of syncing Milvus")
+    parser.add_argument("--embedding-store", help="Embedding store directory reused when writing a snapshot")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        print(json.dumps(write_snapshot_from_catalogs(args.snapshot, None, args.encoder, args.embedding_store), indent=2))
+        return
+
+    client = MilvusClient(
+        db_path=args.db_path,
+        unified_collection=args.unified_collection,
+        hybrid_search=args.hybrid_search,
+        encoder_name=args.encoder,
+    )
+    print(json.dumps(client.sync_restaurant_data(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Tuple
+
+# Quantiles reported for every summary
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, str]) -> LabelSet:
+    """Hashable, order-independent key of a label set"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class _Summary:
+    """Running count and sum, with quantiles over a sliding window of recent samples"""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.sum = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: float("nan") for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format
+    Summaries keep the last `window` samples per label set, so recording is O(1) and
+    quantiles are only computed when /metrics is scraped. Gauges are callbacks read at
+    scrape time. Metric names are prefixed with the namespace when rendered.
+    """
+
+    def __init__(self, namespace: str = "", window: int = 1024):
+        self.prefix = f"{namespace}_" if namespace else ""
+        self.window = window
+        self._lock = threading.Lock()
+        self._summaries: Dict[str, Dict[LabelSet, _Summary]] = {}
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, Callable[[], float]]] = {}
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a sample (in seconds for latencies) in a summary"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                summary = series[key] = _Summary(self.window)
+            summary.observe(value)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Increment a counter"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def register_gauge(self, name: str, func: Callable[[], float], **labels):
+        """Report func() as a gauge, replacing any callback registered with the same labels"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = func
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the enclosed block into a summary, counting failures in {name}_errors_total"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator form of timer"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def get_summary(self, name: str, **labels) -> Dict:
+        """Return count, sum and quantiles of a summary (empty values if nothing was recorded)"""
+        with self._lock:
+            summary = self._summaries.get(name, {}).get(_labels(labels))
+            if summary is None:
+                return {"count": 0, "sum": 0.0, **{f"p{int(q * 100)}": float("nan") for q in QUANTILES}}
+            quantiles = summary.quantiles()
+            return {"count": summary.count, "sum": summary.sum, **{f"p{int(q * 100)}": v for q, v in quantiles.items()}}
+
+    def get_counter(self, name: str, **labels) -> float:
+        """Return the current value of a counter"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0.0)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            summaries = {name: {key: (s.count, s.sum, s.quantiles()) for key, s in series.items()}
+                         for name, series in self._summaries.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+
+        for metric in sorted(summaries):
+            name = self.prefix + metric
+            lines.append(f"# TYPE {name} summary")
+            for key, (count, total, quantiles) in sorted(summaries[metric].items()):
+                for q, value in quantiles.items():
+                    lines.append(f"{name}{_format_labels(key + (('quantile', str(q)),))} {_format_value(value)}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        for metric in sorted(counters):
+            name = self.prefix + metric
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[metric].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for metric in sorted(gauges):
+            name = self.prefix + metric
+            lines.append(f"# TYPE {name} gauge")
+            for key, func in sorted(gauges[metric].items()):
+                try:
+                    value = float(func())
+                except Exception:
+                    # A failing callback must not break the whole scrape
+                    continue
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the agent, the Milvus client and the /metrics endpoint
+REGISTRY = MetricsRegistry(namespace="restaurant_agent")
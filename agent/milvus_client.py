@@ -1,30 +1,140 @@
-import json
+import heapq
+import itertools
 import logging
-from typing import Dict, List
+import queue
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
 from pymilvus import (
     MilvusClient as pyMilvusClient, 
-    model,
-    DataType
+    AnnSearchRequest,
+    DataType,
+    Function,
+    FunctionType,
+    RRFRanker,
 )
 from pymilvus.client.types import LoadState
+from agent.encoders import DEFAULT_ENCODER
+from agent.metrics import REGISTRY
+from agent.ingest import DATA_SOURCES, content_hash, iter_restaurants
+from agent.index_profiles import (
+    INDEX_PROFILES,
+    LITE_AUTO_INDEX_TYPES,
+    LITE_INDEX_TYPES,
+    SERVER_INDEX_TYPES,
+    build_index_params,
+    build_search_params,
+    choose_index_type,
+    needs_rebuild,
+)
 from agent.models import Restaurant, RestaurantType
+from agent.numpy_search import NumpySearchEngine
+from agent.vector_store import BaseVectorStore
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class MilvusClient:
-    def __init__(self):
+def _quote(value: str) -> str:
+    """Quote a string literal for a Milvus filter expression, escaping user text"""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+# Element types of the stored embedding field. float16 halves vector memory but needs a
+# Milvus server; Milvus Lite only stores FLOAT_VECTOR
+VECTOR_TYPES = ("float32", "float16")
+
+def _fold_accents(text: str) -> str:
+    """Strip diacritics so "Dominó Ñuñoa" and "domino nunoa" produce the same BM25 terms"""
+    # Milvus Lite's analyzer ignores the asciifolding filter, so fold before sending text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+class MilvusClient(BaseVectorStore):
+    """Vector store backed by a Milvus Lite database file"""
+
+    backend = "lite"
+    # Vector index types this backend can build
+    index_types = LITE_INDEX_TYPES
+    # Vector index types the auto profile picks from
+    auto_index_types = LITE_AUTO_INDEX_TYPES
+    # Milvus Lite doesn't implement partitions: partition RPCs fail and partition names on
+    # inserts and searches are ignored, so unified collections filter on the type field instead
+    supports_partitions = False
+
+    def __init__(
+        self,
+        db_path: str = "./milvus.db",
+        encoder=None,
+        encode_batch_size: int = 64,
+        insert_batch_size: int = 1000,
+        embedding_cache_size: int = 1024,
+        embedding_cache_ttl: Optional[float] = 3600,
+        unified_collection: bool = False,
+        unified_collection_name: str = "Restaurants",
+        index_profile: str = "auto",
+        embedding_store_path: Optional[str] = None,
+        hybrid_search: bool = False,
+        rrf_k: int = 60,
+        numpy_search_max_rows: int = 5000,
+        vector_type: str = "float32",
+        encoder_name: str = DEFAULT_ENCODER,
+    ):
+        super().__init__(
+            encoder=encoder,
+            encode_batch_size=encode_batch_size,
+            embedding_cache_size=embedding_cache_size,
+            embedding_cache_ttl=embedding_cache_ttl,
+            embedding_store_path=embedding_store_path,
+            encoder_name=encoder_name,
+        )
         self.client = None
-        self.encoder = model.DefaultEmbeddingFunction()
-        self.dimension = 768  # Dimension for the embedding vectors (matches DefaultEmbeddingFunction output)
+        self.db_path = db_path
+        # Number of rows sent to Milvus per insert call during ingest
+        self.insert_batch_size = insert_batch_size
+        # Store every restaurant type in one collection, with one partition per type,
+        # instead of one collection per type
+        self.unified_collection = unified_collection
+        self.unified_collection_name = unified_collection_name
+        # Vectors of different models can't share a collection, so non-default encoders get
+        # their own versioned collections, e.g. Pizzas_minilm_384
+        self.collection_suffix = "" if encoder_name == DEFAULT_ENCODER else f"_{encoder_name}_{self.dimension}"
+        # "auto" picks FLAT/HNSW/IVF_FLAT from the row count (always FLAT on Lite), other profiles force an index type
+        if index_profile not in INDEX_PROFILES:
+            raise ValueError(f"Unknown index profile '{index_profile}'. Expected one of {INDEX_PROFILES}")
+        if index_profile != "auto" and index_profile.upper() not in self.index_types:
+            raise ValueError(f"Milvus Lite doesn't build {index_profile.upper()} indexes; use the server backend")
+        self.index_profile = index_profile
+        # Element type of the embedding field of new collections
+        if vector_type not in VECTOR_TYPES:
+            raise ValueError(f"Unknown vector type '{vector_type}'. Expected one of {VECTOR_TYPES}")
+        if vector_type == "float16" and self.backend == "lite":
+            raise ValueError("Milvus Lite doesn't support float16 vectors; use the server backend")
+        self.vector_type = vector_type
+        # Element type each collection actually stores; existing collections keep the one they were created with
+        self._vector_types: Dict[str, str] = {}
+        # Current vector index of each collection: {"index_type", "params", "row_count"}
+        self._index_info: Dict[str, Dict] = {}
+        # Add a BM25 sparse field to new collections and fuse lexical and dense hits with RRF
+        self.hybrid_search = hybrid_search
+        self.rrf_k = rrf_k
+        # Whether each collection has the BM25 fields (collections created without them stay dense-only)
+        self._sparse_fields: Dict[str, bool] = {}
+        # Collections up to this many rows are searched in process with NumPy instead of a
+        # Milvus round trip (0 disables it; hybrid search always goes through Milvus)
+        self.numpy_search_max_rows = numpy_search_max_rows
+        # collection -> (engine or None if too large, data_version it was built for)
+        self._numpy_engines: Dict[str, Tuple[Optional[NumpySearchEngine], int]] = {}
+        self._numpy_lock = threading.Lock()
 
     def _initialize_client(self):
         if self.client is None:
             try:
                 # Connect to Milvus server using the service name
                 self.client = pyMilvusClient(
-                    "./milvus.db"
+                    self.db_path
                 )
                 logger.info("Successfully connected to Milvus server")
             except Exception as e:
@@ -40,6 +150,18 @@ class MilvusClient:
             # Check if collection exists using MilvusClient
             if self.client.has_collection(collection_name):
                 logger.info(f"Collection {collection_name} already exists. Skipping collection creation.")
+                self._ensure_municipality_index(collection_name)
+                if self._vector_type(collection_name) != self.vector_type:
+                    # Inserts and searches on this collection keep using its existing field type
+                    logger.warning(
+                        f"Collection {collection_name} stores {self._vector_type(collection_name)} vectors; "
+                        f"drop it and reload the data to store {self.vector_type} vectors"
+                    )
+                if self.hybrid_search and not self._has_sparse_field(collection_name):
+                    logger.warning(
+                        f"Collection {collection_name} was created without the BM25 field; "
+                        f"drop it and reload the data to enable hybrid search"
+                    )
                 return
             
             # Create schema
@@ -57,21 +179,53 @@ class MilvusClient:
             schema.add_field(field_name="full_address", datatype=DataType.VARCHAR, max_length=512)
             schema.add_field(field_name="score", datatype=DataType.FLOAT)
             schema.add_field(field_name="type", datatype=DataType.VARCHAR, max_length=64)
-            schema.add_field(field_name="embedding", datatype=DataType.FLOAT_VECTOR, dim=self.dimension)
+            vector_datatype = DataType.FLOAT16_VECTOR if self.vector_type == "float16" else DataType.FLOAT_VECTOR
+            self._vector_types[collection_name] = self.vector_type
+            schema.add_field(field_name="embedding", datatype=vector_datatype, dim=self.dimension)
+            # Hash of the stored fields, used by incremental syncs to detect new and changed rows
+            schema.add_field(field_name="content_hash", datatype=DataType.VARCHAR, max_length=64)
+            if self.hybrid_search:
+                # Milvus tokenizes search_text and fills sparse_embedding with BM25 weights on insert
+                schema.add_field(
+                    field_name="search_text",
+                    datatype=DataType.VARCHAR,
+                    max_length=1024,
+                    enable_analyzer=True,
+                    analyzer_params={"tokenizer": "standard", "filter": ["lowercase"]},
+                )
+                schema.add_field(field_name="sparse_embedding", datatype=DataType.SPARSE_FLOAT_VECTOR)
+                schema.add_function(Function(
+                    name="search_text_bm25",
+                    function_type=FunctionType.BM25,
+                    input_field_names=["search_text"],
+                    output_field_names=["sparse_embedding"],
+                ))
 
             # Prepare index parameters
             # Creating a collection with index parameters 
             # loads the collection upon its creation
             index_params = self.client.prepare_index_params()
 
+            # New collections are empty; the index is rebuilt as data grows
+            index_type = choose_index_type(0, self.index_profile, self._profile_index_types())
             index_params.add_index(
                 field_name="embedding",
-                index_type="IVF_FLAT",
+                index_type=index_type,
                 index_name="embedding",
-                nlist=1024,
-                metric_type="L2"
+                metric_type="L2",
+                params=build_index_params(index_type, 0, self.dimension),
             )
 
+            # Scalar index so exact municipality filters don't scan every row
+            index_params.add_index(
+                field_name="municipality",
+                index_type="INVERTED",
+                index_name="municipality",
+            )
+
+            if self.hybrid_search:
+                self._add_sparse_index(index_params)
+
             # Create collection using MilvusClient
             self.client.create_collection(
                 collection_name=collection_name,
@@ -85,6 +239,182 @@ class MilvusClient:
             logger.error(f"Error initializing collection: {e}")
             raise RuntimeError(f"Failed to initialize collection {collection_name}: {e}") from e
 
+    def _profile_index_types(self) -> Tuple[str, ...]:
+        """Index types the current profile can pick on this backend"""
+        return self.auto_index_types if self.index_profile == "auto" else self.index_types
+
+    def _get_index_info(self, collection_name) -> Dict:
+        """
+        Return the current vector index type and parameters of a collection
+        Params are the ones used to build the index: recorded by rebuild_index_if_needed, or read
+        back from Milvus. Versions that don't report them leave the params empty.
+        """
+        info = self._index_info.get(collection_name)
+        if info is None:
+            description = self.client.describe_index(collection_name, "embedding")
+            index_type = description["index_type"]
+            row_count = self.client.get_collection_stats(collection_name)["row_count"]
+            # describe_index flattens the build params next to the index metadata
+            expected = build_index_params(index_type, row_count, self.dimension)
+            params = {key: int(description[key]) for key in expected if key in description}
+            info = {"index_type": index_type, "params": params, "row_count": row_count}
+            self._index_info[collection_name] = info
+        return info
+
+    def rebuild_index_if_needed(self, collection_name) -> bool:
+        """
+        Rebuild the vector index in place if it doesn't fit the current row count anymore
+        Returns True if the index was rebuilt
+        """
+        if self.client is None:
+            self._initialize_client()
+
+        info = self._get_index_info(collection_name)
+        # Only the row count is refreshed: the params must stay the ones the index was built with
+        row_count = self.client.get_collection_stats(collection_name)["row_count"]
+        info["row_count"] = row_count
+        supported = self._profile_index_types()
+        if not needs_rebuild(info["index_type"], info["params"], row_count, self.index_profile, supported):
+            return False
+
+        index_type = choose_index_type(row_count, self.index_profile, supported)
+        params = build_index_params(index_type, row_count, self.dimension)
+        logger.info(
+            f"Rebuilding index of {collection_name} ({row_count} rows): "
+            f"{info['index_type']} {info['params']} -> {index_type} {params}"
+        )
+
+        rebuilt = True
+        try:
+            # Indexes can only be dropped from released collections, and a field holds one index,
+            # so the old index is dropped first and restored if the new one can't be built
+            self.client.release_collection(collection_name)
+            self.client.drop_index(collection_name, "embedding")
+            try:
+                self._create_vector_index(collection_name, index_type, params)
+            except Exception as e:
+                logger.error(
+                    f"Failed to build {index_type} index on {collection_name}, "
+                    f"restoring {info['index_type']}: {e}"
+                )
+                index_type, params, rebuilt = info["index_type"], info["params"], False
+                self._create_vector_index(collection_name, index_type, params)
+            # Milvus Lite drops every index of the collection, not only the named one
+            self._ensure_municipality_index(collection_name)
+            self._ensure_sparse_index(collection_name)
+        finally:
+            self.client.load_collection(collection_name)
+
+        self._index_info[collection_name] = {"index_type": index_type, "params": params, "row_count": row_count}
+        return rebuilt
+
+    def _create_vector_index(self, collection_name, index_type: str, params: Dict):
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(
+            field_name="embedding",
+            index_type=index_type,
+            index_name="embedding",
+            metric_type="L2",
+            params=params,
+        )
+        with REGISTRY.timer("milvus_operation_seconds", operation="create_index"):
+            self.client.create_index(collection_name, index_params)
+        # A failed build can leave the field without an index instead of raising
+        built = self.client.describe_index(collection_name, "embedding")
+        if not built or built.get("index_type") != index_type:
+            raise RuntimeError(f"Milvus didn't build the {index_type} index")
+
+    def _add_sparse_index(self, index_params):
+        index_params.add_index(
+            field_name="sparse_embedding",
+            index_type="SPARSE_INVERTED_INDEX",
+            index_name="sparse_embedding",
+            metric_type="BM25",
+        )
+
+    def _stored_vector_type(self, collection_name) -> str:
+        """Element type of a collection's embedding field"""
+        fields = self.client.describe_collection(collection_name)["fields"]
+        embedding = next(field for field in fields if field["name"] == "embedding")
+        return "float16" if embedding.get("type") == DataType.FLOAT16_VECTOR else "float32"
+
+    def _vector_type(self, collection_name) -> str:
+        """Element type stored by a collection, read from its schema once"""
+        if collection_name not in self._vector_types:
+            self._vector_types[collection_name] = self._stored_vector_type(collection_name)
+        return self._vector_types[collection_name]
+
+    def _to_vectors(self, embeddings: List, collection_name) -> List:
+        """Cast embeddings to the element type of a collection's embedding field"""
+        if self._vector_type(collection_name) == "float16":
+            return [np.asarray(embedding, dtype=np.float16) for embedding in embeddings]
+        return embeddings
+
+    def _has_sparse_field(self, collection_name) -> bool:
+        """Whether a collection was created with the BM25 sparse field"""
+        if collection_name not in self._sparse_fields:
+            fields = self.client.describe_collection(collection_name)["fields"]
+            self._sparse_fields[collection_name] = any(field["name"] == "sparse_embedding" for field in fields)
+        return self._sparse_fields[collection_name]
+
+    def _ensure_sparse_index(self, collection_name):
+        """Re-create the BM25 index, which Milvus Lite drops together with the vector index"""
+        if not self._has_sparse_field(collection_name):
+            return
+        if self.client.list_indexes(collection_name, field_name="sparse_embedding"):
+            return
+
+        index_params = self.client.prepare_index_params()
+        self._add_sparse_index(index_params)
+        self.client.create_index(collection_name, index_params)
+
+    def _ensure_municipality_index(self, collection_name):
+        """Add the municipality scalar index to collections created before it existed"""
+        if self.client.list_indexes(collection_name, field_name="municipality"):
+            return
+
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(field_name="municipality", index_type="INVERTED", index_name="municipality")
+        self.client.create_index(collection_name, index_params)
+        logger.info(f"Created municipality index on existing collection {collection_name}")
+
+    def _initialize_partition(self, collection_name, partition_name):
+        """Create a partition in a collection if it doesn't exist yet"""
+        if not self.supports_partitions:
+            return
+        if self.client is None:
+            self._initialize_client()
+
+        if not self.client.has_partition(collection_name, partition_name):
+            self.client.create_partition(collection_name, partition_name)
+            logger.info(f"Created partition {partition_name} in collection {collection_name}")
+
+    def _collection_for(self, food_type: Optional[str]) -> Tuple[str, Optional[List[str]]]:
+        """
+        Return the collection and partitions that hold restaurants of a food type
+        Partitions is None when the whole collection must be searched
+        """
+        if self.unified_collection:
+            return self.unified_collection_name + self.collection_suffix, [food_type] if food_type else None
+        return food_type + self.collection_suffix, None
+
+    def _partition_names(self, partitions: Optional[List[str]]) -> Optional[List[str]]:
+        """Partitions to pass to Milvus, None when the backend filters on the type field instead"""
+        return list(partitions) if partitions and self.supports_partitions else None
+
+    def _row_count(self, collection_name: str, partition_name: Optional[str] = None) -> int:
+        """Number of rows of a collection, or of one restaurant type of a unified collection"""
+        if partition_name is None:
+            return self.client.get_collection_stats(collection_name)["row_count"]
+        if self.supports_partitions:
+            return self.client.get_partition_stats(collection_name, partition_name)["row_count"]
+        rows = self.client.query(
+            collection_name,
+            filter=self._build_filter(None, False, None, [partition_name]),
+            output_fields=["count(*)"],
+        )
+        return rows[0]["count(*)"]
+
     def _load_collection_in_memory(self, collection_name):
         if self.client is None:
             self._initialize_client()
@@ -94,100 +424,133 @@ class MilvusClient:
         )
         
         if load_state["state"] != LoadState.Loaded:
-            self.client.load_collection(collection_name)
+            with REGISTRY.timer("milvus_operation_seconds", operation="load_collection"):
+                self.client.load_collection(collection_name)
             logger.info(f"Loaded collection {collection_name} in memory")
         else:
             logger.info(f"Collection {collection_name} is already loaded in memory") 
             
-    def load_restaurant_data(self):
-        """Load restaurant data from JSON files into their corresponding Milvus collections"""
+    def _read_restaurants(self, filename: str, restaurant_type: RestaurantType) -> List[Restaurant]:
+        """Read restaurants of a given type from a JSON or JSONL file"""
+        return list(iter_restaurants(filename, restaurant_type))
+
+    def _insert_restaurants(self, collection_name: str, restaurants: List[Restaurant], partition_name: Optional[str] = None) -> int:
+        """Embed restaurants and insert them into a collection in bounded batches"""
+        start_time = time.perf_counter()
+        inserted = 0
+        with_search_text = self._has_sparse_field(collection_name)
+
+        for start in range(0, len(restaurants), self.insert_batch_size):
+            batch = restaurants[start:start + self.insert_batch_size]
+
+            # Create embeddings from name and address
+            texts = [f"{restaurant.name} {restaurant.full_address}" for restaurant in batch]
+            embeddings = self._to_vectors(self._encode_documents(texts), collection_name)
+
+            # Prepare data for insertion into this specific collection
+            entities: List[Dict] = []
+            for text, restaurant, embedding in zip(texts, batch, embeddings):
+                # TODO✅: Add entity to entities list
+                entity = {
+                    "name": restaurant.name,
+                    "street": restaurant.street,
+                    "municipality": restaurant.municipality,
+                    "full_address": restaurant.full_address,
+                    "score": restaurant.score,
+                    "type": restaurant.type.value,
+                    "embedding": embedding,
+                    "content_hash": content_hash(restaurant),
+                }
+                if with_search_text:
+                    entity["search_text"] = _fold_accents(text)
+                entities.append(entity)
+
+            with REGISTRY.timer("milvus_operation_seconds", operation="insert"):
+                res = self.client.insert(
+                    collection_name=collection_name,
+                    data=entities,
+                    partition_name=partition_name if self.supports_partitions else None,
+                )
+            inserted += res["insert_count"]
+
+        if inserted > 0:
+            self.data_version += 1
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"Inserted {inserted} rows into collection {collection_name} "
+            f"in {elapsed:.2f}s ({inserted / max(elapsed, 1e-9):.1f} rows/sec)"
+        )
+        return inserted
+
+    def load_restaurant_data(self, sources: Optional[List[Tuple[str, RestaurantType]]] = None):
+        """
+        Load restaurant data from JSON files into their corresponding Milvus collections
+        Collections that already have entities are skipped; use sync_restaurant_data to apply changes
+        """
         try:    
             # Initialize client if not already done
             if self.client is None:
                 self._initialize_client()
             
             # Mapping of JSON files to their corresponding collections
-            files_and_collections = [
-                ("hamburguesas.json", RestaurantType.HAMBURGUESAS),
-                ("pizzas.json", RestaurantType.PIZZAS),
-                ("completos.json", RestaurantType.COMPLETOS)
-            ]
+            files_and_collections = sources or DATA_SOURCES
             
             total_loaded = 0
+            start_time = time.perf_counter()
+            loaded_collections = []
             
             for filename, restaurant_type in files_and_collections:
+                collection_name, partitions = self._collection_for(restaurant_type.value)
+                if collection_name not in loaded_collections:
+                    loaded_collections.append(collection_name)
+                partition_name = partitions[0] if partitions else None
+                target = f"{collection_name}/{partition_name}" if partition_name else collection_name
                 try:
                     # Initialize the collection
-                    self._initialize_collection(restaurant_type.value)
-                    self._load_collection_in_memory(restaurant_type.value)
+                    self._initialize_collection(collection_name)
+                    if partition_name:
+                        self._initialize_partition(collection_name, partition_name)
+                    self._load_collection_in_memory(collection_name)
 
-                    # Skip loading if collection has entities already
-                    if self.client.get_collection_stats(restaurant_type.value)["row_count"] > 0:
-                        logger.info(f"Collection {restaurant_type.value} already has entities. Skipping loading from {filename}.")
+                    # Skip loading if collection (or partition) has entities already
+                    if self._row_count(collection_name, partition_name) > 0:
+                        logger.info(f"Collection {target} already has entities. Skipping loading from {filename}.")
                         continue
                     
                     # Load restaurant data from JSON file
-                    restaurants: List[Restaurant] = []
-                    with open(filename, 'r', encoding='utf-8') as file:
-                        data = json.load(file)
-                        for item in data:
-                            # TODO✅: Add restaurants to the list
-                            # Extract street and municipality from full address
-                            full_address = item.get("address")
-                            street = full_address.split(",")[0] if full_address else ""
-                            municipality = full_address.split(",")[1].strip() if full_address else ""
-                            # Create Restaurant object
-                            restaurant = Restaurant(
-                                name=item.get("name"),
-                                street=street,
-                                municipality=municipality,
-                                full_address=full_address,
-                                score=item.get("score"),
-                                type=restaurant_type,
-                            )
-                            restaurants.append(restaurant)
+                    restaurants = self._read_restaurants(filename, restaurant_type)
                     
                     if not restaurants:
                         logger.warning(f"No restaurant data found in {filename}")
                         continue
                         
-                    # Prepare data for insertion into this specific collection
-                    entities: List[Dict] = []
-                    for restaurant in restaurants:
-                        # Create embedding from name and address
-                        text = f"{restaurant.name} {restaurant.full_address}"
-                        embedding = self.encoder.encode_queries([text])[0]
-                        
-                        # TODO✅: Add entity to entities list
-                        entity = {
-                            "name": restaurant.name,
-                            "street": restaurant.street,
-                            "municipality": restaurant.municipality,
-                            "full_address": restaurant.full_address,
-                            "score": restaurant.score,
-                            "type": restaurant.type.value,
-                            "embedding": embedding
-                        }
-                        entities.append(entity)
+                    # Encode and insert data into this specific collection in batches
+                    self._insert_restaurants(collection_name, restaurants, partition_name)
                     
-                    # Insert data into the specific collection
-                    res = self.client.insert(
-                        collection_name=restaurant_type.value,
-                        data=entities
-                    )
-                    
-                    logger.info(f"Loaded {len(restaurants)} restaurants from {filename} into collection {restaurant_type.value}")
+                    logger.info(f"Loaded {len(restaurants)} restaurants from {filename} into collection {target}")
                     total_loaded += len(restaurants)
                     
                 except FileNotFoundError:
                     logger.warning(f"Could not find {filename}")
                 except Exception as e:
-                    logger.error(f"Error loading {filename} into collection {restaurant_type.value}: {e}")
+                    logger.error(f"Error loading {filename} into collection {target}: {e}")
                     # Raise exception for critical database errors
                     raise RuntimeError(f"Failed to load restaurant data from {filename}: {e}") from e
+
+            # Make sure each index still fits its collection size
+            for collection_name in loaded_collections:
+                if self.client.has_collection(collection_name):
+                    self.rebuild_index_if_needed(collection_name)
+                    # Build in-memory engines now so the first query doesn't pay for it
+                    self._numpy_engine_for(collection_name)
                     
             if total_loaded > 0:
-                logger.info(f"Successfully loaded {total_loaded} restaurants in total across all collections")
+                elapsed = time.perf_counter() - start_time
+                logger.info(
+                    f"Successfully loaded {total_loaded} restaurants in total across all collections "
+                    f"in {elapsed:.2f}s ({total_loaded / max(elapsed, 1e-9):.1f} rows/sec)"
+                )
             else:
                 logger.warning("No restaurant data was loaded")
             
@@ -195,63 +558,486 @@ class MilvusClient:
             logger.error(f"Error loading restaurant data: {e}")
             raise
             
-    def search_restaurants(self, query: str, food_type: str = None, location: str = None, limit: int = 10) -> List[Restaurant]:
-        """Search restaurants using vector similarity and filters"""
-        try:
-            if food_type is None:
-                return []
-            
-            logger.info(f"Searching for {query}")
-            # Create query embedding
-            query_embedding = self.encoder.encode_queries([query])
-            
-            # Build filter expression
-            filter_expr = ""
-            if location:
-                location_filter = f'municipality like "%{location}%"'
-                if filter_expr:
-                    filter_expr += f" and {location_filter}"
-                else:
-                    filter_expr = location_filter
+    def _existing_hashes(self, collection_name: str, partition_name: Optional[str]) -> Dict[str, List[int]]:
+        """Return the ids stored for each content hash in a collection (or partition)"""
+        fields = {field["name"] for field in self.client.describe_collection(collection_name)["fields"]}
+        if "content_hash" not in fields:
+            raise RuntimeError(
+                f"Collection {collection_name} was created without content hashes. "
+                "Drop it and reload the data before running incremental syncs."
+            )
 
-            logger.info(f"Filter expression: {filter_expr}")
-                    
-            # Search parameters
-            search_params = {"index_type": "IVF_FLAT", "metric_type": "L2", "params": {"nprobe": 10}}
-            
-            # Load collection
-            self._load_collection_in_memory(food_type)
+        existing: Dict[str, List[int]] = {}
+        iterator = self.client.query_iterator(
+            collection_name,
+            batch_size=self.insert_batch_size,
+            filter=self._build_filter(None, False, None, [partition_name] if partition_name else None),
+            output_fields=["content_hash"],
+            partition_names=self._partition_names([partition_name] if partition_name else None),
+        )
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            for row in batch:
+                existing.setdefault(row["content_hash"], []).append(row["id"])
+        return existing
+
+    def sync_restaurant_data(self, sources: Optional[List[Tuple[str, RestaurantType]]] = None) -> Dict[str, Dict]:
+        """
+        Incrementally sync restaurant files (JSON or JSONL) into Milvus
+        Records are streamed, so only one insert batch is held in memory. Only new or changed
+        restaurants are embedded and inserted, and rows missing from the file are deleted.
+        Returns inserted/deleted/unchanged counts per collection.
+        """
+        if self.client is None:
+            self._initialize_client()
+
+        report: Dict[str, Dict] = {}
+        synced_collections = []
+        for filename, restaurant_type in sources or DATA_SOURCES:
+            collection_name, partitions = self._collection_for(restaurant_type.value)
+            partition_name = partitions[0] if partitions else None
+            target = f"{collection_name}/{partition_name}" if partition_name else collection_name
+            if collection_name not in synced_collections:
+                synced_collections.append(collection_name)
+
+            try:
+                start_time = time.perf_counter()
+                self._initialize_collection(collection_name)
+                if partition_name:
+                    self._initialize_partition(collection_name, partition_name)
+                self._load_collection_in_memory(collection_name)
+
+                existing = self._existing_hashes(collection_name, partition_name)
+                seen = set()
+                pending: List[Restaurant] = []
+                inserted = unchanged = 0
+
+                for restaurant in iter_restaurants(filename, restaurant_type):
+                    restaurant_hash = content_hash(restaurant)
+                    if restaurant_hash in seen:
+                        continue
+                    seen.add(restaurant_hash)
+                    if restaurant_hash in existing:
+                        unchanged += 1
+                        continue
+
+                    pending.append(restaurant)
+                    if len(pending) >= self.insert_batch_size:
+                        inserted += self._insert_restaurants(collection_name, pending, partition_name)
+                        pending = []
+
+                if pending:
+                    inserted += self._insert_restaurants(collection_name, pending, partition_name)
+
+                # Rows whose content is no longer in the file were removed or changed
+                stale_ids = [
+                    row_id
+                    for restaurant_hash, ids in existing.items() if restaurant_hash not in seen
+                    for row_id in ids
+                ]
+                for start in range(0, len(stale_ids), self.insert_batch_size):
+                    with REGISTRY.timer("milvus_operation_seconds", operation="delete"):
+                        self.client.delete(collection_name, ids=stale_ids[start:start + self.insert_batch_size])
+                if stale_ids:
+                    self.data_version += 1
+
+                elapsed = time.perf_counter() - start_time
+                report[target] = {
+                    "inserted": inserted,
+                    "deleted": len(stale_ids),
+                    "unchanged": unchanged,
+                    "seconds": round(elapsed, 3),
+                }
+                logger.info(
+                    f"Synced {filename} into {target}: {inserted} inserted, "
+                    f"{len(stale_ids)} deleted, {unchanged} unchanged in {elapsed:.2f}s"
+                )
+
+            except FileNotFoundError:
+                logger.warning(f"Could not find {filename}")
+            except Exception as e:
+                logger.error(f"Error syncing {filename} into collection {target}: {e}")
+                raise RuntimeError(f"Failed to sync restaurant data from {filename}: {e}") from e
+
+        for collection_name in synced_collections:
+            if self.client.has_collection(collection_name):
+                self.rebuild_index_if_needed(collection_name)
+
+        return report
             
-            # Perform search
-            results = self.client.search(
-                collection_name=food_type,
-                data=query_embedding,
-                filter=filter_expr if filter_expr else None,
-                limit=limit,
-                output_fields=["name", "street", "municipality", "full_address", "score"],            
-                search_params=search_params,
-                anns_field="embedding",
+    def _numpy_engine_for(self, collection_name: str) -> Optional[NumpySearchEngine]:
+        """
+        Return the in-memory engine of a small collection, or None if it must be searched in Milvus
+        Engines are rebuilt from the collection when the data version changes.
+        """
+        if not self.numpy_search_max_rows or self.hybrid_search:
+            return None
+
+        with self._numpy_lock:
+            engine, version = self._numpy_engines.get(collection_name, (None, None))
+            if version == self.data_version:
+                return engine
+
+            version = self.data_version
+            engine = None
+            if self._get_index_info(collection_name)["row_count"] <= self.numpy_search_max_rows:
+                start_time = time.perf_counter()
+                restaurants, embeddings = self._read_collection(collection_name)
+                engine = NumpySearchEngine(restaurants, embeddings) if restaurants else None
+                logger.info(
+                    f"Loaded {len(restaurants)} rows of {collection_name} for in-memory search "
+                    f"in {time.perf_counter() - start_time:.2f}s"
+                )
+            self._numpy_engines[collection_name] = (engine, version)
+            return engine
+
+    def _read_collection(self, collection_name: str) -> Tuple[List[Restaurant], List]:
+        """Read every restaurant of a collection together with its embedding"""
+        self._load_collection_in_memory(collection_name)
+        restaurants: List[Restaurant] = []
+        embeddings = []
+        iterator = self.client.query_iterator(
+            collection_name,
+            batch_size=self.insert_batch_size,
+            output_fields=["name", "street", "municipality", "full_address", "score", "type", "embedding"],
+        )
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            for row in batch:
+                restaurants.append(Restaurant(
+                    name=row["name"],
+                    street=row["street"],
+                    municipality=row["municipality"],
+                    full_address=row["full_address"],
+                    score=row["score"],
+                    type=RestaurantType(row["type"]),
+                ))
+                embedding = row["embedding"]
+                # float16 vectors come back as raw bytes
+                if isinstance(embedding, list) and embedding and isinstance(embedding[0], bytes):
+                    embedding = embedding[0]
+                if isinstance(embedding, bytes):
+                    embedding = np.frombuffer(embedding, dtype=np.float16).astype(np.float32)
+                embeddings.append(embedding)
+        return restaurants, embeddings
+
+    def _build_location_filter(self, location: Union[str, List[str]], exact_location: bool) -> str:
+        """
+        Build the municipality filter expression
+        Exact matches use the municipality index; unknown locations fall back to a substring match
+        """
+        locations = [location] if isinstance(location, str) else list(location)
+        if not exact_location:
+            return " or ".join(f"municipality like {_quote(f'%{loc}%')}" for loc in locations)
+        if len(locations) == 1:
+            return f"municipality == {_quote(locations[0])}"
+        return f"municipality in [{', '.join(_quote(loc) for loc in locations)}]"
+
+    def _build_filter(
+        self,
+        location: Union[str, List[str], None],
+        exact_location: bool,
+        min_score: Optional[float],
+        partitions: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Build the scalar filter expression of a search: municipality and minimum score
+        On backends without partitions, the restaurant types of the partitions are filtered too
+        """
+        clauses = []
+        if partitions and not self.supports_partitions:
+            types = list(partitions)
+            clauses.append(
+                f"type == {_quote(types[0])}" if len(types) == 1
+                else f"type in [{', '.join(_quote(t) for t in types)}]"
             )
-            
-            restaurants: List[Restaurant] = []
-            # Determine restaurant type from collection name
-            restaurant_type = RestaurantType(food_type)
-            
-            for hit in results[0]:
-                # TODO✅: Add restaurants to the list
-                restaurant = Restaurant(
-                    name=hit.get("name"),
-                    street=hit.get("street"),
-                    municipality=hit.get("municipality"),
-                    full_address=hit.get("full_address"),
-                    score=hit.get("score"),
-                    type=restaurant_type,
+        if location:
+            clauses.append(self._build_location_filter(location, exact_location))
+        if min_score is not None:
+            clauses.append(f"score >= {float(min_score)}")
+        if len(clauses) > 1:
+            return " and ".join(f"({clause})" for clause in clauses)
+        return clauses[0] if clauses else ""
+
+    def search_restaurants_batch(self, requests: List[Dict]) -> List[List[Restaurant]]:
+        """
+        Run many searches with one batched encoder call and one multi-vector search per target
+        Each request holds the search_restaurants arguments; results are returned in request order.
+        Requests sharing a collection, partitions, filter and limit are sent to Milvus together.
+        Collections small enough for the in-memory engine are searched with NumPy instead.
+        """
+        try:
+            results: List[List[Restaurant]] = [[] for _ in requests]
+            # (collection, partitions, filter, limit) -> indices of the requests searched together
+            groups: Dict[tuple, List[int]] = {}
+            for i, request in enumerate(requests):
+                food_type = request.get("food_type")
+                # Without a food type only the unified collection can be searched (across all partitions)
+                if food_type is None and not self.unified_collection:
+                    continue
+                collection_name, partitions = self._collection_for(food_type)
+
+                # Build filter expression
+                filter_expr = self._build_filter(
+                    request.get("location"), request.get("exact_location", False), request.get("min_score"), partitions
                 )
-                restaurants.append(restaurant)
-                
-            return restaurants
-            
+
+                key = (collection_name, tuple(partitions) if partitions else None, filter_expr, request.get("limit", 10))
+                groups.setdefault(key, []).append(i)
+
+            if not groups:
+                return results
+
+            # Create query embeddings
+            searched = [i for indices in groups.values() for i in indices]
+            logger.info(f"Searching for {[requests[i]['query'] for i in searched]}")
+            embeddings = dict(zip(searched, self._encode_queries([requests[i]["query"] for i in searched])))
+
+            for (collection_name, partitions, filter_expr, limit), indices in groups.items():
+                logger.info(f"Filter expression: {filter_expr}")
+
+                engine = self._numpy_engine_for(collection_name)
+                if engine is not None:
+                    # Requests in a group share the filter, so the first one describes it
+                    first = requests[indices[0]]
+                    with REGISTRY.timer("numpy_search_seconds"):
+                        hits_per_query = engine.search(
+                            [embeddings[i] for i in indices],
+                            limit=limit,
+                            location=first.get("location"),
+                            exact_location=first.get("exact_location", False),
+                            types=list(partitions) if partitions else None,
+                            min_score=first.get("min_score"),
+                        )
+                    for i, hits in zip(indices, hits_per_query):
+                        results[i] = hits
+                    continue
+
+                # Load collection
+                self._load_collection_in_memory(collection_name)
+
+                # Search parameters derived from the collection's current index
+                index_info = self._get_index_info(collection_name)
+                search_params = build_search_params(
+                    index_info["index_type"], index_info["params"], index_info["row_count"], limit
+                )
+
+                # Perform search
+                output_fields = ["name", "street", "municipality", "full_address", "score", "type"]
+                if self.hybrid_search and self._has_sparse_field(collection_name):
+                    # Dense and BM25 candidates fused by reciprocal rank in one round trip
+                    requests_per_field = [
+                        AnnSearchRequest(
+                            data=self._to_vectors([embeddings[i] for i in indices], collection_name),
+                            anns_field="embedding",
+                            param=search_params,
+                            limit=limit,
+                            expr=filter_expr if filter_expr else None,
+                        ),
+                        AnnSearchRequest(
+                            data=[_fold_accents(requests[i]["query"]) for i in indices],
+                            anns_field="sparse_embedding",
+                            param={"metric_type": "BM25"},
+                            limit=limit,
+                            expr=filter_expr if filter_expr else None,
+                        ),
+                    ]
+                    with REGISTRY.timer("milvus_operation_seconds", operation="hybrid_search"):
+                        hits_per_query = self.client.hybrid_search(
+                            collection_name=collection_name,
+                            reqs=requests_per_field,
+                            ranker=RRFRanker(self.rrf_k),
+                            limit=limit,
+                            output_fields=output_fields,
+                            partition_names=self._partition_names(partitions),
+                        )
+                else:
+                    with REGISTRY.timer("milvus_operation_seconds", operation="search"):
+                        hits_per_query = self.client.search(
+                            collection_name=collection_name,
+                            data=self._to_vectors([embeddings[i] for i in indices], collection_name),
+                            filter=filter_expr if filter_expr else None,
+                            limit=limit,
+                            output_fields=output_fields,
+                            search_params=search_params,
+                            anns_field="embedding",
+                            partition_names=self._partition_names(partitions),
+                        )
+
+                for i, hits in zip(indices, hits_per_query):
+                    # TODO✅: Add restaurants to the list
+                    results[i] = [
+                        Restaurant(
+                            name=hit.get("name"),
+                            street=hit.get("street"),
+                            municipality=hit.get("municipality"),
+                            full_address=hit.get("full_address"),
+                            score=hit.get("score"),
+                            # Restaurant type is stored on each row, so this works for both collection layouts
+                            type=RestaurantType(hit.get("type")),
+                        )
+                        for hit in hits
+                    ]
+
+            return results
+
         except Exception as e:
             logger.error(f"Error searching restaurants: {e}")
             raise RuntimeError(f"Vector database search failed: {e}") from e
-            
\ No newline at end of file
+
+    def rank_restaurants(
+        self,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        exact_location: bool = False,
+        count: int = 3,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Restaurant], List[Restaurant]]:
+        """
+        Return the `count` best and worst scored restaurants of a food type and location
+        Milvus queries can't be ordered, so only (id, score) of the matching rows is read, the
+        extremes are picked with a heap and their full rows are fetched by primary key.
+        """
+        if food_type is None and not self.unified_collection:
+            return [], []
+        collection_name, partitions = self._collection_for(food_type)
+
+        try:
+            engine = self._numpy_engine_for(collection_name)
+            if engine is not None:
+                return engine.extremes(count, location, exact_location, partitions, min_score)
+
+            self._load_collection_in_memory(collection_name)
+            with REGISTRY.timer("milvus_operation_seconds", operation="rank"):
+                scores = []
+                iterator = self.client.query_iterator(
+                    collection_name,
+                    batch_size=self.insert_batch_size,
+                    filter=self._build_filter(location, exact_location, min_score, partitions),
+                    output_fields=["score"],
+                    partition_names=self._partition_names(partitions),
+                )
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        iterator.close()
+                        break
+                    scores.extend((row["score"], row["id"]) for row in batch)
+
+                # Ties are broken by primary key, i.e. insertion order
+                best = heapq.nsmallest(count, scores, key=lambda row: (-row[0], row[1]))
+                worst = heapq.nsmallest(count, scores, key=lambda row: (row[0], -row[1]))[::-1]
+                ids = list({row_id for _, row_id in best + worst})
+                rows = self.client.get(
+                    collection_name,
+                    ids=ids,
+                    output_fields=["name", "street", "municipality", "full_address", "score", "type"],
+                ) if ids else []
+
+            by_id = {row["id"]: Restaurant(
+                name=row["name"],
+                street=row["street"],
+                municipality=row["municipality"],
+                full_address=row["full_address"],
+                score=row["score"],
+                type=RestaurantType(row["type"]),
+            ) for row in rows}
+            return [by_id[row_id] for _, row_id in best], [by_id[row_id] for _, row_id in worst]
+
+        except Exception as e:
+            logger.error(f"Error ranking restaurants: {e}")
+            raise RuntimeError(f"Vector database ranking failed: {e}") from e
+
+    def get_stats(self) -> Dict:
+        """Return backend statistics: index of each collection and rows held by the NumPy engines"""
+        with self._numpy_lock:
+            numpy_rows = {name: len(engine) for name, (engine, _) in self._numpy_engines.items() if engine is not None}
+        return {
+            **super().get_stats(),
+            "collections": {name: dict(info) for name, info in self._index_info.items()},
+            "numpy_engines": numpy_rows,
+        }
+
+class _ConnectionPool:
+    """
+    Fixed set of Milvus connections shared by the worker threads
+    Exposes the pymilvus client API: every method call checks a connection out for its
+    duration, so concurrent searches don't queue on a single gRPC channel.
+    """
+
+    def __init__(self, factory, size: int):
+        if size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.size = size
+        self._idle: "queue.Queue" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(factory())
+        self.waits = 0
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            self.waits += 1
+            return self._idle.get()
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            client = self._checkout()
+            try:
+                return getattr(client, name)(*args, **kwargs)
+            finally:
+                self._idle.put(client)
+        return call
+
+    def get_stats(self) -> Dict:
+        return {"size": self.size, "available": self._idle.qsize(), "waits": self.waits}
+
+class MilvusServerClient(MilvusClient):
+    """Vector store backed by a standalone or distributed Milvus server, through a connection pool"""
+
+    backend = "server"
+    index_types = SERVER_INDEX_TYPES
+    auto_index_types = SERVER_INDEX_TYPES
+    supports_partitions = True
+
+    def __init__(
+        self,
+        uri: str = "http://localhost:19530",
+        token: str = "",
+        db_name: str = "",
+        pool_size: int = 4,
+        **options,
+    ):
+        super().__init__(db_path=uri, **options)
+        self.uri = uri
+        self.token = token
+        self.db_name = db_name
+        self.pool_size = pool_size
+
+    def _initialize_client(self):
+        if self.client is None:
+            try:
+                # pymilvus reuses one connection per (uri, db, token) alias, so each pooled client
+                # gets an alias of its own to open its own gRPC channel
+                aliases = (f"{self.uri}-pool-{id(self)}-{i}" for i in itertools.count())
+                self.client = _ConnectionPool(
+                    lambda: pyMilvusClient(self.uri, token=self.token, db_name=self.db_name, alias=next(aliases)),
+                    self.pool_size,
+                )
+                logger.info(f"Connected to Milvus server at {self.uri} with {self.pool_size} connections")
+            except Exception as e:
+                logger.error(f"Failed to connect to Milvus server: {str(e)}")
+                raise
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        if self.client is not None:
+            stats["connection_pool"] = self.client.get_stats()
+        return stats
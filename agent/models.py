@@ -19,6 +19,9 @@ class QueryMessage(BaseModel):
     type: str
     message: str
 
+class BatchQueryRequest(BaseModel):
+    messages: List[str]
+
 class RestaurantResponse(BaseModel):
     type: str = "response"
     restaurants: List[Restaurant]
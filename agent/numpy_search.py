@@ -0,0 +1,112 @@
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from agent.models import Restaurant
+
+class NumpySearchEngine:
+    """
+    Exact L2 search over a small collection held in process memory
+    Embeddings live in one contiguous float32 matrix with precomputed squared norms, so a
+    batch of queries is a single matrix product. Municipality and type filters are boolean
+    masks over integer codes, and top-k selection uses argpartition instead of a full sort.
+    """
+
+    def __init__(self, restaurants: Sequence[Restaurant], embeddings: Union[np.ndarray, Sequence]):
+        self.restaurants = list(restaurants)
+        self.matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(self.restaurants), -1))
+        # ||x||^2 per row: ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, and ||q||^2 doesn't change the ranking
+        self.norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.scores = np.array([r.score for r in self.restaurants], dtype=np.float32)
+
+        self.municipalities = sorted({r.municipality for r in self.restaurants})
+        municipality_codes = {m: i for i, m in enumerate(self.municipalities)}
+        self.municipality_codes = np.array([municipality_codes[r.municipality] for r in self.restaurants], dtype=np.int32)
+
+        self.types = sorted({r.type.value for r in self.restaurants})
+        type_codes = {t: i for i, t in enumerate(self.types)}
+        self.type_codes = np.array([type_codes[r.type.value] for r in self.restaurants], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.restaurants)
+
+    def _code_mask(self, values: Iterable[str], vocabulary: List[str], codes: np.ndarray, matches) -> np.ndarray:
+        """Rows whose coded value satisfies matches(vocabulary_value, value) for any value"""
+        values = list(values)
+        # Evaluate the predicate once per distinct value, then broadcast through the codes
+        allowed = np.array([any(matches(word, value) for value in values) for word in vocabulary], dtype=bool)
+        return allowed[codes] if len(vocabulary) else np.zeros(len(codes), dtype=bool)
+
+    def build_mask(
+        self,
+        location: Union[str, List[str], None] = None,
+        exact_location: bool = False,
+        types: Optional[List[str]] = None,
+        min_score: Optional[float] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Boolean mask of the rows passing the filters, or None when nothing is filtered
+        Mirrors the Milvus expressions: exact municipality match, or a case-sensitive substring
+        match like `municipality like "%...%"`.
+        """
+        mask = None
+        if location:
+            locations = [location] if isinstance(location, str) else location
+            matches = (lambda word, value: word == value) if exact_location else (lambda word, value: value in word)
+            mask = self._code_mask(locations, self.municipalities, self.municipality_codes, matches)
+        if types:
+            type_mask = self._code_mask(types, self.types, self.type_codes, lambda word, value: word == value)
+            mask = type_mask if mask is None else mask & type_mask
+        if min_score is not None:
+            score_mask = self.scores >= min_score
+            mask = score_mask if mask is None else mask & score_mask
+        return mask
+
+    def search(
+        self,
+        query_embeddings: Union[np.ndarray, Sequence],
+        limit: int = 10,
+        location: Union[str, List[str], None] = None,
+        exact_location: bool = False,
+        types: Optional[List[str]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[List[Restaurant]]:
+        """Return the `limit` nearest restaurants of each query that pass the filters"""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        mask = self.build_mask(location, exact_location, types, min_score)
+        candidates = np.flatnonzero(mask) if mask is not None else None
+
+        if candidates is None:
+            distances = self.norms[None, :] - 2.0 * (queries @ self.matrix.T)
+        elif len(candidates) == 0:
+            return [[] for _ in range(len(queries))]
+        else:
+            distances = self.norms[candidates][None, :] - 2.0 * (queries @ self.matrix[candidates].T)
+
+        k = min(limit, distances.shape[1])
+        if k < distances.shape[1]:
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(distances.shape[1]), (len(queries), distances.shape[1]))
+        # Sort only the k selected columns of each row
+        order = np.take_along_axis(top, np.argsort(np.take_along_axis(distances, top, axis=1), axis=1), axis=1)
+        if candidates is not None:
+            order = candidates[order]
+        return [[self.restaurants[i] for i in row] for row in order]
+
+    def extremes(
+        self,
+        count: int = 3,
+        location: Union[str, List[str], None] = None,
+        exact_location: bool = False,
+        types: Optional[List[str]] = None,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Restaurant], List[Restaurant]]:
+        """Return the `count` highest and lowest scored restaurants passing the filters, best first"""
+        mask = self.build_mask(location, exact_location, types, min_score)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(self.restaurants))
+        if len(candidates) == 0:
+            return [], []
+        # Stable sort keeps catalog order between equal scores
+        order = candidates[np.argsort(-self.scores[candidates], kind="stable")]
+        best = order[:count]
+        worst = order[::-1][:count][::-1]
+        return [self.restaurants[i] for i in best], [self.restaurants[i] for i in worst]
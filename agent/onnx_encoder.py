@@ -0,0 +1,176 @@
+import logging
+import os
+from typing import List, Optional
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def default_num_threads() -> int:
+    """
+    Intra-op threads per inference: ONNX_NUM_THREADS, or the cores shared among the agent workers
+    Each worker thread encodes its own query, so giving every call all cores only oversubscribes them.
+    """
+    configured = os.getenv("ONNX_NUM_THREADS")
+    if configured:
+        return int(configured)
+    workers = int(os.getenv("AGENT_MAX_CONCURRENCY", "4"))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def quantize_model(source_path: str, target_path: str):
+    """Write an int8 copy of an ONNX model: weights quantized ahead of time, activations at run time"""
+    # Needs the onnx package, only used when the quantized file isn't cached yet
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+    partial_path = f"{target_path}.partial"
+    quantize_dynamic(source_path, partial_path, weight_type=QuantType.QInt8)
+    # Rename last so an interrupted quantization is never picked up as a finished model
+    os.replace(partial_path, target_path)
+
+def open_session(model_path: str, num_threads: Optional[int] = None):
+    """Open an ONNX Runtime CPU session tuned for the agent's worker threads"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = num_threads or default_num_threads()
+    # Concurrency comes from the agent's worker threads, not from parallel graph branches
+    options.inter_op_num_threads = 1
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+class OnnxEncoder:
+    """
+    Sentence encoder running an ONNX model with batched inference
+    Texts are tokenized together and padded to the longest one instead of the model's maximum
+    length, so a batch costs one session.run. Token embeddings are mean-pooled over the attention
+    mask and L2-normalized, matching the output of pymilvus' DefaultEmbeddingFunction, which
+    runs the same model once per text.
+    """
+
+    def __init__(
+        self,
+        session,
+        tokenizer,
+        dim: int,
+        batch_size: int = 32,
+        max_length: int = 128,
+        model_name: str = "onnx",
+        model_path: Optional[str] = None,
+    ):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.dim = dim
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.model_name = model_name
+        # File the session was opened from, so it can be reopened with other options (serve.py)
+        self.model_path = model_path
+        self._input_names = {model_input.name for model_input in session.get_inputs()}
+
+    @classmethod
+    def from_pretrained(
+        cls,
+        model_name: str = "GPTCache/paraphrase-albert-onnx",
+        tokenizer_name: str = "GPTCache/paraphrase-albert-small-v2",
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 128,
+    ) -> "OnnxEncoder":
+        """Download the model and open a tuned inference session"""
+        from huggingface_hub import hf_hub_download
+
+        return cls.from_file(
+            hf_hub_download(repo_id=model_name, filename="model.onnx"),
+            tokenizer_name,
+            model_name,
+            num_threads=num_threads,
+            batch_size=batch_size,
+            max_length=max_length,
+        )
+
+    @classmethod
+    def from_file(
+        cls,
+        model_path: str,
+        tokenizer_name: str,
+        model_name: str,
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 128,
+    ) -> "OnnxEncoder":
+        """Open a tuned inference session over a local model file"""
+        from transformers import AutoConfig, AutoTokenizer
+
+        session = open_session(model_path, num_threads)
+        logger.info(f"Loaded ONNX encoder {model_path} with {session.get_session_options().intra_op_num_threads} threads")
+        return cls(
+            session,
+            AutoTokenizer.from_pretrained(tokenizer_name),
+            AutoConfig.from_pretrained(tokenizer_name).hidden_size,
+            batch_size=batch_size,
+            max_length=max_length,
+            model_name=model_name,
+            model_path=model_path,
+        )
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_token_type_ids=True,
+            return_tensors="np",
+        )
+        inputs = {name: np.asarray(encoded[name], dtype=np.int64) for name in self._input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = np.asarray(encoded["attention_mask"], dtype=np.float32)[..., None]
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def _encode(self, texts: List[str]) -> List[np.ndarray]:
+        embeddings: List[np.ndarray] = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self._encode_batch(texts[start:start + self.batch_size]).astype(np.float32))
+        return embeddings
+
+    def encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        return self._encode(queries)
+
+    def encode_documents(self, documents: List[str]) -> List[np.ndarray]:
+        return self._encode(documents)
+
+class QuantizedOnnxEncoder(OnnxEncoder):
+    """The batched ONNX encoder over an int8 copy of the model, quantized once and cached on disk"""
+
+    @classmethod
+    def from_pretrained(
+        cls,
+        model_name: str = "GPTCache/paraphrase-albert-onnx",
+        tokenizer_name: str = "GPTCache/paraphrase-albert-small-v2",
+        cache_dir: Optional[str] = None,
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 128,
+    ) -> "QuantizedOnnxEncoder":
+        """Download the model, quantize it once into cache_dir and open a tuned inference session"""
+        from huggingface_hub import hf_hub_download
+
+        cache_dir = cache_dir or os.getenv("ONNX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "restaurant-agent"))
+        quantized_path = os.path.join(cache_dir, f"{model_name.replace('/', '_')}-int8.onnx")
+        if not os.path.exists(quantized_path):
+            logger.info(f"Quantizing {model_name} to int8 into {quantized_path}")
+            quantize_model(hf_hub_download(repo_id=model_name, filename="model.onnx"), quantized_path)
+
+        return cls.from_file(
+            quantized_path,
+            tokenizer_name,
+            f"{model_name}-int8",
+            num_threads=num_threads,
+            batch_size=batch_size,
+            max_length=max_length,
+        )
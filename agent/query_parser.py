@@ -1,7 +1,32 @@
 import re
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from agent.models import RestaurantType
 
+def _trie_regex(keywords) -> str:
+    """
+    Build a regex alternation from a character trie of the keywords
+    Shared prefixes are matched once, so the cost per position grows with keyword length
+    rather than with the number of keywords. Greedy optionals keep longest-match semantics.
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A keyword ends here: the longer continuation is optional
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    return build(trie)
+
 class QueryParser:
     """Parser for extracting food type and location from user queries"""
     
@@ -37,6 +62,53 @@ class QueryParser:
             'best': ['mejores', 'mejor', 'best', 'top', 'buenos', 'bueno', 'buenas', 'buena'],
             'worst': ['peores', 'peor', 'worst', 'malo', 'malos', 'malas', 'mala']
         }
+
+        # Location patterns, compiled once
+        self._comuna_pattern = re.compile(r'en\s+la\s+comuna\s+de\s+(.+)')
+        self._en_pattern = re.compile(r'en\s+(.+)')
+
+        self._compile_keywords()
+
+    def _compile_keywords(self):
+        """
+        Build a single regex matching every keyword, so a query is scanned once
+        instead of once per keyword. Call again after changing the keyword dicts.
+        """
+        # keyword -> (category, value, priority); lower priority wins, following dict order
+        self._keyword_info: Dict[str, Tuple[str, object, int]] = {}
+        keyword_groups = [
+            ("food_type", self.food_type_keywords),
+            ("location", self.location_keywords),
+            ("ranking", self.ranking_keywords),
+        ]
+        for category, keywords_by_value in keyword_groups:
+            priority = 0
+            for value, keywords in keywords_by_value.items():
+                for keyword in keywords:
+                    self._keyword_info.setdefault(keyword, (category, value, priority))
+                    priority += 1
+
+        # Greedy trie matching prefers "hamburguesas" over "hamburguesa";
+        # lookarounds keep matches on word boundaries ("top" doesn't match "stop")
+        self._keyword_pattern = re.compile(rf"(?<!\w){_trie_regex(self._keyword_info)}(?!\w)")
+
+        # Alias (and lowercase canonical name) -> canonical location
+        self._location_aliases: Dict[str, str] = {}
+        for standard_location, aliases in self.location_keywords.items():
+            self._location_aliases[standard_location.lower()] = standard_location
+            for alias in aliases:
+                self._location_aliases.setdefault(alias, standard_location)
+
+    def _scan(self, query_lower: str) -> List[Tuple[str, int, int]]:
+        """Return every keyword match in the query as (keyword, start, end), in one pass"""
+        return [(m.group(0), m.start(), m.end()) for m in self._keyword_pattern.finditer(query_lower)]
+
+    def _best_match(self, matches: List[Tuple[str, int, int]], category: str) -> Optional[str]:
+        """Return the highest priority keyword of a category among the matches"""
+        candidates = [keyword for keyword, _, _ in matches if self._keyword_info[keyword][0] == category]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda keyword: self._keyword_info[keyword][2])
         
     def parse_query(self, query: str) -> Tuple[str, Optional[RestaurantType], Optional[str], bool]:
         """
@@ -46,68 +118,79 @@ class QueryParser:
             Tuple of (new_query, food_type, location, best_and_worst_filter)
         """
         query_lower = query.lower()
+
+        # Find all keywords in a single scan
+        matches = self._scan(query_lower)
         
         # Extract food type
-        new_query, food_type = self._extract_food_type(query_lower)
+        new_query, food_type = self._extract_food_type(query_lower, matches)
         
         # Extract location
-        new_query,location = self._extract_location(new_query)
+        new_query,location = self._extract_location(new_query, matches)
         
         # Check for best/worst filter
-        best_and_worst = self._check_ranking_filter(new_query)
+        best_and_worst = self._check_ranking_filter(new_query, matches)
 
         return new_query, food_type, location, best_and_worst
 
-    def _extract_food_type(self, query_lower: str) -> Tuple[str, Optional[RestaurantType]]:
+    def _extract_food_type(self, query_lower: str, matches: Optional[List[Tuple[str, int, int]]] = None) -> Tuple[str, Optional[RestaurantType]]:
         """
         Extract food type from query and clean the query
         Example: "hamburguesas mcdonald's" -> "mcdonald's", RestaurantType.HAMBURGUESAS
         Returns query, None if no food type is found
         """
-        for food_type, keywords in self.food_type_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    # Remove the food type from the query
-                    pattern = keyword
-                    new_query = re.sub(pattern, '', query_lower).strip()
-                    return new_query, food_type
-        return query_lower, None
+        if matches is None:
+            matches = self._scan(query_lower)
+
+        keyword = self._best_match(matches, "food_type")
+        if keyword is None:
+            return query_lower, None
+
+        # Remove every occurrence of the food type keyword from the query
+        parts = []
+        last_end = 0
+        for match_keyword, start, end in matches:
+            if match_keyword == keyword:
+                parts.append(query_lower[last_end:start])
+                last_end = end
+        parts.append(query_lower[last_end:])
+        new_query = "".join(parts).strip()
+        return new_query, self._keyword_info[keyword][1]
         
-    def _extract_location(self, query_lower: str) -> Tuple[str, Optional[str]]:
+    def _extract_location(self, query_lower: str, matches: Optional[List[Tuple[str, int, int]]] = None) -> Tuple[str, Optional[str]]:
         """
         Extract location from query and clean the query
         Example: "PizzaHut en la comuna de puente alto" -> "PizzaHut Puente Alto", "Puente Alto"
         Returns query, None if no location is found
         """
         # Look for "en la comuna de" pattern - capture everything after it
-        comuna_pattern = r'en\s+la\s+comuna\s+de\s+(.+)'
-        match = re.search(comuna_pattern, query_lower)
+        match = self._comuna_pattern.search(query_lower)
         if match:
             location = match.group(1).strip()
             # Remove "en la comuna de [location]" from the query
-            new_query = re.sub(comuna_pattern, '', query_lower).strip()
+            new_query = self._comuna_pattern.sub('', query_lower).strip()
             normalized_location = self._normalize_location(location)
             # Add the normalized location back to the query
             new_query = f"{new_query} {normalized_location}".strip()
             return new_query, normalized_location
             
         # Look for "en" pattern - capture everything after it
-        en_pattern = r'en\s+(.+)'
-        match = re.search(en_pattern, query_lower)
+        match = self._en_pattern.search(query_lower)
         if match:
             location = match.group(1).strip()
             # Remove "en [location]" from the query
-            new_query = re.sub(en_pattern, '', query_lower).strip()
+            new_query = self._en_pattern.sub('', query_lower).strip()
             normalized_location = self._normalize_location(location)
             # Add the normalized location back to the query
             new_query = f"{new_query} {normalized_location}".strip()
             return new_query, normalized_location
             
         # Direct location matching
-        for location, aliases in self.location_keywords.items():
-            for alias in aliases:
-                if alias in query_lower:
-                    return query_lower, location
+        if matches is None:
+            matches = self._scan(query_lower)
+        alias = self._best_match(matches, "location")
+        if alias is not None:
+            return query_lower, self._keyword_info[alias][1]
                     
         return query_lower, None
         
@@ -120,17 +203,23 @@ class QueryParser:
         location_lower = location.lower().strip()
         
         # Check if it matches any of our known locations
-        for standard_location, aliases in self.location_keywords.items():
-            if location_lower in aliases or location_lower == standard_location:
-                return standard_location
+        standard_location = self._location_aliases.get(location_lower)
+        if standard_location is not None:
+            return standard_location
         
         # For unknown locations, title case it
         return " ".join(word.title() for word in location.split())
     
-    def _check_ranking_filter(self, query: str) -> bool:
+    def is_known_location(self, location: Optional[str]) -> bool:
+        """Check if location is one of our canonical municipality names"""
+        return location in self.location_keywords
+
+    def _check_ranking_filter(self, query: str, matches: Optional[List[Tuple[str, int, int]]] = None) -> bool:
         """Check if query asks for best and worst restaurants"""
         # TODO✅: Implement this
-        query_lower = query.lower()
-        has_best = any(keyword in query_lower for keyword in self.ranking_keywords['best'])
-        has_worst = any(keyword in query_lower for keyword in self.ranking_keywords['worst'])
+        if matches is None:
+            matches = self._scan(query.lower())
+        rankings = {self._keyword_info[keyword][1] for keyword, _, _ in matches if self._keyword_info[keyword][0] == "ranking"}
+        has_best = 'best' in rankings
+        has_worst = 'worst' in rankings
         return has_best and has_worst
\ No newline at end of file
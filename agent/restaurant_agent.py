@@ -1,19 +1,56 @@
+import copy
 import logging
+import time
+from typing import AsyncIterator, List, Optional
 from langgraph.graph import StateGraph, END
 from agent.models import AgentState
-from agent.milvus_client import MilvusClient
+from agent.cache import LRUCache
+from agent.coalescer import SearchCoalescer
+from agent.executor import WorkflowExecutor
+from agent.metrics import REGISTRY
+from agent.vector_store import VectorStore, vector_store_from_env
 from agent.query_parser import QueryParser
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ways of answering best/worst queries, see RestaurantAgent.__init__
+RANKING_MODES = ("semantic", "score")
+
 class RestaurantAgent:
     """Main restaurant agent using LangGraph for agentic workflow"""
     
-    def __init__(self):
-        self.milvus_client = MilvusClient()
+    def __init__(
+        self,
+        milvus_client: Optional[VectorStore] = None,
+        execution_mode: str = "threadpool",
+        max_concurrency: int = 4,
+        response_cache_size: int = 1024,
+        response_cache_ttl: Optional[float] = None,
+        ranking_mode: str = "semantic",
+        coalesce_window_ms: float = 0,
+        coalesce_max_batch: int = 64,
+    ):
+        # Any vector store backend; by default the one configured by VECTOR_STORE_BACKEND
+        self.milvus_client = milvus_client or vector_store_from_env()
         self.query_parser = QueryParser()
+        # "semantic" ranks the nearest hits of best/worst queries, "score" ranks every
+        # restaurant of the food type and comuna by score in the vector store
+        if ranking_mode not in RANKING_MODES:
+            raise ValueError(f"Unknown ranking mode '{ranking_mode}'. Expected one of {RANKING_MODES}")
+        self.ranking_mode = ranking_mode
+        # Runs the synchronous workflow off the event loop so one query doesn't block other sessions
+        self.executor = WorkflowExecutor(mode=execution_mode, max_concurrency=max_concurrency)
+        # Concurrent searches from the worker threads are merged into batches when a window is set.
+        # Inline mode runs one query at a time, so there is nothing to merge
+        self.search_coalescer = None
+        if coalesce_window_ms > 0 and execution_mode == "threadpool":
+            self.search_coalescer = SearchCoalescer(self.milvus_client, coalesce_window_ms, coalesce_max_batch)
+        # Final responses keyed on the parsed query, valid for one version of the collection data
+        self.response_cache = LRUCache(max_size=response_cache_size, ttl=response_cache_ttl)
+        self._response_cache_version = None
+        self._register_metrics()
         
         # Initialize Milvus data
         self.milvus_client.load_restaurant_data()
@@ -21,6 +58,15 @@ class RestaurantAgent:
         # Build the LangGraph workflow
         self.workflow = self._build_workflow()
         
+    def _register_metrics(self):
+        """Expose cache and executor state as gauges on /metrics"""
+        caches = {"embedding": self.milvus_client.embedding_cache, "response": self.response_cache}
+        for name, cache in caches.items():
+            REGISTRY.register_gauge("cache_hit_ratio", lambda cache=cache: cache.get_stats()["hit_ratio"], cache=name)
+            REGISTRY.register_gauge("cache_entries", lambda cache=cache: len(cache), cache=name)
+        REGISTRY.register_gauge("executor_in_flight", lambda: self.executor.get_stats()["in_flight"])
+        REGISTRY.register_gauge("executor_queue_depth", lambda: self.executor.get_stats()["queue_depth"])
+
     def _build_workflow(self) -> StateGraph:
         """Build the LangGraph workflow for restaurant search"""
         
@@ -44,6 +90,7 @@ class RestaurantAgent:
         
         return workflow.compile()
         
+    @REGISTRY.timed("node_seconds", node="parse_query")
     def _parse_query_node(self, state: AgentState) -> AgentState:
         """Parse the user query to extract food type and location"""
         user_query = state.get("user_query", "")
@@ -60,29 +107,51 @@ class RestaurantAgent:
         
         return state
         
+    @REGISTRY.timed("node_seconds", node="search_restaurants")
     def _search_restaurants_node(self, state: AgentState) -> AgentState:
         """Search for restaurants using Milvus"""
         logger.info("Searching restaurants in Milvus")
         
-        # Prepare search parameters
-        query = state.get("user_query", "")
-        food_type = state.get("parsed_food_type")
-        food_type_value = food_type.value if food_type else None
-        location = state.get("parsed_location")
-        
         # Search restaurants
-        restaurants = self.milvus_client.search_restaurants(
-            query=query,
-            food_type=food_type_value,
-            location=location,
-            limit=10
-        )
+        if self._ranks_by_score(state):
+            restaurants = self._rank_restaurants(state)
+        else:
+            restaurants = (self.search_coalescer or self.milvus_client).search_restaurants(**self._search_request(state))
         
         state["filtered_restaurants"] = restaurants
         logger.info(f"Found {len(restaurants)} restaurants")
         
         return state
         
+    def _search_request(self, state: AgentState) -> dict:
+        """Build the vector search arguments for a parsed query"""
+        food_type = state.get("parsed_food_type")
+        location = state.get("parsed_location")
+        return {
+            "query": state.get("user_query", ""),
+            "food_type": food_type.value if food_type else None,
+            "location": location,
+            "limit": 10,
+            # Canonical comunas can use the indexed exact-match filter
+            "exact_location": self.query_parser.is_known_location(location),
+        }
+        
+    def _ranks_by_score(self, state: AgentState) -> bool:
+        """Whether a query takes the score ranking path instead of the vector search"""
+        return self.ranking_mode == "score" and state.get("best_and_worst_filter", False)
+
+    def _rank_restaurants(self, state: AgentState) -> list:
+        """Fetch the true best and worst restaurants of the parsed food type and comuna"""
+        request = self._search_request(state)
+        best, worst = self.milvus_client.rank_restaurants(
+            food_type=request["food_type"],
+            location=request["location"],
+            exact_location=request["exact_location"],
+            count=3,
+        )
+        return best + [r for r in worst if r not in best]
+
+    @REGISTRY.timed("node_seconds", node="filter_and_rank")
     def _filter_and_rank_node(self, state: AgentState) -> AgentState:
         """Apply additional filtering and ranking logic"""
         logger.info("Applying filters and ranking")
@@ -108,6 +177,7 @@ class RestaurantAgent:
 
         return state
         
+    @REGISTRY.timed("node_seconds", node="generate_response")
     def _generate_response_node(self, state: AgentState) -> AgentState:
         """Generate the final response explanation"""
         logger.info("Generating response explanation")
@@ -145,41 +215,203 @@ class RestaurantAgent:
         
         return state
         
+    def _get_cached_response(self, cache_key: tuple) -> Optional[dict]:
+        """Return a cached response for the parsed query, dropping the cache if the data changed"""
+        if self._response_cache_version != self.milvus_client.data_version:
+            self.response_cache.clear()
+            self._response_cache_version = self.milvus_client.data_version
+            return None
+
+        cached = self.response_cache.get(cache_key)
+        # Return a copy so callers can't mutate the cached entry
+        return copy.deepcopy(cached) if cached is not None else None
+
+    def _initial_state(self, user_query: str) -> AgentState:
+        """Create the workflow state for a new query"""
+        return {
+            "user_query": user_query,
+            "parsed_food_type": None,
+            "parsed_location": None,
+            "filtered_restaurants": [],
+            "response_explanation": "",
+            "best_and_worst_filter": False
+        }
+
+    def _build_response(self, final_state: AgentState) -> dict:
+        """Build the client response from a finished workflow state"""
+        restaurants = final_state.get("filtered_restaurants", [])
+        explanation = final_state.get("response_explanation", "No se pudo generar una explicación.")
+        return {
+            "type": "response",
+            "restaurants": [r.dict() if hasattr(r, 'dict') else r for r in restaurants],
+            "explanation": explanation
+        }
+
+    def _error_response(self, error: Exception) -> dict:
+        """Build the client response for a failed query"""
+        return {
+            "type": "response",
+            "restaurants": [],
+            "explanation": f"Lo siento, ocurrió un error al procesar tu consulta: {str(error)}"
+        }
+
+    def _cache_key(self, user_query: str) -> tuple:
+        """Response cache key of a query"""
+        # The whole pipeline is deterministic for a parsed query and a data version
+        new_query, food_type, location, best_and_worst = self.query_parser.parse_query(user_query)
+        return (food_type, location, new_query, best_and_worst)
+
     async def process_query(self, user_query: str) -> AgentState:
         """Process a user query through the LangGraph workflow"""
         try:
-            # Create initial state as dictionary
-            initial_state = {
-                "user_query": user_query,
-                "parsed_food_type": None,
-                "parsed_location": None,
-                "filtered_restaurants": [],
-                "response_explanation": "",
-                "best_and_worst_filter": False
-            }
-            
-            # Run the workflow
-            # TODO✅: Invoke the workflow
-            final_state = self.workflow.invoke(initial_state)
-            
-            # Prepare response
-            restaurants = final_state.get("filtered_restaurants", [])
-            explanation = final_state.get("response_explanation", "No se pudo generar una explicación.")
-            
-            response = {
-                "type": "response",
-                "restaurants": [r.dict() if hasattr(r, 'dict') else r for r in restaurants],
-                "explanation": explanation
-            }
-            
-            return response
-            
+            REGISTRY.inc("queries_total", mode="single")
+            with REGISTRY.timer("query_seconds", mode="single"):
+                return await self._process_query(user_query)
         except Exception as e:
             logger.error(f"Error processing query: {e}")
             import traceback
             traceback.print_exc()
-            return {
-                "type": "response",
-                "restaurants": [],
-                "explanation": f"Lo siento, ocurrió un error al procesar tu consulta: {str(e)}"
-            } 
\ No newline at end of file
+            return self._error_response(e)
+
+    async def _process_query(self, user_query: str) -> dict:
+        """Answer a query from the response cache or by running the workflow"""
+        cache_key = self._cache_key(user_query)
+        data_version = self.milvus_client.data_version
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        # Create initial state as dictionary
+        initial_state = self._initial_state(user_query)
+        
+        # Run the workflow
+        # TODO✅: Invoke the workflow
+        final_state = await self.executor.run(self.workflow.invoke, initial_state)
+        
+        # Prepare response
+        response = self._build_response(final_state)
+
+        # Skip caching if the data was reloaded while this query was running
+        if data_version == self.milvus_client.data_version:
+            self.response_cache.put(cache_key, copy.deepcopy(response))
+        
+        return response
+
+    def _intent_event(self, food_type, location, best_and_worst: bool) -> dict:
+        """Partial event with the parsed intent of a query"""
+        return {
+            "type": "partial",
+            "stage": "parse_query",
+            "intent": {
+                "food_type": food_type.value if food_type else None,
+                "location": location,
+                "best_and_worst": best_and_worst,
+            },
+        }
+
+    async def stream_query(self, user_query: str) -> AsyncIterator[dict]:
+        """
+        Process a user query, yielding partial events as workflow nodes finish
+        Yields the parsed intent, then the restaurants found by the search (before ranking),
+        then the same final response as process_query. Closing the iterator stops the
+        workflow after the node that is currently running.
+        """
+        try:
+            REGISTRY.inc("queries_total", mode="stream")
+            start_time = time.perf_counter()
+            cache_key = self._cache_key(user_query)
+            data_version = self.milvus_client.data_version
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                food_type, location, _, best_and_worst = cache_key
+                yield self._intent_event(food_type, location, best_and_worst)
+                yield cached
+                return
+
+            # Pull one node update at a time through the executor so the event loop stays free
+            updates = iter(self.workflow.stream(self._initial_state(user_query), stream_mode="updates"))
+            final_state = None
+            while True:
+                update = await self.executor.run(next, updates, None)
+                if update is None:
+                    break
+                for node, state in update.items():
+                    final_state = state
+                    if node == "parse_query":
+                        yield self._intent_event(
+                            state.get("parsed_food_type"), state.get("parsed_location"), state.get("best_and_worst_filter", False)
+                        )
+                    elif node == "search_restaurants":
+                        yield {
+                            "type": "partial",
+                            "stage": "search_restaurants",
+                            "restaurants": [r.dict() if hasattr(r, 'dict') else r for r in state.get("filtered_restaurants", [])],
+                        }
+
+            response = self._build_response(final_state)
+            # Skip caching if the data was reloaded while this query was running
+            if data_version == self.milvus_client.data_version:
+                self.response_cache.put(cache_key, copy.deepcopy(response))
+            REGISTRY.observe("query_seconds", time.perf_counter() - start_time, mode="stream")
+            yield response
+
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            yield self._error_response(e)
+
+    def _run_batch(self, user_queries: List[str]) -> List[dict]:
+        """Run the workflow steps for many queries, sharing one batched vector search"""
+        states = [self._parse_query_node(self._initial_state(query)) for query in user_queries]
+        searched = [state for state in states if not self._ranks_by_score(state)]
+        results = iter(self.milvus_client.search_restaurants_batch([self._search_request(state) for state in searched]))
+
+        responses = []
+        for state in states:
+            state["filtered_restaurants"] = self._rank_restaurants(state) if self._ranks_by_score(state) else next(results)
+            state = self._generate_response_node(self._filter_and_rank_node(state))
+            responses.append(self._build_response(state))
+        logger.info(f"Processed a batch of {len(user_queries)} queries")
+        return responses
+
+    async def process_queries(self, user_queries: List[str]) -> List[dict]:
+        """Process many user queries at once, returning one response per query in order"""
+        try:
+            REGISTRY.inc("queries_total", len(user_queries), mode="batch")
+            start_time = time.perf_counter()
+            cache_keys = [self._cache_key(query) for query in user_queries]
+            data_version = self.milvus_client.data_version
+            responses = [self._get_cached_response(key) for key in cache_keys]
+
+            # Equivalent queries in the batch are resolved once
+            pending = {}
+            for query, key, response in zip(user_queries, cache_keys, responses):
+                if response is None and key not in pending:
+                    pending[key] = query
+
+            if pending:
+                computed = dict(zip(pending, await self.executor.run(self._run_batch, list(pending.values()))))
+                # Skip caching if the data was reloaded while this batch was running
+                if data_version == self.milvus_client.data_version:
+                    for key, response in computed.items():
+                        self.response_cache.put(key, copy.deepcopy(response))
+                responses = [
+                    response if response is not None else copy.deepcopy(computed[key])
+                    for key, response in zip(cache_keys, responses)
+                ]
+
+            REGISTRY.observe("query_seconds", time.perf_counter() - start_time, mode="batch")
+            return responses
+
+        except Exception as e:
+            logger.error(f"Error processing query batch: {e}")
+            return [self._error_response(e) for _ in user_queries]
+
+    def get_stats(self) -> dict:
+        """Return runtime statistics for monitoring"""
+        return {
+            "executor": self.executor.get_stats(),
+            "embedding_cache": self.milvus_client.embedding_cache.get_stats(),
+            "response_cache": self.response_cache.get_stats(),
+            "vector_store": self.milvus_client.get_stats(),
+            "search_coalescer": self.search_coalescer.get_stats() if self.search_coalescer else None,
+        }
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from agent.models import Restaurant
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+VERSION_FILE = re.compile(r"^(?:embeddings|restaurants)-(\d+)\.(?:f32|jsonl)$")
+
+def write_snapshot(
+    path: str,
+    restaurants: Sequence[Restaurant],
+    embeddings,
+    encoder_name: str,
+    dimension: int,
+) -> Dict:
+    """
+    Write a read-only copy of the vector data for serving processes
+    Each version gets its own matrix and restaurant files, and the manifest naming them is
+    replaced last, so readers see either the previous snapshot or the new one, never a mix.
+    The previous version's files are kept until the next write, so a reader that read the old
+    manifest just before the swap can still open them; older versions are removed.
+    """
+    os.makedirs(path, exist_ok=True)
+    previous = read_manifest(path) if os.path.exists(os.path.join(path, MANIFEST_FILE)) else None
+    version = previous["version"] + 1 if previous else 1
+    matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(restaurants), dimension))
+
+    manifest = {
+        "version": version,
+        "encoder": encoder_name,
+        "dimension": dimension,
+        "rows": len(restaurants),
+        "embeddings": f"embeddings-{version}.f32",
+        "restaurants": f"restaurants-{version}.jsonl",
+    }
+    with open(os.path.join(path, manifest["embeddings"]), "wb") as file:
+        file.write(matrix.tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+    with open(os.path.join(path, manifest["restaurants"]), "w", encoding="utf-8") as file:
+        file.writelines(f"{restaurant.model_dump_json()}\n" for restaurant in restaurants)
+        file.flush()
+        os.fsync(file.fileno())
+
+    partial_path = os.path.join(path, f"{MANIFEST_FILE}.partial")
+    with open(partial_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial_path, os.path.join(path, MANIFEST_FILE))
+
+    # Unlinked files stay readable through the maps of processes still using them
+    if previous:
+        for name in os.listdir(path):
+            match = VERSION_FILE.match(name)
+            if match and int(match.group(1)) < previous["version"]:
+                try:
+                    os.remove(os.path.join(path, name))
+                except FileNotFoundError:
+                    pass
+    logger.info(f"Wrote snapshot version {version} with {len(restaurants)} rows to {path}")
+    return manifest
+
+def read_manifest(path: str) -> Dict:
+    """Return the manifest of the current snapshot in path"""
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError as e:
+        raise RuntimeError(f"No vector snapshot in {path}. Write one with `python -m agent.ingest --snapshot {path}`") from e
+
+def read_snapshot(path: str) -> Tuple[List[Restaurant], np.ndarray, Dict]:
+    """
+    Open the current snapshot: restaurants, a read-only memory map of their embeddings, and the manifest
+    Every process mapping the same file shares its pages through the OS page cache.
+    """
+    # Two writes landing between reading the manifest and opening its files remove them; read the new one
+    for attempt in range(3):
+        manifest = read_manifest(path)
+        try:
+            return _open_version(path, manifest)
+        except FileNotFoundError:
+            if attempt == 2 or read_manifest(path)["version"] == manifest["version"]:
+                raise
+
+def _open_version(path: str, manifest: Dict) -> Tuple[List[Restaurant], np.ndarray, Dict]:
+    """Read the restaurants and map the embeddings named by manifest"""
+    with open(os.path.join(path, manifest["restaurants"]), "r", encoding="utf-8") as file:
+        restaurants = [Restaurant.model_validate_json(line) for line in file if line.strip()]
+    if len(restaurants) != manifest["rows"]:
+        raise RuntimeError(f"Snapshot {path} lists {manifest['rows']} rows but has {len(restaurants)} restaurants")
+
+    shape = (manifest["rows"], manifest["dimension"])
+    matrix = (
+        np.memmap(os.path.join(path, manifest["embeddings"]), dtype=np.float32, mode="r", shape=shape)
+        if manifest["rows"] else np.empty(shape, dtype=np.float32)
+    )
+    return restaurants, matrix, manifest
@@ -0,0 +1,400 @@
+import abc
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Protocol, Tuple, Union, runtime_checkable
+import numpy as np
+from agent.cache import LRUCache
+from agent.embedding_store import EmbeddingStore, text_key
+from agent.encoders import DEFAULT_ENCODER, ENCODERS, create_encoder, encoder_dimension
+from agent.ingest import DATA_SOURCES, content_hash, iter_restaurants
+from agent.metrics import REGISTRY
+from agent.models import Restaurant, RestaurantType
+from agent.numpy_search import NumpySearchEngine
+from agent.snapshot import read_snapshot, write_snapshot
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Backends accepted by create_vector_store
+VECTOR_STORE_BACKENDS = ("lite", "server", "memory")
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """What the agent needs from a vector database: ingest, search, batch search and stats"""
+
+    # Incremented whenever stored rows change, so result caches know when to invalidate
+    data_version: int
+    embedding_cache: LRUCache
+
+    def load_restaurant_data(self, sources: Optional[List[Tuple[str, RestaurantType]]] = None) -> None:
+        ...
+
+    def sync_restaurant_data(self, sources: Optional[List[Tuple[str, RestaurantType]]] = None) -> Dict[str, Dict]:
+        ...
+
+    def search_restaurants(
+        self,
+        query: str,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        limit: int = 10,
+        exact_location: bool = False,
+        min_score: Optional[float] = None,
+    ) -> List[Restaurant]:
+        ...
+
+    def rank_restaurants(
+        self,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        exact_location: bool = False,
+        count: int = 3,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Restaurant], List[Restaurant]]:
+        ...
+
+    def search_restaurants_batch(self, requests: List[Dict]) -> List[List[Restaurant]]:
+        ...
+
+    def get_stats(self) -> Dict:
+        ...
+
+class BaseVectorStore(abc.ABC):
+    """
+    Encoder, query embedding cache and embedding store shared by every backend
+    Backends implement search_restaurants_batch and rank_restaurants.
+    """
+
+    backend = "base"
+
+    def __init__(
+        self,
+        encoder=None,
+        encode_batch_size: int = 64,
+        embedding_cache_size: int = 1024,
+        embedding_cache_ttl: Optional[float] = 3600,
+        embedding_store_path: Optional[str] = None,
+        encoder_name: str = DEFAULT_ENCODER,
+    ):
+        # Registered name of the embedding model; a custom encoder instance is used as given
+        if encoder_name not in ENCODERS:
+            raise ValueError(f"Unknown encoder '{encoder_name}'. Expected one of {tuple(ENCODERS)}")
+        self.encoder_name = encoder_name
+        self.encoder = encoder or create_encoder(encoder_name)
+        # Dimension for the embedding vectors, as produced by the encoder
+        self.dimension = encoder_dimension(self.encoder, ENCODERS[encoder_name].dimension)
+        # Number of documents sent to the encoder per call during ingest
+        self.encode_batch_size = encode_batch_size
+        # Query embeddings keyed on the normalized query text, so repeated queries skip the encoder
+        self.embedding_cache = LRUCache(max_size=embedding_cache_size, ttl=embedding_cache_ttl)
+        # Persistent document embeddings reused across restarts and new databases
+        self.embedding_store = None
+        if embedding_store_path:
+            model_name = getattr(self.encoder, "model_name", type(self.encoder).__name__)
+            self.embedding_store = EmbeddingStore(embedding_store_path, self.dimension, model_name=model_name)
+        # Incremented whenever rows are written, so result caches know when to invalidate
+        self.data_version = 0
+
+    def _encode_documents(self, texts: List[str]) -> List:
+        """
+        Encode documents in chunks of encode_batch_size using the document-side encoder
+        Embeddings found in the embedding store are copied instead of re-encoded
+        """
+        stored = {}
+        keys = []
+        if self.embedding_store is not None:
+            keys = [text_key(text) for text in texts]
+            stored = self.embedding_store.get_many(keys)
+
+        missing = [i for i in range(len(texts)) if not stored or keys[i] not in stored]
+        encoded = {}
+        for start in range(0, len(missing), self.encode_batch_size):
+            chunk = missing[start:start + self.encode_batch_size]
+            with REGISTRY.timer("embedding_seconds", kind="document"):
+                chunk_embeddings = self.encoder.encode_documents([texts[i] for i in chunk])
+            for i, embedding in zip(chunk, chunk_embeddings):
+                encoded[i] = embedding
+
+        if self.embedding_store is not None and encoded:
+            self.embedding_store.put_many([keys[i] for i in encoded], list(encoded.values()))
+        if stored:
+            logger.info(f"Reused {len(texts) - len(missing)} of {len(texts)} embeddings from the embedding store")
+
+        return [encoded[i] if i in encoded else stored[keys[i]] for i in range(len(texts))]
+
+    def _encode_query(self, query: str):
+        """Encode a query, reusing the cached embedding for repeated queries"""
+        return self._encode_queries([query])[0]
+
+    def _encode_queries(self, queries: List[str]) -> List:
+        """
+        Encode queries in one encoder call, reusing cached embeddings for repeated queries
+        The bundled encoders run the whole call as one batched inference; an encoder that loops
+        over the texts (like pymilvus' DefaultEmbeddingFunction) only saves the per-call overhead.
+        """
+        # Normalize case and whitespace so equivalent phrasings share an entry
+        keys = [" ".join(query.lower().split()) for query in queries]
+        embeddings = {key: self.embedding_cache.get(key) for key in keys}
+        missing = [key for key, embedding in embeddings.items() if embedding is None]
+        if missing:
+            with REGISTRY.timer("embedding_seconds", kind="query"):
+                missing_embeddings = self.encoder.encode_queries(missing)
+            for key, embedding in zip(missing, missing_embeddings):
+                embeddings[key] = embedding
+                self.embedding_cache.put(key, embedding)
+        return [embeddings[key] for key in keys]
+
+    def search_restaurants(
+        self,
+        query: str,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        limit: int = 10,
+        exact_location: bool = False,
+        min_score: Optional[float] = None,
+    ) -> List[Restaurant]:
+        """
+        Search restaurants using vector similarity and filters
+        Set exact_location when location is a canonical municipality name (or a list of them),
+        and min_score to only return restaurants scored at least that much
+        """
+        return self.search_restaurants_batch([{
+            "query": query,
+            "food_type": food_type,
+            "location": location,
+            "limit": limit,
+            "exact_location": exact_location,
+            "min_score": min_score,
+        }])[0]
+
+    @abc.abstractmethod
+    def search_restaurants_batch(self, requests: List[Dict]) -> List[List[Restaurant]]:
+        """Run many searches; each request holds the search_restaurants arguments, results keep request order"""
+
+    @abc.abstractmethod
+    def rank_restaurants(
+        self,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        exact_location: bool = False,
+        count: int = 3,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Restaurant], List[Restaurant]]:
+        """
+        Return the `count` best and worst scored restaurants of a food type and location
+        Unlike a vector search, this ranks every matching restaurant, not only the nearest ones.
+        """
+
+    def get_stats(self) -> Dict:
+        """Return backend statistics for monitoring"""
+        return {
+            "backend": self.backend,
+            "encoder": self.encoder_name,
+            "dimension": self.dimension,
+            "data_version": self.data_version,
+            "embedding_cache": self.embedding_cache.get_stats(),
+        }
+
+class InMemoryVectorStore(BaseVectorStore):
+    """
+    Vector store kept entirely in process memory and searched with NumPy
+    Suited to catalogs that fit in RAM and to tests; nothing is persisted except through
+    the embedding store. With snapshot_path the store serves a snapshot written by an ingest
+    process instead: embeddings are memory-mapped read-only and shared by every process.
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        encoder=None,
+        encode_batch_size: int = 64,
+        embedding_cache_size: int = 1024,
+        embedding_cache_ttl: Optional[float] = 3600,
+        embedding_store_path: Optional[str] = None,
+        unified_collection: bool = False,
+        encoder_name: str = DEFAULT_ENCODER,
+        snapshot_path: Optional[str] = None,
+    ):
+        super().__init__(
+            encoder=encoder,
+            encode_batch_size=encode_batch_size,
+            embedding_cache_size=embedding_cache_size,
+            embedding_cache_ttl=embedding_cache_ttl,
+            embedding_store_path=embedding_store_path,
+            encoder_name=encoder_name,
+        )
+        # Allow searches without a food type, like the unified Milvus collection
+        self.unified_collection = unified_collection
+        # restaurant type -> {content hash: (restaurant, embedding)}
+        self._rows: Dict[str, Dict[str, Tuple[Restaurant, object]]] = {}
+        self._engine: Optional[NumpySearchEngine] = None
+        # Snapshot served read-only; rows are only written by the process that exports it
+        self.snapshot_path = snapshot_path
+        self.read_only = snapshot_path is not None
+        if snapshot_path:
+            self._load_snapshot(snapshot_path)
+
+    def _load_snapshot(self, path: str):
+        restaurants, matrix, manifest = read_snapshot(path)
+        if manifest["encoder"] != self.encoder_name or manifest["dimension"] != self.dimension:
+            raise ValueError(
+                f"Snapshot {path} was embedded with {manifest['encoder']} ({manifest['dimension']} dimensions), "
+                f"not {self.encoder_name} ({self.dimension} dimensions)"
+            )
+        # The engine searches the mapped matrix in place, so its pages are shared, not copied
+        self._engine = NumpySearchEngine(restaurants, matrix) if restaurants else None
+        self.data_version = manifest["version"]
+        logger.info(f"Serving snapshot version {manifest['version']} with {len(restaurants)} rows from {path}")
+
+    def export_snapshot(self, path: str) -> Dict:
+        """Write the current rows as a snapshot for read-only serving processes; returns its manifest"""
+        restaurants = self._engine.restaurants if self._engine is not None else []
+        matrix = self._engine.matrix if self._engine is not None else np.empty((0, self.dimension), dtype=np.float32)
+        return write_snapshot(path, restaurants, matrix, self.encoder_name, self.dimension)
+
+    def _rebuild_engine(self):
+        rows = [row for type_rows in self._rows.values() for row in type_rows.values()]
+        self._engine = NumpySearchEngine([r for r, _ in rows], [e for _, e in rows]) if rows else None
+        self.data_version += 1
+
+    def load_restaurant_data(self, sources: Optional[List[Tuple[str, RestaurantType]]] = None):
+        """Load restaurant files, skipping types that are already loaded"""
+        if self.read_only:
+            return
+        pending = [(f, t) for f, t in sources or DATA_SOURCES if not self._rows.get(t.value)]
+        if pending:
+            self.sync_restaurant_data(pending)
+
+    def sync_restaurant_data(self, sources: Optional[List[Tuple[str, RestaurantType]]] = None) -> Dict[str, Dict]:
+        """Replace the rows of each restaurant type with its file, embedding only new or changed restaurants"""
+        if self.read_only:
+            raise RuntimeError(f"Vector store serving snapshot {self.snapshot_path} is read-only; sync with the ingest process")
+        report: Dict[str, Dict] = {}
+        for filename, restaurant_type in sources or DATA_SOURCES:
+            start_time = time.perf_counter()
+            try:
+                restaurants = {content_hash(r): r for r in iter_restaurants(filename, restaurant_type)}
+            except FileNotFoundError:
+                logger.warning(f"Could not find {filename}")
+                continue
+
+            existing = self._rows.get(restaurant_type.value, {})
+            new_hashes = [h for h in restaurants if h not in existing]
+            embeddings = self._encode_documents([f"{restaurants[h].name} {restaurants[h].full_address}" for h in new_hashes])
+            rows = {h: existing[h] for h in restaurants if h in existing}
+            rows.update({h: (restaurants[h], e) for h, e in zip(new_hashes, embeddings)})
+            self._rows[restaurant_type.value] = rows
+
+            report[restaurant_type.value] = {
+                "inserted": len(new_hashes),
+                "deleted": len([h for h in existing if h not in restaurants]),
+                "unchanged": len(restaurants) - len(new_hashes),
+                "seconds": round(time.perf_counter() - start_time, 3),
+            }
+            logger.info(f"Loaded {len(rows)} restaurants from {filename} in memory")
+
+        self._rebuild_engine()
+        return report
+
+    def search_restaurants_batch(self, requests: List[Dict]) -> List[List[Restaurant]]:
+        """Run many searches with one batched encoder call; results are returned in request order"""
+        results: List[List[Restaurant]] = [[] for _ in requests]
+        searched = [
+            i for i, request in enumerate(requests)
+            if self._engine is not None and (request.get("food_type") is not None or self.unified_collection)
+        ]
+        if not searched:
+            return results
+
+        embeddings = self._encode_queries([requests[i]["query"] for i in searched])
+        for i, embedding in zip(searched, embeddings):
+            request = requests[i]
+            with REGISTRY.timer("numpy_search_seconds"):
+                results[i] = self._engine.search(
+                    [embedding],
+                    limit=request.get("limit", 10),
+                    location=request.get("location"),
+                    exact_location=request.get("exact_location", False),
+                    types=[request["food_type"]] if request.get("food_type") else None,
+                    min_score=request.get("min_score"),
+                )[0]
+        return results
+
+    def rank_restaurants(
+        self,
+        food_type: str = None,
+        location: Union[str, List[str]] = None,
+        exact_location: bool = False,
+        count: int = 3,
+        min_score: Optional[float] = None,
+    ) -> Tuple[List[Restaurant], List[Restaurant]]:
+        if self._engine is None or (food_type is None and not self.unified_collection):
+            return [], []
+        return self._engine.extremes(
+            count, location, exact_location, [food_type] if food_type else None, min_score
+        )
+
+    def get_stats(self) -> Dict:
+        stats = {**super().get_stats(), "rows": len(self._engine) if self._engine is not None else 0}
+        if self.snapshot_path:
+            stats["snapshot"] = self.snapshot_path
+        return stats
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes")
+
+def create_vector_store(backend: str = "lite", **options) -> VectorStore:
+    """
+    Build a vector store backend
+    Options are passed to the backend constructor: MilvusClient for "lite",
+    MilvusServerClient for "server" and InMemoryVectorStore for "memory".
+    """
+    # Imported here because the Milvus backends build on BaseVectorStore
+    from agent.milvus_client import MilvusClient, MilvusServerClient
+
+    backends = {"lite": MilvusClient, "server": MilvusServerClient, "memory": InMemoryVectorStore}
+    if backend not in backends:
+        raise ValueError(f"Unknown vector store backend '{backend}'. Expected one of {VECTOR_STORE_BACKENDS}")
+    return backends[backend](**options)
+
+def vector_store_from_env(**overrides) -> VectorStore:
+    """
+    Build the vector store configured by environment variables
+    VECTOR_STORE_BACKEND: "lite" (Milvus Lite file), "server" (Milvus server) or "memory"
+    MILVUS_DB_PATH: database file of the lite backend
+    MILVUS_URI, MILVUS_TOKEN, MILVUS_DB_NAME, MILVUS_POOL_SIZE: connection of the server backend
+    MILVUS_UNIFIED_COLLECTION: store all restaurant types in one partitioned collection
+    EMBEDDING_STORE_PATH: directory of the persistent embedding store (disabled when unset)
+    EMBEDDING_MODEL: registered encoder name, see agent.encoders
+    VECTOR_STORE_SNAPSHOT: snapshot directory served read-only by the memory backend
+    MILVUS_HYBRID_SEARCH: add a BM25 field to new collections and fuse it with the dense search
+    NUMPY_SEARCH_MAX_ROWS: collections up to this size are searched in process with NumPy (0 disables it)
+    MILVUS_INDEX_PROFILE: vector index of the Milvus backends ("auto", "ivf_sq8", "ivf_pq", ...)
+    MILVUS_VECTOR_TYPE: "float32" or "float16" (server backend only) embedding field
+    """
+    backend = os.getenv("VECTOR_STORE_BACKEND", "lite")
+    options = {
+        "unified_collection": _env_flag("MILVUS_UNIFIED_COLLECTION"),
+        "embedding_store_path": os.getenv("EMBEDDING_STORE_PATH") or None,
+        "encoder_name": os.getenv("EMBEDDING_MODEL", DEFAULT_ENCODER),
+    }
+    if backend in ("lite", "server"):
+        options["hybrid_search"] = _env_flag("MILVUS_HYBRID_SEARCH")
+        options["numpy_search_max_rows"] = int(os.getenv("NUMPY_SEARCH_MAX_ROWS", "5000"))
+        options["index_profile"] = os.getenv("MILVUS_INDEX_PROFILE", "auto")
+        options["vector_type"] = os.getenv("MILVUS_VECTOR_TYPE", "float32")
+    if backend == "lite":
+        options["db_path"] = os.getenv("MILVUS_DB_PATH", "./milvus.db")
+    elif backend == "server":
+        options["uri"] = os.getenv("MILVUS_URI", "http://localhost:19530")
+        options["token"] = os.getenv("MILVUS_TOKEN", "")
+        options["db_name"] = os.getenv("MILVUS_DB_NAME", "")
+        options["pool_size"] = int(os.getenv("MILVUS_POOL_SIZE", "4"))
+    elif backend == "memory":
+        options["snapshot_path"] = os.getenv("VECTOR_STORE_SNAPSHOT") or None
+    # Explicit options, such as an encoder loaded once before forking, win over the environment
+    options.update(overrides)
+    return create_vector_store(backend, **options)
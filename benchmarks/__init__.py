@@ -0,0 +1,2 @@
+# Benchmarks for the restaurant search system. Run from the repository root, e.g.
+#   python -m benchmarks.filter_latency
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import random
+from typing import Dict, List, Sequence
+import numpy as np
+from agent.models import Restaurant, RestaurantType
+
+CATALOG_FILES = {
+    RestaurantType.HAMBURGUESAS: "hamburguesas.json",
+    RestaurantType.PIZZAS: "pizzas.json",
+    RestaurantType.COMPLETOS: "completos.json",
+}
+
+class HashEncoder:
+    """
+    Deterministic pseudo-random encoder for scale benchmarks
+    Every text maps to a fixed unit vector, so building large catalogs costs no model time.
+    It has no semantic quality: use the real encoder when measuring relevance.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+
+    def _encode(self, texts: List[str]) -> List[np.ndarray]:
+        embeddings = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:16], 16)
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            embeddings.append(vector / np.linalg.norm(vector))
+        return embeddings
+
+    def encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        return self._encode(queries)
+
+    def encode_documents(self, documents: List[str]) -> List[np.ndarray]:
+        return self._encode(documents)
+
+def load_catalog_items() -> Dict[RestaurantType, List[Dict]]:
+    """Load the bundled JSON catalogs"""
+    catalogs = {}
+    for restaurant_type, filename in CATALOG_FILES.items():
+        with open(filename, "r", encoding="utf-8") as file:
+            catalogs[restaurant_type] = json.load(file)
+    return catalogs
+
+def generate_catalog(size: int, restaurant_type: RestaurantType = RestaurantType.HAMBURGUESAS, seed: int = 42) -> List[Restaurant]:
+    """
+    Generate a synthetic catalog following the bundled JSON schema (name, address, score)
+    Brands, streets and municipalities are recombined from the real catalogs.
+    """
+    rng = random.Random(seed)
+    items = [item for catalog in load_catalog_items().values() for item in catalog]
+    brands = sorted({" ".join(item["name"].split()[:2]) for item in items})
+    streets = sorted({item["address"].split(",")[0] for item in items})
+    municipalities = sorted({item["address"].split(",")[1].strip() for item in items})
+
+    restaurants = []
+    for i in range(size):
+        municipality = rng.choice(municipalities)
+        street = f"{rng.choice(streets)} {i}"
+        restaurants.append(Restaurant(
+            name=f"{rng.choice(brands)} {municipality} {i}",
+            street=street,
+            municipality=municipality,
+            full_address=f"{street}, {municipality}, Santiago",
+            score=round(rng.uniform(1.0, 5.0), 1),
+            type=restaurant_type,
+        ))
+    return restaurants
+
+def quiet_logging():
+    """Silence per-query INFO logs so they don't skew timings"""
+    logging.getLogger("agent").setLevel(logging.WARNING)
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Return the q-th percentile (0-100) of samples"""
+    return float(np.percentile(np.asarray(samples), q)) if samples else 0.0
+
+def latency_summary(samples_ms: Sequence[float]) -> Dict:
+    """Summarize latency samples in milliseconds"""
+    total_seconds = sum(samples_ms) / 1000
+    return {
+        "count": len(samples_ms),
+        "p50_ms": percentile(samples_ms, 50),
+        "p95_ms": percentile(samples_ms, 95),
+        "p99_ms": percentile(samples_ms, 99),
+        "qps": len(samples_ms) / total_seconds if total_seconds else 0.0,
+    }
@@ -0,0 +1,100 @@
+"""
+Side-by-side latency and retrieval quality of the registered encoders
+
+For each encoder in agent.encoders: load time, single-query encode latency, document
+throughput, and a retrieval check over the bundled JSON catalogs. The check embeds every
+restaurant of a type, then asks "<brand> <comuna>" queries built from catalog entries and
+counts how often a restaurant of that brand in that comuna is among the k nearest.
+
+    python -m benchmarks.encoders
+    python -m benchmarks.encoders --encoders default minilm --queries 100 --output report.json
+
+Encoders whose optional dependencies are missing are reported with their error.
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+import numpy as np
+from agent.encoders import ENCODERS, create_encoder, encoder_dimension
+from agent.ingest import iter_restaurants
+from agent.numpy_search import NumpySearchEngine
+from benchmarks.common import CATALOG_FILES, latency_summary, quiet_logging
+
+def brand(name: str) -> str:
+    return " ".join(name.split()[:2]).lower()
+
+def build_quality_queries(restaurants, num_queries: int, seed: int = 7) -> List[Dict]:
+    """Brand + comuna queries, each with the restaurants that answer it"""
+    rng = random.Random(seed)
+    queries = []
+    for restaurant in rng.sample(restaurants, min(num_queries, len(restaurants))):
+        queries.append({
+            "text": f"{' '.join(restaurant.name.split()[:2])} {restaurant.municipality}",
+            "brand": brand(restaurant.name),
+            "municipality": restaurant.municipality,
+        })
+    return queries
+
+def benchmark_encoder(name: str, num_queries: int, k: int) -> Dict:
+    start = time.perf_counter()
+    try:
+        encoder = create_encoder(name)
+    except Exception as e:
+        return {"encoder": name, "error": str(e)}
+    load_seconds = time.perf_counter() - start
+    spec = ENCODERS[name]
+
+    hits = []
+    document_seconds = 0.0
+    documents = 0
+    query_samples = []
+    for restaurant_type, filename in CATALOG_FILES.items():
+        restaurants = list(iter_restaurants(filename, restaurant_type))
+        texts = [f"{r.name} {r.full_address}" for r in restaurants]
+        start = time.perf_counter()
+        embeddings = encoder.encode_documents(texts)
+        document_seconds += time.perf_counter() - start
+        documents += len(texts)
+        engine = NumpySearchEngine(restaurants, embeddings)
+
+        for query in build_quality_queries(restaurants, num_queries):
+            start = time.perf_counter()
+            vector = encoder.encode_queries([query["text"].lower()])[0]
+            query_samples.append((time.perf_counter() - start) * 1000)
+            results = engine.search([vector], limit=k)[0]
+            hits.append(any(
+                brand(r.name) == query["brand"] and r.municipality == query["municipality"] for r in results
+            ))
+
+    return {
+        "encoder": name,
+        "model": spec.model_name,
+        "dimension": encoder_dimension(encoder, spec.dimension),
+        "load_seconds": load_seconds,
+        "documents_per_second": documents / document_seconds if document_seconds else 0.0,
+        f"hit_rate_at_{k}": float(np.mean(hits)) if hits else 0.0,
+        "query_encode": latency_summary(query_samples),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encoders", nargs="+", choices=list(ENCODERS), default=list(ENCODERS))
+    parser.add_argument("--queries", type=int, default=50, help="Quality queries per catalog")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    quiet_logging()
+
+    report = {"k": args.k, "results": [benchmark_encoder(name, args.queries, args.k) for name in args.encoders]}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Filtered-search latency: exact municipality match (indexed) vs substring `like`
+
+    python -m benchmarks.filter_latency --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from agent.milvus_client import MilvusClient
+from benchmarks.common import HashEncoder, generate_catalog, latency_summary, quiet_logging
+
+def run(sizes, queries_per_size: int = 200):
+    report = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = MilvusClient(
+                db_path=os.path.join(tmp_dir, "bench.db"),
+                encoder=HashEncoder(),
+                # Measure the Milvus scalar filter, not the embedding cache or the NumPy engine
+                embedding_cache_size=1,
+                embedding_cache_ttl=0,
+                numpy_search_max_rows=0,
+            )
+            restaurants = generate_catalog(size)
+            collection_name = restaurants[0].type.value
+            client._initialize_collection(collection_name)
+            client._load_collection_in_memory(collection_name)
+            client._insert_restaurants(collection_name, restaurants)
+            # Seal segments so searches hit the built indexes
+            client.client.flush(collection_name)
+
+            municipalities = sorted({r.municipality for r in restaurants})
+            modes = (("exact", True), ("like", False))
+
+            def search(i, exact):
+                municipality = municipalities[i % len(municipalities)]
+                client.search_restaurants(
+                    query=f"restaurant {i} {municipality}",
+                    food_type=collection_name,
+                    location=municipality,
+                    exact_location=exact,
+                )
+
+            # Warm up loading and first-search costs in both modes before timing
+            for i in range(5):
+                for _, exact in modes:
+                    search(i, exact)
+
+            # Alternate the modes per query so neither pays for running first
+            samples = {mode: [] for mode, _ in modes}
+            for i in range(queries_per_size):
+                for mode, exact in modes:
+                    start = time.perf_counter()
+                    search(i, exact)
+                    samples[mode].append((time.perf_counter() - start) * 1000)
+            result = {"size": size, **{mode: latency_summary(values) for mode, values in samples.items()}}
+            report.append(result)
+            client.client.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.sizes, args.queries), indent=2))
+
+if __name__ == "__main__":
+    main()
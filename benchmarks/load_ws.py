@@ -0,0 +1,181 @@
+"""
+Load test of the /ws endpoint: N concurrent WebSocket clients replaying a weighted query mix
+
+By default the app is started in-process with uvicorn on a free port, backed by a Milvus
+Lite database in a temporary directory; pass --url to target a server that is already
+running instead.
+
+    python -m benchmarks.load_ws --concurrency 1 4 16 64 --duration 20
+    python -m benchmarks.load_ws --url ws://localhost:8000/ws --concurrency 8
+
+The mix combines the README examples with queries generated from the JSON catalogs
+(brand + comuna, best/worst rankings and a few queries with no results). Use
+--encoder hash to measure the serving path without the embedding model, and
+--disable-caches to run every query through the whole workflow.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+import websockets
+from benchmarks.common import HashEncoder, latency_summary, load_catalog_items, quiet_logging
+
+README_QUERIES = [
+    "Hamburguesas McDonald's en Puente Alto",
+    "Papas fritas Papa Johns en la comuna de Santiago",
+    "Completos Dominó Fuente de Soda Ñuñoa",
+    "los mejores y peores Completos Dominó Fuente de Soda Mall Plaza Norte",
+]
+
+# Relative weight of each kind of query in the mix
+README_WEIGHT = 4
+BRAND_WEIGHT = 2
+RANKING_WEIGHT = 1
+NO_RESULTS_WEIGHT = 1
+
+def build_query_mix(seed: int = 7, catalog_queries: int = 50) -> Tuple[List[str], List[int]]:
+    """Return the queries of the mix and their weights"""
+    rng = random.Random(seed)
+    queries = [(query, README_WEIGHT) for query in README_QUERIES]
+    for restaurant_type, items in load_catalog_items().items():
+        for item in rng.sample(items, min(catalog_queries, len(items))):
+            brand = " ".join(item["name"].split()[:2])
+            municipality = item["address"].split(",")[1].strip()
+            queries.append((f"{restaurant_type.value} {brand} en {municipality}", BRAND_WEIGHT))
+        municipality = rng.choice(items)["address"].split(",")[1].strip()
+        queries.append((f"los mejores y peores {restaurant_type.value} en {municipality}", RANKING_WEIGHT))
+    queries.extend((query, NO_RESULTS_WEIGHT) for query in ["sushi en Providencia", "papas fritas", "hola"])
+    return [query for query, _ in queries], [weight for _, weight in queries]
+
+def is_error(response: Dict) -> bool:
+    """Whether a /ws response reports a failure"""
+    return response.get("type") == "error" or response.get("explanation", "").startswith(
+        "Lo siento, ocurrió un error"
+    )
+
+async def run_client(url: str, queries: List[str], weights: List[int], deadline: float, seed: int, results: Dict):
+    """One connection sending queries back to back until the deadline"""
+    rng = random.Random(seed)
+    try:
+        async with websockets.connect(url, max_size=None) as websocket:
+            while time.perf_counter() < deadline:
+                query = rng.choices(queries, weights)[0]
+                start = time.perf_counter()
+                await websocket.send(json.dumps({"type": "query", "message": query}))
+                response = json.loads(await websocket.recv())
+                results["latencies_ms"].append((time.perf_counter() - start) * 1000)
+                if is_error(response):
+                    results["errors"] += 1
+    except Exception as e:
+        results["errors"] += 1
+        results["connection_errors"].append(str(e))
+
+async def run_level(url: str, concurrency: int, duration: float, queries: List[str], weights: List[int]) -> Dict:
+    """Run one concurrency level and summarize it"""
+    results = {"latencies_ms": [], "errors": 0, "connection_errors": []}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        run_client(url, queries, weights, deadline, seed, results) for seed in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    requests = len(results["latencies_ms"])
+    summary = latency_summary(results["latencies_ms"])
+    # latency_summary's qps is per connection; report the aggregate throughput instead
+    summary.pop("qps")
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": results["errors"],
+        "error_rate": results["errors"] / max(requests, 1),
+        "throughput_qps": requests / elapsed,
+        **summary,
+        "connection_errors": results["connection_errors"][:5],
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_local_server(db_path: str, encoder: str, disable_caches: bool = False, ready_timeout: float = 600) -> str:
+    """Serve main.app with uvicorn in a background thread and wait until /ready; returns the /ws URL"""
+    import uvicorn
+    import main
+    from agent.milvus_client import MilvusClient
+    from agent.restaurant_agent import RestaurantAgent
+
+    def create_agent():
+        # A TTL of zero expires entries immediately, so every query runs the full workflow
+        return RestaurantAgent(
+            milvus_client=MilvusClient(
+                db_path=db_path,
+                encoder=HashEncoder() if encoder == "hash" else None,
+                embedding_cache_ttl=0 if disable_caches else 3600,
+            ),
+            execution_mode=os.getenv("AGENT_EXECUTION_MODE", "threadpool"),
+            max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "4")),
+            response_cache_ttl=0 if disable_caches else None,
+        )
+
+    main.create_agent = create_agent
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready") as response:
+                if response.status == 200:
+                    return f"ws://127.0.0.1:{port}/ws"
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("The local server did not become ready in time")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="WebSocket URL of a running server (default: start one in-process)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per concurrency level")
+    parser.add_argument("--encoder", choices=["hash", "default"], default="default")
+    parser.add_argument("--disable-caches", action="store_true", help="Turn off the response and embedding caches of the in-process server")
+    parser.add_argument("--db-path", help="Milvus Lite database for the in-process server (default: temporary)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    quiet_logging()
+
+    queries, weights = build_query_mix()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = args.url or start_local_server(
+            args.db_path or os.path.join(tmp_dir, "load.db"), args.encoder, args.disable_caches
+        )
+        report = {
+            "url": url,
+            "encoder": None if args.url else args.encoder,
+            "caches": None if args.url else not args.disable_caches,
+            "duration": args.duration,
+            "levels": [
+                asyncio.run(run_level(url, concurrency, args.duration, queries, weights))
+                for concurrency in args.concurrency
+            ],
+        }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
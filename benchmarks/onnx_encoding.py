@@ -0,0 +1,97 @@
+"""
+Query encoding latency and throughput: batched float and int8 ONNX encoders vs DefaultEmbeddingFunction
+
+Encodes queries built from the bundled catalogs one at a time (the latency a single
+/ws query pays) and in batches (what the batch endpoints and the search coalescer send),
+for pymilvus' DefaultEmbeddingFunction (one inference per text) and for the batched default
+and int8 encoders at each requested thread count. Their embeddings are compared with the
+pymilvus ones by cosine similarity.
+Encoders that fail to load (no network access to the model hub, missing onnx package)
+are reported with their error.
+
+    python -m benchmarks.onnx_encoding
+    python -m benchmarks.onnx_encoding --threads 1 2 4 --batch-sizes 1 8 32 --output report.json
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+import numpy as np
+from pymilvus import model
+from agent.onnx_encoder import OnnxEncoder, QuantizedOnnxEncoder
+from benchmarks.common import latency_summary, load_catalog_items, quiet_logging
+
+def catalog_queries(limit: int) -> List[str]:
+    """Lower-cased "<brand> <comuna>" queries, like the parser passes to the encoder"""
+    queries = []
+    for items in load_catalog_items().values():
+        for item in items:
+            brand = " ".join(item["name"].split()[:2])
+            municipality = item["address"].split(",")[1].strip()
+            queries.append(f"{brand} {municipality}".lower())
+    return queries[:limit]
+
+def measure(encoder, queries: List[str], batch_sizes: List[int]) -> Dict:
+    # The first call pays one-off allocations, keep it out of the samples
+    encoder.encode_queries(queries[:1])
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        encoder.encode_queries([query])
+        samples.append((time.perf_counter() - start) * 1000)
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for offset in range(0, len(queries), batch_size):
+            encoder.encode_queries(queries[offset:offset + batch_size])
+        throughput[str(batch_size)] = len(queries) / (time.perf_counter() - start)
+    return {"single_query": latency_summary(samples), "queries_per_second_by_batch_size": throughput}
+
+def cosine_agreement(reference: List, candidate: List) -> Dict:
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    cosine = np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {"mean": float(cosine.mean()), "min": float(cosine.min())}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    quiet_logging()
+
+    queries = catalog_queries(args.queries)
+    results = []
+    reference = None
+    candidates = [("pymilvus_default", None, model.DefaultEmbeddingFunction)]
+    candidates += [("default", threads, lambda t=threads: OnnxEncoder.from_pretrained(num_threads=t, max_length=512)) for threads in args.threads]
+    candidates += [("onnx_int8", threads, lambda t=threads: QuantizedOnnxEncoder.from_pretrained(num_threads=t)) for threads in args.threads]
+    for name, threads, factory in candidates:
+        result = {"encoder": name, "threads": threads}
+        start = time.perf_counter()
+        try:
+            encoder = factory()
+        except Exception as e:
+            results.append({**result, "error": str(e)})
+            continue
+        result["load_seconds"] = time.perf_counter() - start
+        result.update(measure(encoder, queries, args.batch_sizes))
+        embeddings = encoder.encode_queries(queries)
+        if name == "pymilvus_default":
+            reference = embeddings
+        elif reference is not None:
+            result["cosine_vs_pymilvus_default"] = cosine_agreement(reference, embeddings)
+        results.append(result)
+
+    output = json.dumps({"queries": len(queries), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
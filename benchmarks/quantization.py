@@ -0,0 +1,166 @@
+"""
+Memory footprint and recall of compressed vector storage against IVF_FLAT
+
+Loads one synthetic catalog per vector type, then switches its index between IVF_FLAT,
+IVF_SQ8 and IVF_PQ. For each index it measures recall@k against exact brute-force
+neighbours and the search latency, and it estimates the bytes each vector takes in memory.
+
+    python -m benchmarks.quantization --size 100000 --output report.json
+    python -m benchmarks.quantization --uri http://localhost:19530 --vector-types float32 float16
+
+Milvus Lite only stores float32 vectors and only builds IVF_FLAT, so float16 storage, SQ8 and
+PQ are only measured against a Milvus server (--uri); on Lite they are reported as skipped.
+The report includes the estimated in-memory footprint and, on Lite, the database size on disk.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from agent.encoders import DEFAULT_ENCODER, create_encoder
+from agent.index_profiles import build_index_params
+from agent.milvus_client import MilvusClient, MilvusServerClient
+from benchmarks.common import HashEncoder, generate_catalog, latency_summary, quiet_logging
+from benchmarks.recall_latency import brute_force_top_k, build_query_set, document_matrix
+
+INDEX_PROFILES = ["ivf_flat", "ivf_sq8", "ivf_pq"]
+VECTOR_TYPES = ["float32", "float16"]
+
+def vector_bytes(index_type: str, params: Dict, dimension: int, vector_type: str) -> Dict:
+    """Estimated bytes per vector held by the index and by the raw embedding field"""
+    if index_type == "IVF_SQ8":
+        index_bytes = dimension
+    elif index_type == "IVF_PQ":
+        index_bytes = params["m"] * params["nbits"] // 8
+    else:
+        index_bytes = dimension * (2 if vector_type == "float16" else 4)
+    return {"index_bytes_per_vector": index_bytes, "raw_bytes_per_vector": dimension * (2 if vector_type == "float16" else 4)}
+
+def directory_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def benchmark_vector_type(
+    size: int, vector_type: str, profiles: List[str], encoder, num_queries: int, k: int, uri: Optional[str]
+) -> List[Dict]:
+    restaurants = generate_catalog(size)
+    collection_name = restaurants[0].type.value
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "quantization.db")
+        # Every query must hit Milvus: no query embedding cache and no in-process NumPy search
+        options = dict(
+            encoder=encoder,
+            embedding_cache_size=1,
+            embedding_cache_ttl=0,
+            numpy_search_max_rows=0,
+            index_profile=profiles[0],
+            vector_type=vector_type,
+        )
+        client = MilvusServerClient(uri=uri, pool_size=1, **options) if uri else MilvusClient(db_path=db_path, **options)
+        client._initialize_client()
+        if uri and client.client.has_collection(collection_name):
+            client.client.drop_collection(collection_name)
+
+        start = time.perf_counter()
+        client._initialize_collection(collection_name)
+        client._load_collection_in_memory(collection_name)
+        client._insert_restaurants(collection_name, restaurants)
+        client.client.flush(collection_name)
+        ingest_seconds = time.perf_counter() - start
+
+        names = [restaurant.name for restaurant in restaurants]
+        matrix = document_matrix(encoder, [f"{r.name} {r.full_address}" for r in restaurants], client.dimension)
+        queries = build_query_set(restaurants, num_queries)
+        query_vectors = encoder.encode_queries([" ".join(q.lower().split()) for q in queries])
+        ground_truth = [{names[i] for i in brute_force_top_k(matrix, np.asarray(v, dtype=np.float32), k)} for v in query_vectors]
+        del matrix
+
+        for profile in profiles:
+            client.index_profile = profile
+            start = time.perf_counter()
+            client.rebuild_index_if_needed(collection_name)
+            build_seconds = time.perf_counter() - start
+
+            for query in queries[:5]:
+                client.search_restaurants(query, food_type=collection_name, limit=k)
+
+            samples = []
+            recalls = []
+            for query, expected in zip(queries, ground_truth):
+                start = time.perf_counter()
+                hits = client.search_restaurants(query, food_type=collection_name, limit=k)
+                samples.append((time.perf_counter() - start) * 1000)
+                recalls.append(len({hit.name for hit in hits} & expected) / k)
+
+            index_info = client._get_index_info(collection_name)
+            # Milvus Lite doesn't report build params, so size the estimate from what we built
+            params = index_info["params"] or build_index_params(index_info["index_type"], size, client.dimension)
+            stored_type = client._vector_type(collection_name)
+            footprint = vector_bytes(index_info["index_type"], params, client.dimension, stored_type)
+            results.append({
+                "size": size,
+                "vector_type": stored_type,
+                "index_type": index_info["index_type"],
+                "index_params": params,
+                "ingest_seconds": ingest_seconds,
+                "build_seconds": build_seconds,
+                **footprint,
+                "estimated_index_mb": footprint["index_bytes_per_vector"] * size / 2**20,
+                "disk_mb": None if uri else directory_size(db_path) / 2**20,
+                f"recall_at_{k}": float(np.mean(recalls)),
+                **latency_summary(samples),
+            })
+
+        if uri:
+            client.client.drop_collection(collection_name)
+        else:
+            client.client.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_PROFILES, default=INDEX_PROFILES)
+    parser.add_argument("--vector-types", nargs="+", choices=VECTOR_TYPES, default=["float32"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--encoder", choices=["hash", "default"], default="hash")
+    parser.add_argument("--uri", help="Milvus server URI (default: a temporary Milvus Lite database)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    quiet_logging()
+
+    if "float16" in args.vector_types and not args.uri:
+        parser.error("float16 vectors need a Milvus server, pass --uri")
+
+    backend = MilvusServerClient if args.uri else MilvusClient
+    profiles = [p for p in args.index_types if p.upper() in backend.index_types]
+    encoder = HashEncoder() if args.encoder == "hash" else create_encoder(DEFAULT_ENCODER)
+    report = {
+        "encoder": args.encoder,
+        "backend": args.uri or "lite",
+        "k": args.k,
+        "skipped": sorted(set(args.index_types) - set(profiles)),
+        "results": [
+            result
+            for vector_type in args.vector_types
+            for result in benchmark_vector_type(
+                args.size, vector_type, profiles, encoder, args.queries, args.k, args.uri
+            )
+        ],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
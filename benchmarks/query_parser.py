@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of QueryParser keyword extraction: compiled single-pass matcher vs the
+previous nested substring loops, with the keyword lists grown to simulate more comunas,
+brands and synonyms.
+
+    python -m benchmarks.query_parser --extra-keywords 0 100 1000
+"""
+import argparse
+import json
+import re
+import time
+from typing import Optional, Tuple
+from agent.models import RestaurantType
+from agent.query_parser import QueryParser
+from benchmarks.common import latency_summary
+
+QUERIES = [
+    "Hamburguesas McDonald's en Puente Alto",
+    "Papas fritas Papa Johns en la comuna de Santiago",
+    "Completos Dominó Fuente de Soda Ñuñoa",
+    "los mejores y peores Completos Dominó Fuente de Soda Mall Plaza Norte",
+    "pizzas pizza hut providencia",
+    "burger king las condes",
+    "hot dogs baratos en maipu",
+    "mejores pizzas de la florida",
+]
+
+class LegacyQueryParser(QueryParser):
+    """QueryParser with the keyword loops used before the compiled matcher"""
+
+    def parse_query(self, query: str):
+        query_lower = query.lower()
+        new_query, food_type = self._extract_food_type(query_lower)
+        new_query, location = self._extract_location(new_query)
+        best_and_worst = self._check_ranking_filter(new_query)
+        return new_query, food_type, location, best_and_worst
+
+    def _extract_food_type(self, query_lower: str, matches=None) -> Tuple[str, Optional[RestaurantType]]:
+        for food_type, keywords in self.food_type_keywords.items():
+            for keyword in keywords:
+                if keyword in query_lower:
+                    new_query = re.sub(keyword, '', query_lower).strip()
+                    return new_query, food_type
+        return query_lower, None
+
+    def _extract_location(self, query_lower: str, matches=None) -> Tuple[str, Optional[str]]:
+        for pattern in (r'en\s+la\s+comuna\s+de\s+(.+)', r'en\s+(.+)'):
+            match = re.search(pattern, query_lower)
+            if match:
+                new_query = re.sub(pattern, '', query_lower).strip()
+                normalized_location = self._normalize_location(match.group(1).strip())
+                return f"{new_query} {normalized_location}".strip(), normalized_location
+        for location, aliases in self.location_keywords.items():
+            for alias in aliases:
+                if alias in query_lower:
+                    return query_lower, location
+        return query_lower, None
+
+    def _normalize_location(self, location: str) -> str:
+        location_lower = location.lower().strip()
+        for standard_location, aliases in self.location_keywords.items():
+            if location_lower in aliases or location_lower == standard_location:
+                return standard_location
+        return " ".join(word.title() for word in location.split())
+
+    def _check_ranking_filter(self, query: str, matches=None) -> bool:
+        query_lower = query.lower()
+        has_best = any(keyword in query_lower for keyword in self.ranking_keywords['best'])
+        has_worst = any(keyword in query_lower for keyword in self.ranking_keywords['worst'])
+        return has_best and has_worst
+
+def add_synthetic_keywords(parser: QueryParser, count: int):
+    """Grow the location list with synthetic comunas (never matched by the queries)"""
+    for i in range(count):
+        parser.location_keywords[f"Comuna Sintética {i}"] = [f"comuna sintetica {i}", f"comunasintetica{i}"]
+    parser._compile_keywords()
+
+def time_parser(parser: QueryParser, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            parser.parse_query(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return latency_summary(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--extra-keywords", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    report = []
+    for extra in args.extra_keywords:
+        compiled, legacy = QueryParser(), LegacyQueryParser()
+        add_synthetic_keywords(compiled, extra)
+        add_synthetic_keywords(legacy, extra)
+        report.append({
+            "extra_keywords": extra,
+            "compiled": time_parser(compiled, args.rounds),
+            "legacy": time_parser(legacy, args.rounds),
+            # Queries where the word-boundary matcher parses differently from the substring loops
+            "differences": [
+                {"query": q, "compiled": str(compiled.parse_query(q)), "legacy": str(legacy.parse_query(q))}
+                for q in QUERIES if compiled.parse_query(q) != legacy.parse_query(q)
+            ],
+        })
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Recall vs latency of each index type on synthetic catalogs
+
+Builds a catalog per size, switches its index with MilvusClient.rebuild_index_if_needed,
+runs a fixed query set through search_restaurants and compares the hits with exact
+brute-force results computed in NumPy.
+
+    python -m benchmarks.recall_latency --sizes 1000 100000 1000000 --output report.json
+    python -m benchmarks.recall_latency --uri http://localhost:19530 --index-types ivf_flat hnsw
+
+The default hash encoder keeps large builds cheap; pass --encoder with a registered
+encoder name (see agent.encoders) to use a real embedding model (slow for big catalogs).
+Approximate indexes are only measured against a Milvus server (--uri): Milvus Lite can't
+build HNSW, and it accepts IVF_FLAT but ignores nlist/nprobe and searches exactly, so on
+Lite both are reported as skipped with the reason. Ground truth keeps every document vector
+in memory, about 3 GB at 1M rows.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from agent.encoders import ENCODERS, create_encoder
+from agent.milvus_client import MilvusClient, MilvusServerClient
+from benchmarks.common import HashEncoder, generate_catalog, latency_summary, quiet_logging
+
+INDEX_PROFILES = ["flat", "ivf_flat", "hnsw"]
+
+# Index types Milvus Lite builds but doesn't use: its searches stay exact, so recall would read 1.0
+LITE_EXACT_INDEX_TYPES = ("IVF_FLAT",)
+
+def document_matrix(encoder, texts: List[str], dimension: int, batch_size: int = 1000) -> np.ndarray:
+    """Encode documents into a contiguous float32 matrix"""
+    matrix = np.empty((len(texts), dimension), dtype=np.float32)
+    for start in range(0, len(texts), batch_size):
+        batch = encoder.encode_documents(texts[start:start + batch_size])
+        matrix[start:start + len(batch)] = np.asarray(batch, dtype=np.float32)
+    return matrix
+
+def brute_force_top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """Exact L2 top-k row indices"""
+    distances = np.einsum("ij,ij->i", matrix, matrix) - 2 * matrix @ query
+    top = np.argpartition(distances, k)[:k]
+    return top[np.argsort(distances[top])]
+
+def build_query_set(restaurants, num_queries: int, seed: int = 7) -> List[str]:
+    """Fixed query set shaped like parser output: brand words plus a municipality"""
+    rng = random.Random(seed)
+    queries = []
+    for restaurant in rng.sample(restaurants, min(num_queries, len(restaurants))):
+        brand = " ".join(restaurant.name.split()[:2]).lower()
+        queries.append(f"{brand} {restaurant.municipality}")
+    return queries
+
+def skipped_profiles(profiles: List[str], uri: Optional[str]) -> Dict[str, str]:
+    """Profiles the backend can't measure, with the reason"""
+    backend = MilvusServerClient if uri else MilvusClient
+    skipped = {}
+    for profile in profiles:
+        if profile.upper() not in backend.index_types:
+            skipped[profile] = f"not built by the {backend.backend} backend"
+        elif not uri and profile.upper() in LITE_EXACT_INDEX_TYPES:
+            skipped[profile] = "exact (index ignored by Milvus Lite)"
+    return skipped
+
+def benchmark_size(size: int, profiles: List[str], encoder, num_queries: int, k: int, uri: Optional[str]) -> List[Dict]:
+    restaurants = generate_catalog(size)
+    collection_name = restaurants[0].type.value
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Every query must hit the encoder and Milvus, not the cache or the NumPy engine
+        options = dict(
+            encoder=encoder,
+            embedding_cache_size=1,
+            embedding_cache_ttl=0,
+            numpy_search_max_rows=0,
+            index_profile=profiles[0],
+        )
+        client = (
+            MilvusServerClient(uri=uri, pool_size=1, **options) if uri
+            else MilvusClient(db_path=os.path.join(tmp_dir, "bench.db"), **options)
+        )
+        client._initialize_client()
+        if uri and client.client.has_collection(collection_name):
+            client.client.drop_collection(collection_name)
+
+        start = time.perf_counter()
+        client._initialize_collection(collection_name)
+        client._load_collection_in_memory(collection_name)
+        client._insert_restaurants(collection_name, restaurants)
+        client.client.flush(collection_name)
+        ingest_seconds = time.perf_counter() - start
+
+        # Exact neighbours for every query, keyed by restaurant name (names are unique)
+        names = [restaurant.name for restaurant in restaurants]
+        matrix = document_matrix(encoder, [f"{r.name} {r.full_address}" for r in restaurants], client.dimension)
+        queries = build_query_set(restaurants, num_queries)
+        query_vectors = encoder.encode_queries([" ".join(q.lower().split()) for q in queries])
+        ground_truth = [{names[i] for i in brute_force_top_k(matrix, np.asarray(v, dtype=np.float32), k)} for v in query_vectors]
+        del matrix
+
+        for profile in profiles:
+            client.index_profile = profile
+            start = time.perf_counter()
+            client.rebuild_index_if_needed(collection_name)
+            build_seconds = time.perf_counter() - start
+
+            # Warm up caches and lazy loading before timing
+            for query in queries[:5]:
+                client.search_restaurants(query, food_type=collection_name, limit=k)
+
+            samples = []
+            recalls = []
+            for query, expected in zip(queries, ground_truth):
+                start = time.perf_counter()
+                hits = client.search_restaurants(query, food_type=collection_name, limit=k)
+                samples.append((time.perf_counter() - start) * 1000)
+                recalls.append(len({hit.name for hit in hits} & expected) / k)
+
+            index_info = client._get_index_info(collection_name)
+            results.append({
+                "size": size,
+                "index_type": index_info["index_type"],
+                "index_params": index_info["params"],
+                "ingest_seconds": ingest_seconds,
+                "build_seconds": build_seconds,
+                f"recall_at_{k}": float(np.mean(recalls)),
+                **latency_summary(samples),
+            })
+
+        if uri:
+            client.client.drop_collection(collection_name)
+        else:
+            client.client.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_PROFILES, default=INDEX_PROFILES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--encoder", choices=["hash", *ENCODERS], default="hash")
+    parser.add_argument("--uri", help="Milvus server URI (default: a temporary Milvus Lite database)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    quiet_logging()
+
+    skipped = skipped_profiles(args.index_types, args.uri)
+    profiles = [p for p in args.index_types if p not in skipped]
+    encoder = HashEncoder() if args.encoder == "hash" else create_encoder(args.encoder)
+    report = {
+        "encoder": args.encoder,
+        "backend": args.uri or "lite",
+        "k": args.k,
+        "skipped": skipped,
+        "results": [
+            result
+            for size in args.sizes if profiles
+            for result in benchmark_size(size, profiles, encoder, args.queries, args.k, args.uri)
+        ],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
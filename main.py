@@ -1,20 +1,125 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from typing import Optional
+import asyncio
 import json
+import logging
+import os
+import time
+from agent.metrics import REGISTRY
+from agent.models import BatchQueryRequest
 from agent.restaurant_agent import RestaurantAgent
+from agent.vector_store import VectorStore, vector_store_from_env
 
-app = FastAPI(title="Symmetrie Restaurant Agent", version="1.0.0")
+logger = logging.getLogger(__name__)
 
-# Initialize the restaurant agent
-restaurant_agent = RestaurantAgent()
+# AGENT_STARTUP_MODE: "background" accepts connections immediately and warms the agent in a
+# background task, "blocking" builds the agent before the server starts serving
+AGENT_STARTUP_MODE = os.getenv("AGENT_STARTUP_MODE", "background")
+# Seconds a /ws query waits for the agent to finish warming up before it is rejected
+AGENT_READY_TIMEOUT = float(os.getenv("AGENT_READY_TIMEOUT", "30"))
+# Largest number of queries accepted in one batch_query message or /query/batch request
+MAX_BATCH_QUERIES = int(os.getenv("AGENT_MAX_BATCH_QUERIES", "500"))
+
+# The restaurant agent, set once warm-up finishes
+restaurant_agent: Optional[RestaurantAgent] = None
+startup_error: Optional[str] = None
+REGISTRY.register_gauge("ready", lambda: 1.0 if restaurant_agent is not None else 0.0)
+
+def create_agent(milvus_client: Optional[VectorStore] = None) -> RestaurantAgent:
+    """Build the restaurant agent: loads the embedding model, opens the vector store and loads the data"""
+    # The vector store is configured by VECTOR_STORE_BACKEND and friends, see vector_store_from_env
+    # AGENT_EXECUTION_MODE: "threadpool" runs queries in a bounded worker pool, "inline" on the event loop
+    # AGENT_RANKING_MODE: "semantic" ranks the nearest hits of best/worst queries, "score" the whole comuna
+    # AGENT_COALESCE_WINDOW_MS: merge searches arriving within this window into one batch (0 disables it)
+    return RestaurantAgent(
+        milvus_client=milvus_client or vector_store_from_env(),
+        execution_mode=os.getenv("AGENT_EXECUTION_MODE", "threadpool"),
+        max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "4")),
+        ranking_mode=os.getenv("AGENT_RANKING_MODE", "semantic"),
+        coalesce_window_ms=float(os.getenv("AGENT_COALESCE_WINDOW_MS", "0")),
+        coalesce_max_batch=int(os.getenv("AGENT_COALESCE_MAX_BATCH", "64")),
+    )
+
+async def warm_up_agent():
+    """Build the agent in a worker thread so the event loop keeps serving requests"""
+    global restaurant_agent, startup_error
+    start_time = time.perf_counter()
+    try:
+        restaurant_agent = await asyncio.to_thread(create_agent)
+        logger.info(f"Restaurant agent ready in {time.perf_counter() - start_time:.2f}s")
+    except Exception as e:
+        startup_error = str(e)
+        logger.error(f"Failed to initialize restaurant agent: {e}")
+
+async def get_agent(timeout: float) -> Optional[RestaurantAgent]:
+    """Return the agent, waiting up to timeout seconds for warm-up to finish"""
+    deadline = time.monotonic() + timeout
+    while restaurant_agent is None and startup_error is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return restaurant_agent
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global restaurant_agent
+    warm_up_task = None
+    if restaurant_agent is None:
+        if AGENT_STARTUP_MODE == "blocking":
+            # Fail the startup if the agent can't be built, as before
+            restaurant_agent = await asyncio.to_thread(create_agent)
+        else:
+            warm_up_task = asyncio.create_task(warm_up_agent())
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+
+app = FastAPI(title="Symmetrie Restaurant Agent", version="1.0.0", lifespan=lifespan)
 
 @app.get("/")
 async def get():
     return FileResponse("home.html")
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the agent can serve queries, 503 while warming up or after a failed startup"""
+    if restaurant_agent is not None:
+        return {"status": "ready"}
+    if startup_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_error})
+    return JSONResponse(status_code=503, content={"status": "starting"})
+
+@app.get("/stats")
+async def stats():
+    if restaurant_agent is None:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return restaurant_agent.get_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: node, embedding and Milvus latencies, cache ratios and in-flight work"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/query/batch")
+async def query_batch(request: BatchQueryRequest):
+    """Resolve many queries at once; responses are returned in the order of the messages"""
+    if len(request.messages) > MAX_BATCH_QUERIES:
+        return JSONResponse(status_code=400, content={"error": f"At most {MAX_BATCH_QUERIES} messages per batch."})
+    agent = await get_agent(AGENT_READY_TIMEOUT)
+    if agent is None:
+        return JSONResponse(status_code=503, content={"status": "failed" if startup_error else "starting"})
+    return {"type": "batch_response", "responses": await agent.process_queries(request.messages)}
+
+async def stream_query(websocket: WebSocket, agent: RestaurantAgent, user_message: str):
+    """Send partial results as workflow nodes finish, then the final response"""
+    async for event in agent.stream_query(user_message):
+        await websocket.send_text(json.dumps(event))
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    # Streamed query in progress, run as a task so a "cancel" message can stop it
+    stream_task: Optional[asyncio.Task] = None
     
     try:
         while True:
@@ -23,20 +128,73 @@ async def websocket_endpoint(websocket: WebSocket):
             
             try:
                 message = json.loads(data)
+
+                if message.get("type") == "cancel":
+                    # Always acknowledged; "stopped" tells whether a streamed query was running
+                    stopped = stream_task is not None and not stream_task.done()
+                    if stopped:
+                        stream_task.cancel()
+                        # Wait for the task so no event is sent after the acknowledgement
+                        await asyncio.gather(stream_task, return_exceptions=True)
+                    await websocket.send_text(json.dumps({"type": "cancelled", "stopped": stopped}))
+                    continue
+
+                # Other messages are answered after the streamed query, keeping responses in order
+                if stream_task is not None:
+                    await asyncio.gather(stream_task, return_exceptions=True)
+                    stream_task = None
                 
                 if message.get("type") == "query":
                     user_message = message.get("message", "")
+
+                    # Queries received during warm-up wait for the agent, up to a limit
+                    agent = await get_agent(AGENT_READY_TIMEOUT)
+                    if agent is None:
+                        await websocket.send_text(json.dumps({
+                            "type": "error",
+                            "message": "Agent is not ready yet. Please retry shortly."
+                        }))
+                        continue
+
+                    if message.get("stream"):
+                        stream_task = asyncio.create_task(stream_query(websocket, agent, user_message))
+                        continue
                     
                     # Process the query through the agent
-                    response = await restaurant_agent.process_query(user_message)
+                    response = await agent.process_query(user_message)
                     
                     # Send response back to client
                     await websocket.send_text(json.dumps(response))
+
+                elif message.get("type") == "batch_query":
+                    user_messages = message.get("messages")
+                    if (
+                        not isinstance(user_messages, list)
+                        or not all(isinstance(m, str) for m in user_messages)
+                        or len(user_messages) > MAX_BATCH_QUERIES
+                    ):
+                        await websocket.send_text(json.dumps({
+                            "type": "error",
+                            "message": f"Expected 'messages' to be a list of at most {MAX_BATCH_QUERIES} queries."
+                        }))
+                        continue
+
+                    agent = await get_agent(AGENT_READY_TIMEOUT)
+                    if agent is None:
+                        await websocket.send_text(json.dumps({
+                            "type": "error",
+                            "message": "Agent is not ready yet. Please retry shortly."
+                        }))
+                        continue
+
+                    # Responses are returned in the order of the messages
+                    responses = await agent.process_queries(user_messages)
+                    await websocket.send_text(json.dumps({"type": "batch_response", "responses": responses}))
                 
                 else:
                     await websocket.send_text(json.dumps({
                         "type": "error",
-                        "message": "Invalid message type. Expected 'query'."
+                        "message": "Invalid message type. Expected 'query' or 'batch_query'."
                     }))
                     
             except json.JSONDecodeError:
@@ -47,6 +205,9 @@ async def websocket_endpoint(websocket: WebSocket):
                 
     except WebSocketDisconnect:
         print("WebSocket disconnected")
+    finally:
+        if stream_task is not None:
+            stream_task.cancel()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,161 @@
+"""
+Multi-process server: one preloaded model and N workers sharing a read-only vector snapshot
+
+Running main.py under several uvicorn workers gives every worker its own model copy and its
+own handle on the same Milvus Lite file. Here a single ingest process owns writes and exports a
+snapshot (agent.snapshot); this process loads the encoder and maps the snapshot once, binds the
+port, and forks the workers. The workers share the model weights copy-on-write and the
+embeddings through the page cache, and accept connections from the same socket.
+
+    python -m agent.ingest --snapshot ./snapshot
+    python serve.py --workers 4 --snapshot ./snapshot
+
+    # Ingest and serve in one command
+    python serve.py --workers 4 --snapshot ./snapshot --ingest
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict
+import uvicorn
+import main
+from agent.encoders import DEFAULT_ENCODER, ENCODERS, create_encoder
+from agent.ingest import write_snapshot_from_catalogs
+from agent.vector_store import VectorStore, vector_store_from_env
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A worker that exits sooner than this after starting is failing, not crashing; don't respawn it
+MIN_WORKER_UPTIME = 5.0
+
+def single_threaded_sessions(encoder):
+    """
+    Rebuild the encoder's ONNX Runtime session with one intra-op thread
+    Thread pools don't survive fork: a child running a session created with several threads
+    waits on workers that only exist in the parent. Each process runs on its own core instead.
+    """
+    import onnxruntime
+    from agent.onnx_encoder import open_session
+
+    for attribute in ("ort_session", "session"):
+        session = getattr(encoder, attribute, None)
+        if not isinstance(session, onnxruntime.InferenceSession):
+            continue
+        if session.get_session_options().intra_op_num_threads == 1:
+            continue
+        model_path = getattr(encoder, "model_path", None)
+        if model_path is None:
+            logger.warning(f"Can't rebuild the {attribute} of {type(encoder).__name__} single-threaded: its model path is unknown")
+            continue
+        setattr(encoder, attribute, open_session(model_path, num_threads=1))
+    return encoder
+
+def preload_encoder(encoder_name: str = DEFAULT_ENCODER):
+    """Load the encoder once in the parent so every worker shares its weights"""
+    # Hugging Face tokenizers disable their own thread pool after fork, with a warning per worker
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    return single_threaded_sessions(create_encoder(encoder_name))
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by every worker"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(sock: socket.socket, store: VectorStore, log_level: str = "info"):
+    """Serve main.app on the shared socket with an agent over the preloaded store"""
+    main.restaurant_agent = main.create_agent(store)
+    server = uvicorn.Server(uvicorn.Config(main.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+def serve(sock: socket.socket, store: VectorStore, workers: int, log_level: str = "info"):
+    """Fork the workers and replace the ones that crash until SIGINT or SIGTERM"""
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Multi-process serving needs os.fork; run main.py on this platform")
+    # Move everything loaded so far out of the collector's reach, so collections in the
+    # workers don't write to (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    started: Dict[int, float] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                run_worker(sock, store, log_level)
+            except BaseException:
+                logger.exception("Worker failed")
+                code = 1
+            finally:
+                os._exit(code)
+        started[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(started):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+
+    while started:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        uptime = time.monotonic() - started.pop(pid, time.monotonic())
+        if stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)} after {uptime:.1f}s")
+        if uptime < MIN_WORKER_UPTIME:
+            logger.error("Worker failed during startup, stopping the server")
+            stop(signal.SIGTERM, None)
+        else:
+            spawn()
+    sock.close()
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--snapshot", default=os.getenv("VECTOR_STORE_SNAPSHOT", "./snapshot"))
+    parser.add_argument("--ingest", action="store_true", help="Embed the catalogs and write the snapshot before serving")
+    parser.add_argument("--encoder", choices=list(ENCODERS), default=os.getenv("EMBEDDING_MODEL", DEFAULT_ENCODER))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    encoder = preload_encoder(args.encoder)
+    if args.ingest:
+        write_snapshot_from_catalogs(args.snapshot, encoder, args.encoder, os.getenv("EMBEDDING_STORE_PATH") or None)
+
+    # The memory backend over the snapshot; other VECTOR_STORE_* settings still apply
+    os.environ["VECTOR_STORE_BACKEND"] = "memory"
+    store = vector_store_from_env(encoder=encoder, encoder_name=args.encoder, snapshot_path=args.snapshot)
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Serving snapshot {args.snapshot} on {args.host}:{args.port} with {args.workers} workers")
+    serve(sock, store, args.workers, args.log_level)
+
+if __name__ == "__main__":
+    main_cli()
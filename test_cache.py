@@ -0,0 +1,68 @@
+import threading
+import time
+from agent.cache import LRUCache
+
+
+class TestLRUCache:
+    """Test suite for LRUCache"""
+
+    def test_get_missing_key(self):
+        """Test that a missing key returns None and counts a miss"""
+        cache = LRUCache(max_size=2)
+        assert cache.get("pizza hut providencia") is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_put_and_get(self):
+        """Test that stored values are returned and count a hit"""
+        cache = LRUCache(max_size=2)
+        cache.put("mcdonald's puente alto", [0.1, 0.2])
+        assert cache.get("mcdonald's puente alto") == [0.1, 0.2]
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["hit_ratio"] == 1.0
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted when full"""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiration(self):
+        """Test that entries expire after the configured ttl"""
+        cache = LRUCache(max_size=2, ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_clear(self):
+        """Test that clear removes all entries"""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.clear()
+        assert cache.get("a") is None
+
+    def test_concurrent_access(self):
+        """Test that concurrent writers never grow the cache past max_size"""
+        cache = LRUCache(max_size=50)
+
+        def writer(offset):
+            for i in range(500):
+                cache.put(offset + i, i)
+                cache.get(offset + i)
+
+        threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cache) == 50
+        assert cache.get_stats()["hits"] + cache.get_stats()["misses"] == 4000
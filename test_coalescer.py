@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+import pytest
+from agent.coalescer import SearchCoalescer
+
+
+def batch_store():
+    """Mock vector store echoing each request's query and location"""
+    store = Mock()
+    store.search_restaurants_batch.side_effect = lambda requests: [
+        [f"{request['query']}|{request['location']}"] for request in requests
+    ]
+    return store
+
+
+class TestSearchCoalescer:
+    """Test suite for the micro-batching search coalescer"""
+
+    def test_concurrent_searches_share_a_batch(self):
+        """Test that searches arriving together become one batch call, each caller getting its own result"""
+        store = batch_store()
+        coalescer = SearchCoalescer(store, window_ms=200, max_batch=8)
+        barrier = threading.Barrier(8)
+
+        def search(i):
+            barrier.wait(timeout=5)
+            return coalescer.search_restaurants(f"query {i}", food_type="Pizzas", location=f"comuna {i}")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(search, range(8)))
+        coalescer.close()
+
+        assert results == [[f"query {i}|comuna {i}"] for i in range(8)]
+        assert store.search_restaurants_batch.call_count == 1
+        assert coalescer.get_stats()["largest_batch"] == 8
+
+    def test_max_batch_splits_calls(self):
+        """Test that a full batch is sent without waiting for the window"""
+        store = batch_store()
+        coalescer = SearchCoalescer(store, window_ms=200, max_batch=2)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda i: coalescer.search_restaurants(f"q{i}"), range(4)))
+        coalescer.close()
+
+        assert results == [[f"q{i}|None"] for i in range(4)]
+        assert all(len(call.args[0]) <= 2 for call in store.search_restaurants_batch.call_args_list)
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed batch raises in each waiting caller and the dispatcher keeps running"""
+        store = batch_store()
+        coalescer = SearchCoalescer(store, window_ms=1)
+        store.search_restaurants_batch.side_effect = RuntimeError("Vector database search failed")
+        with pytest.raises(RuntimeError, match="search failed"):
+            coalescer.search_restaurants("hamburguesas")
+
+        store.search_restaurants_batch.side_effect = lambda requests: [["ok"] for _ in requests]
+        assert coalescer.search_restaurants("hamburguesas") == ["ok"]
+        coalescer.close()
+
+    def test_closed_coalescer_rejects_searches(self):
+        """Test that searches after close fail instead of waiting forever"""
+        coalescer = SearchCoalescer(batch_store())
+        coalescer.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            coalescer.search_restaurants("pizzas")
@@ -0,0 +1,130 @@
+import os
+import threading
+from unittest.mock import Mock
+import numpy as np
+from agent.embedding_store import EmbeddingStore, text_key
+from agent.milvus_client import MilvusClient
+
+
+class TestEmbeddingStore:
+    """Test suite for the persistent embedding store"""
+
+    def test_put_and_get(self, tmp_path):
+        """Test that stored embeddings are returned by key"""
+        store = EmbeddingStore(str(tmp_path), dimension=4)
+        keys = [text_key("McDonald's Av. Concha y Toro 1149, Puente Alto"), text_key("Papa Johns Ñuñoa")]
+        vectors = [np.arange(4, dtype=np.float32), np.ones(4, dtype=np.float32)]
+
+        assert store.put_many(keys, vectors) == 2
+        found = store.get_many(keys + [text_key("missing")])
+        assert set(found) == set(keys)
+        np.testing.assert_array_equal(found[keys[0]], vectors[0])
+
+    def test_existing_keys_are_not_duplicated(self, tmp_path):
+        """Test that putting a stored key again writes nothing"""
+        store = EmbeddingStore(str(tmp_path), dimension=4)
+        store.put_many(["a"], [np.zeros(4)])
+        assert store.put_many(["a", "a"], [np.ones(4), np.ones(4)]) == 0
+        assert len(store) == 1
+
+    def test_persists_across_reopen(self, tmp_path):
+        """Test that a new store instance reads previous rows from disk"""
+        EmbeddingStore(str(tmp_path), dimension=4).put_many(["a", "b"], [np.zeros(4), np.ones(4)])
+        reopened = EmbeddingStore(str(tmp_path), dimension=4)
+        assert len(reopened) == 2
+        np.testing.assert_array_equal(reopened.get_many(["b"])["b"], np.ones(4))
+
+    def test_models_use_separate_files(self, tmp_path):
+        """Test that embeddings from different models don't mix"""
+        EmbeddingStore(str(tmp_path), dimension=4, model_name="GPTCache/paraphrase-albert-onnx").put_many(["a"], [np.ones(4)])
+        other = EmbeddingStore(str(tmp_path), dimension=4, model_name="all-MiniLM-L6-v2")
+        assert other.get_many(["a"]) == {}
+
+    def test_recovers_from_interrupted_write(self, tmp_path):
+        """Test that matrix rows without an index entry are dropped on open"""
+        store = EmbeddingStore(str(tmp_path), dimension=4)
+        store.put_many(["a"], [np.ones(4)])
+        # Simulate a crash after the matrix write but before the index write
+        with open(store.matrix_path, "ab") as file:
+            file.write(np.zeros(4, dtype=np.float32).tobytes())
+
+        reopened = EmbeddingStore(str(tmp_path), dimension=4)
+        assert len(reopened) == 1
+        assert os.path.getsize(reopened.matrix_path) == 16
+        reopened.put_many(["b"], [np.full(4, 2.0)])
+        np.testing.assert_array_equal(reopened.get_many(["b"])["b"], np.full(4, 2.0))
+
+    def test_stores_sharing_a_path(self, tmp_path):
+        """Test that a store picks up rows another store on the same path appended before writing"""
+        first = EmbeddingStore(str(tmp_path), dimension=4)
+        second = EmbeddingStore(str(tmp_path), dimension=4)
+        first.put_many(["x"], [np.ones(4)])
+
+        assert second.put_many(["x", "y"], [np.ones(4), np.full(4, 2.0)]) == 1
+        np.testing.assert_array_equal(second.get_many(["y"])["y"], np.full(4, 2.0))
+        np.testing.assert_array_equal(second.get_many(["x"])["x"], np.ones(4))
+        assert first.put_many(["y"], [np.zeros(4)]) == 0
+        np.testing.assert_array_equal(first.get_many(["y"])["y"], np.full(4, 2.0))
+
+    def test_drops_partial_index_line(self, tmp_path):
+        """Test that a hash cut short by an interrupted write is not read as a key"""
+        store = EmbeddingStore(str(tmp_path), dimension=4)
+        store.put_many(["a"], [np.ones(4)])
+        with open(store.matrix_path, "ab") as file:
+            file.write(np.zeros(4, dtype=np.float32).tobytes())
+        with open(store.index_path, "a", encoding="ascii") as file:
+            file.write("b")
+
+        reopened = EmbeddingStore(str(tmp_path), dimension=4)
+        assert reopened.put_many(["c"], [np.full(4, 3.0)]) == 1
+        assert reopened.get_many(["b"]) == {}
+        np.testing.assert_array_equal(reopened.get_many(["c"])["c"], np.full(4, 3.0))
+        assert len(EmbeddingStore(str(tmp_path), dimension=4)) == 2
+
+
+class TestMilvusClientEmbeddingStore:
+    """Test suite for the embedding store in MilvusClient document encoding"""
+
+    def test_only_missing_documents_are_encoded(self, tmp_path):
+        """Test that a second client reuses the stored embeddings"""
+        encoder = Mock()
+        encoder.model_name = "test-model"
+        encoder.encode_documents.side_effect = lambda texts: [np.full(768, len(t), dtype=np.float32) for t in texts]
+        texts = ["McDonald's Puente Alto", "Papa Johns Santiago"]
+
+        first = MilvusClient(encoder=encoder, embedding_store_path=str(tmp_path))
+        first._encode_documents(texts)
+
+        encoder.encode_documents.reset_mock()
+        second = MilvusClient(encoder=encoder, embedding_store_path=str(tmp_path))
+        embeddings = second._encode_documents(texts + ["Dominó Ñuñoa"])
+
+        encoder.encode_documents.assert_called_once_with(["Dominó Ñuñoa"])
+        assert [float(e[0]) for e in embeddings] == [len(t) for t in texts + ["Dominó Ñuñoa"]]
+
+    def test_concurrent_reads_during_writes(self, tmp_path):
+        """Test that readers never see index entries for rows the matrix doesn't map yet"""
+        store = EmbeddingStore(str(tmp_path), dimension=4)
+        keys = [f"key-{i}" for i in range(400)]
+        errors = []
+        done = threading.Event()
+
+        def read():
+            try:
+                while not done.is_set():
+                    for key, vector in store.get_many(keys).items():
+                        assert vector[0] == int(key.split("-")[1])
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for start in range(0, len(keys), 2):
+            store.put_many(keys[start:start + 2], [np.full(4, i, dtype=np.float32) for i in range(start, start + 2)])
+        done.set()
+        for reader in readers:
+            reader.join()
+
+        assert errors == []
+        assert len(store.get_many(keys)) == len(keys)
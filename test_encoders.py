@@ -0,0 +1,59 @@
+from unittest.mock import Mock, patch
+import pytest
+from agent.encoders import DEFAULT_ENCODER, ENCODERS, create_encoder, encoder_dimension, register_encoder
+from agent.milvus_client import MilvusClient
+
+
+class TestEncoderRegistry:
+    """Test suite for the encoder registry"""
+
+    @pytest.fixture
+    def tiny_encoder(self):
+        """Register a 4-dimension encoder for the duration of a test"""
+        encoder = Mock(dim=4)
+        register_encoder("tiny", "test/tiny", 4, lambda: encoder)
+        yield encoder
+        del ENCODERS["tiny"]
+
+    def test_builtin_encoders(self):
+        """Test that the default and MiniLM encoders are registered with their dimensions"""
+        assert ENCODERS[DEFAULT_ENCODER].dimension == 768
+        assert ENCODERS["minilm"].dimension == 384
+
+    def test_unknown_encoder(self):
+        """Test that unknown names are rejected by the registry and the vector stores"""
+        with pytest.raises(ValueError, match="Unknown encoder"):
+            create_encoder("word2vec")
+        with pytest.raises(ValueError, match="Unknown encoder"):
+            MilvusClient(encoder_name="word2vec")
+
+    def test_missing_dependency(self):
+        """Test that a missing optional dependency is reported with the encoder name"""
+        register_encoder("broken", "test/broken", 8, Mock(side_effect=ImportError("No module named 'torch'")))
+        try:
+            with pytest.raises(RuntimeError, match="Encoder 'broken' needs an optional dependency"):
+                create_encoder("broken")
+        finally:
+            del ENCODERS["broken"]
+
+    def test_dimension_from_encoder(self):
+        """Test that the encoder's dim wins over the registered default"""
+        assert encoder_dimension(Mock(dim=384), 768) == 384
+        assert encoder_dimension(Mock(spec=["encode_queries"]), 768) == 768
+
+    def test_schema_and_collections_follow_encoder(self, tiny_encoder):
+        """Test that a non-default encoder sets the dimension and versions the collection names"""
+        client = MilvusClient(encoder_name="tiny")
+        assert client.encoder is tiny_encoder
+        assert client.dimension == 4
+        assert client._collection_for("Pizzas") == ("Pizzas_tiny_4", None)
+        client.unified_collection = True
+        assert client._collection_for("Pizzas") == ("Restaurants_tiny_4", ["Pizzas"])
+
+    def test_default_encoder_keeps_collection_names(self):
+        """Test that existing collections are still used with the default encoder"""
+        with patch("agent.encoders.OnnxEncoder.from_pretrained") as default:
+            default.return_value.dim = 768
+            client = MilvusClient()
+        assert client._collection_for("Pizzas") == ("Pizzas", None)
+        assert client.dimension == 768
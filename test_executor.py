@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+import pytest
+from agent.executor import WorkflowExecutor
+
+
+class TestWorkflowExecutor:
+    """Test suite for WorkflowExecutor"""
+
+    def test_invalid_mode(self):
+        """Test that unknown execution modes are rejected"""
+        with pytest.raises(ValueError):
+            WorkflowExecutor(mode="processpool")
+
+    @pytest.mark.asyncio
+    async def test_inline_mode_runs_on_caller_thread(self):
+        """Test that inline mode runs the function without a worker thread"""
+        executor = WorkflowExecutor(mode="inline")
+        thread_name = await executor.run(lambda: threading.current_thread().name)
+        assert thread_name == threading.current_thread().name
+        assert executor.get_stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_threadpool_mode_does_not_block_event_loop(self):
+        """Test that a slow call doesn't stop other coroutines from running"""
+        executor = WorkflowExecutor(mode="threadpool", max_concurrency=2)
+        ticks = []
+        start = time.monotonic()
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(executor.run(time.sleep, 0.1), ticker())
+        # The ticker must run while the worker sleeps, not after it
+        assert len(ticks) == 5
+        assert ticks[0] - start < 0.05
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_and_queue_depth(self):
+        """Test that at most max_concurrency calls run at once and the rest are queued"""
+        executor = WorkflowExecutor(mode="threadpool", max_concurrency=2)
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def work():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+        await asyncio.gather(*[executor.run(work) for _ in range(6)])
+        stats = executor.get_stats()
+
+        assert max(peak) <= 2
+        assert stats["completed"] == 6
+        assert stats["queue_depth"] == 0
+        assert stats["in_flight"] == 0
+        assert stats["max_queue_depth"] >= 4
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_and_raised(self):
+        """Test that exceptions propagate to the caller and are counted"""
+        executor = WorkflowExecutor(mode="threadpool", max_concurrency=1)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await executor.run(fail)
+        assert executor.get_stats()["failed"] == 1
+        executor.shutdown()
@@ -0,0 +1,61 @@
+import io
+import json
+import pytest
+from agent.ingest import _iter_json_array, content_hash, iter_json_records, iter_restaurants
+from agent.models import RestaurantType
+
+
+RECORDS = [
+    {"name": "Melt Pizza Las Condes", "address": "Av. Apoquindo 4501, Las Condes, Santiago", "score": 4.8},
+    {"name": "Papa Johns Ñuñoa", "address": "Av. Irarrázaval 2401, Ñuñoa, Santiago", "score": 3.7},
+    {"name": 'Pizza "Hut" ], Centro', "address": "Ahumada 1, Santiago Centro", "score": 4.0},
+]
+
+
+class TestIngest:
+    """Test suite for streaming catalog ingestion helpers"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+    def test_json_array_streaming(self, chunk_size):
+        """Test that array elements are decoded across chunk boundaries"""
+        text = json.dumps(RECORDS, ensure_ascii=False, indent=2)
+        assert list(_iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == RECORDS
+
+    def test_json_array_empty(self):
+        """Test that an empty array yields nothing"""
+        assert list(_iter_json_array(io.StringIO(" [ ] "))) == []
+
+    def test_json_array_truncated(self):
+        """Test that a truncated file raises instead of silently dropping records"""
+        text = json.dumps(RECORDS)[:-20]
+        with pytest.raises(ValueError):
+            list(_iter_json_array(io.StringIO(text), chunk_size=8))
+
+    def test_not_an_array(self):
+        """Test that non-array files are rejected"""
+        with pytest.raises(ValueError):
+            list(_iter_json_array(io.StringIO('{"name": "x"}')))
+
+    def test_jsonl_records(self, tmp_path):
+        """Test that JSONL files are read line by line"""
+        path = tmp_path / "pizzas.jsonl"
+        path.write_text("\n".join(json.dumps(r) for r in RECORDS) + "\n\n", encoding="utf-8")
+        assert list(iter_json_records(str(path))) == RECORDS
+
+    def test_iter_restaurants(self, tmp_path):
+        """Test that records become restaurants with street and municipality"""
+        path = tmp_path / "pizzas.json"
+        path.write_text(json.dumps(RECORDS), encoding="utf-8")
+        restaurants = list(iter_restaurants(str(path), RestaurantType.PIZZAS))
+        assert restaurants[1].municipality == "Ñuñoa"
+        assert restaurants[1].street == "Av. Irarrázaval 2401"
+        assert restaurants[1].type == RestaurantType.PIZZAS
+
+    def test_content_hash_changes_with_score(self, tmp_path):
+        """Test that the content hash detects changed records"""
+        path = tmp_path / "pizzas.json"
+        changed = [dict(RECORDS[0], score=4.7)]
+        path.write_text(json.dumps([RECORDS[0]] + changed), encoding="utf-8")
+        original, updated = iter_restaurants(str(path), RestaurantType.PIZZAS)
+        assert content_hash(original) != content_hash(updated)
+        assert content_hash(original) == content_hash(original.model_copy())
@@ -0,0 +1,72 @@
+import math
+import pytest
+from agent.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Test suite for the Prometheus metrics registry"""
+
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry(namespace="test", window=100)
+
+    def test_summary_quantiles(self, registry):
+        """Test that quantiles are computed over recorded samples"""
+        for value in range(1, 101):
+            registry.observe("latency_seconds", value / 100, node="parse_query")
+
+        summary = registry.get_summary("latency_seconds", node="parse_query")
+        assert summary["count"] == 100
+        assert summary["p50"] == pytest.approx(0.51)
+        assert summary["p99"] == pytest.approx(1.0)
+        assert math.isnan(registry.get_summary("latency_seconds", node="other")["p50"])
+
+    def test_window_keeps_recent_samples(self, registry):
+        """Test that quantiles follow the sliding window while count covers every sample"""
+        for _ in range(100):
+            registry.observe("latency_seconds", 10.0)
+        for _ in range(100):
+            registry.observe("latency_seconds", 1.0)
+
+        summary = registry.get_summary("latency_seconds")
+        assert summary["count"] == 200
+        assert summary["p99"] == 1.0
+
+    def test_timer_counts_errors(self, registry):
+        """Test that failed blocks are timed and counted as errors"""
+        with pytest.raises(RuntimeError):
+            with registry.timer("search_seconds", operation="search"):
+                raise RuntimeError("Vector database search failed")
+
+        assert registry.get_summary("search_seconds", operation="search")["count"] == 1
+        assert registry.get_counter("search_seconds_errors_total", operation="search") == 1
+
+    def test_timed_decorator(self, registry):
+        """Test that decorated functions are timed and keep their return value"""
+        @registry.timed("node_seconds", node="parse_query")
+        def parse(query):
+            return query.lower()
+
+        assert parse("Pizzas") == "pizzas"
+        assert registry.get_summary("node_seconds", node="parse_query")["count"] == 1
+
+    def test_render_prometheus_format(self, registry):
+        """Test the text exposition format of every metric type"""
+        registry.observe("node_seconds", 0.5, node="parse_query")
+        registry.inc("queries_total", 3, mode="batch")
+        registry.register_gauge("cache_hit_ratio", lambda: 0.75, cache="response")
+        registry.register_gauge("broken", lambda: 1 / 0)
+
+        text = registry.render()
+        assert "# TYPE test_node_seconds summary" in text
+        assert 'test_node_seconds{node="parse_query",quantile="0.95"} 0.5' in text
+        assert 'test_node_seconds_count{node="parse_query"} 1' in text
+        assert 'test_queries_total{mode="batch"} 3.0' in text
+        assert 'test_cache_hit_ratio{cache="response"} 0.75' in text
+        # A failing gauge is skipped instead of breaking the scrape
+        assert not any(line.startswith("test_broken") for line in text.splitlines())
+
+    def test_label_values_are_escaped(self, registry):
+        """Test that quotes in label values don't break the output"""
+        registry.inc("errors_total", reason='bad "quote"')
+        assert 'test_errors_total{reason="bad \\"quote\\""} 1.0' in registry.render()
@@ -0,0 +1,458 @@
+import json
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from pymilvus import DataType
+from pymilvus.client.types import LoadState
+from agent import index_profiles
+from agent.index_profiles import (
+    LITE_AUTO_INDEX_TYPES,
+    LITE_INDEX_TYPES,
+    build_index_params,
+    build_search_params,
+    choose_index_type,
+    needs_rebuild,
+    pq_segments,
+)
+from agent.milvus_client import MilvusClient, MilvusServerClient, _fold_accents
+from agent.models import Restaurant, RestaurantType
+
+
+class TestMilvusClientFilters:
+    """Test suite for MilvusClient filter expressions"""
+
+    @pytest.fixture
+    def client(self):
+        """Create a MilvusClient with a mocked encoder (no database connection is opened)"""
+        return MilvusClient(encoder=Mock())
+
+    def test_exact_location_filter(self, client):
+        """Test that known municipalities use an exact match"""
+        assert client._build_location_filter("Puente Alto", True) == 'municipality == "Puente Alto"'
+
+    def test_exact_location_list_filter(self, client):
+        """Test that several municipalities use an in match"""
+        expr = client._build_location_filter(["Santiago Centro", "Santiago"], True)
+        assert expr == 'municipality in ["Santiago Centro", "Santiago"]'
+
+    def test_unknown_location_falls_back_to_like(self, client):
+        """Test that unknown locations use a substring match"""
+        assert client._build_location_filter("Mall Plaza Norte", False) == 'municipality like "%Mall Plaza Norte%"'
+
+    def test_location_quotes_are_escaped(self, client):
+        """Test that user text can't close the string literal"""
+        expr = client._build_location_filter('Ñuñoa" or municipality != "', True)
+        assert expr == 'municipality == "Ñuñoa\\" or municipality != \\""'
+
+    def test_min_score_filter(self, client):
+        """Test that the score threshold is combined with the location filter"""
+        assert client._build_filter(None, False, 4) == "score >= 4.0"
+        assert client._build_filter(["Ñuñoa", "Santiago"], False, 4.5) == (
+            '(municipality like "%Ñuñoa%" or municipality like "%Santiago%") and (score >= 4.5)'
+        )
+        assert client._build_filter(None, False, None) == ""
+
+
+class TestMilvusClientBatchSearch:
+    """Test suite for batched vector searches"""
+
+    @pytest.fixture
+    def client(self):
+        """Create a MilvusClient with mocked encoder and database, searching through Milvus"""
+        client = MilvusClient(encoder=Mock(), numpy_search_max_rows=0)
+        client.encoder.encode_queries.side_effect = lambda queries: [[float(len(q))] for q in queries]
+        client.client = Mock()
+        client.client.get_load_state.return_value = {"state": LoadState.Loaded}
+        client._index_info = {
+            name: {"index_type": "FLAT", "params": {}, "row_count": 10}
+            for name in ("Hamburguesas", "Pizzas")
+        }
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding", "type": DataType.FLOAT_VECTOR}]}
+        client.client.search.side_effect = lambda collection_name, data, **kwargs: [
+            [{"name": f"{collection_name} {vector[0]}", "street": "", "municipality": "", "full_address": "",
+              "score": 4.0, "type": collection_name}]
+            for vector in data
+        ]
+        return client
+
+    def test_batch_groups_searches_and_keeps_order(self, client):
+        """Test that requests with the same target share one multi-vector search"""
+        results = client.search_restaurants_batch([
+            {"query": "mcdonalds", "food_type": "Hamburguesas", "location": "Puente Alto", "exact_location": True},
+            {"query": "pizza hut", "food_type": "Pizzas"},
+            {"query": "burger king", "food_type": "Hamburguesas", "location": "Puente Alto", "exact_location": True},
+            {"query": "sin tipo"},
+        ])
+
+        assert [[r.name for r in hits] for hits in results] == [
+            ["Hamburguesas 9.0"], ["Pizzas 9.0"], ["Hamburguesas 11.0"], [],
+        ]
+        assert client.client.search.call_count == 2
+        assert client.encoder.encode_queries.call_count == 1
+
+    def test_batch_reuses_embedding_cache(self, client):
+        """Test that only uncached queries are sent to the encoder"""
+        client.search_restaurants("mcdonalds", food_type="Hamburguesas")
+        client.search_restaurants_batch([
+            {"query": "McDonalds", "food_type": "Hamburguesas"},
+            {"query": "pizza hut", "food_type": "Pizzas"},
+        ])
+        client.encoder.encode_queries.assert_called_with(["pizza hut"])
+
+
+class TestScoreRanking:
+    """Test suite for best/worst ranking in Milvus"""
+
+    @pytest.fixture
+    def client(self):
+        """Create a MilvusClient whose database holds seven scored rows"""
+        client = MilvusClient(encoder=Mock(), numpy_search_max_rows=0)
+        client.client = Mock()
+        client.client.get_load_state.return_value = {"state": LoadState.Loaded}
+        rows = [{"id": i, "score": score} for i, score in enumerate([3.0, 4.8, 2.1, 4.8, 3.9, 1.5, 4.0])]
+        iterator = Mock()
+        iterator.next.side_effect = [rows[:4], rows[4:], []]
+        client.client.query_iterator.return_value = iterator
+        client.client.get.side_effect = lambda collection_name, ids, output_fields: [
+            {"id": i, "name": f"Completos {i}", "street": "", "municipality": "Ñuñoa",
+             "full_address": "", "score": rows[i]["score"], "type": "Completos"}
+            for i in ids
+        ]
+        return client
+
+    def test_best_and_worst(self, client):
+        """Test that extremes come from every matching row and only they are fetched in full"""
+        best, worst = client.rank_restaurants("Completos", "Ñuñoa", exact_location=True, min_score=1.0)
+
+        assert [r.name for r in best] == ["Completos 1", "Completos 3", "Completos 6"]
+        assert [r.name for r in worst] == ["Completos 0", "Completos 2", "Completos 5"]
+        kwargs = client.client.query_iterator.call_args.kwargs
+        assert kwargs["output_fields"] == ["score"]
+        assert kwargs["filter"] == '(municipality == "Ñuñoa") and (score >= 1.0)'
+        assert sorted(client.client.get.call_args.kwargs["ids"]) == [0, 1, 2, 3, 5, 6]
+
+    def test_missing_food_type(self, client):
+        """Test that per-type collections need a food type"""
+        assert client.rank_restaurants(None) == ([], [])
+        client.client.query_iterator.assert_not_called()
+
+
+class TestHybridSearch:
+    """Test suite for BM25 + dense hybrid search"""
+
+    @pytest.fixture
+    def client(self):
+        """Create a hybrid MilvusClient with mocked encoder and database"""
+        client = MilvusClient(encoder=Mock(), hybrid_search=True)
+        client.encoder.encode_queries.side_effect = lambda queries: [[0.0] for _ in queries]
+        client.client = Mock()
+        client.client.get_load_state.return_value = {"state": LoadState.Loaded}
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding"}, {"name": "sparse_embedding"}]}
+        client._index_info["Completos"] = {"index_type": "FLAT", "params": {}, "row_count": 10}
+        client.client.hybrid_search.return_value = [[
+            {"name": "Dominó Fuente de Soda Ñuñoa", "street": "", "municipality": "Ñuñoa",
+             "full_address": "", "score": 4.2, "type": "Completos"}
+        ]]
+        return client
+
+    def test_fold_accents(self):
+        """Test that accented and unaccented brand names produce the same text"""
+        assert _fold_accents("Dominó Ñuñoa") == "Domino Nunoa"
+
+    def test_hybrid_search_request(self, client):
+        """Test that dense and BM25 requests share the filter and are fused in one call"""
+        results = client.search_restaurants("dominó ñuñoa", food_type="Completos", location="Ñuñoa", exact_location=True)
+
+        assert [r.name for r in results] == ["Dominó Fuente de Soda Ñuñoa"]
+        client.client.search.assert_not_called()
+        kwargs = client.client.hybrid_search.call_args.kwargs
+        dense, sparse = kwargs["reqs"]
+        assert dense.anns_field == "embedding"
+        assert sparse.anns_field == "sparse_embedding"
+        assert sparse.data == ["domino nunoa"]
+        assert dense.expr == sparse.expr == 'municipality == "Ñuñoa"'
+
+    def test_dense_only_collection(self, client):
+        """Test that collections created without the BM25 field fall back to dense search"""
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding"}]}
+        client.client.search.return_value = [[]]
+        client.search_restaurants("dominó", food_type="Completos")
+
+        client.client.hybrid_search.assert_not_called()
+        client.client.search.assert_called_once()
+
+
+class TestIndexProfiles:
+    """Test suite for index profile selection"""
+
+    def test_auto_profile_by_row_count(self):
+        """Test that the auto profile scales from FLAT to HNSW to IVF_FLAT"""
+        assert choose_index_type(300) == "FLAT"
+        assert choose_index_type(100_000) == "HNSW"
+        assert choose_index_type(5_000_000) == "IVF_FLAT"
+
+    def test_forced_profile(self):
+        """Test that explicit profiles ignore the row count"""
+        assert choose_index_type(300, "hnsw") == "HNSW"
+        with pytest.raises(ValueError):
+            choose_index_type(300, "annoy")
+
+    def test_ivf_params_follow_row_count(self):
+        """Test that nlist and nprobe are derived from the collection size"""
+        params = build_index_params("IVF_FLAT", 1_000_000)
+        assert params["nlist"] == 4000
+        search_params = build_search_params("IVF_FLAT", params, 1_000_000, limit=10)
+        assert search_params["params"]["nprobe"] == 125
+
+    def test_hnsw_ef_is_at_least_limit(self):
+        """Test that ef never drops below the number of requested results"""
+        search_params = build_search_params("HNSW", {"M": 16}, 100, limit=200)
+        assert search_params["params"]["ef"] == 200
+
+    def test_needs_rebuild(self):
+        """Test rebuild decisions when the data grows"""
+        # Legacy IVF index on a tiny collection should become FLAT
+        assert needs_rebuild("IVF_FLAT", {"nlist": 1024}, 51)
+        assert not needs_rebuild("FLAT", {}, 51)
+        # IVF index rebuilt only when nlist is off by the rebuild factor
+        assert not needs_rebuild("IVF_FLAT", {"nlist": 4000}, 1_200_000)
+        assert needs_rebuild("IVF_FLAT", {"nlist": 4000}, 10_000_000)
+
+    def test_quantized_profiles(self):
+        """Test that SQ8 and PQ share the IVF parameters and PQ segments divide the dimension"""
+        assert choose_index_type(300, "ivf_sq8") == "IVF_SQ8"
+        assert build_index_params("IVF_SQ8", 1_000_000) == {"nlist": 4000}
+        assert build_index_params("IVF_PQ", 1_000_000) == {"nlist": 4000, "m": 96, "nbits": 8}
+        assert build_index_params("IVF_PQ", 1_000, dimension=384)["m"] == 48
+        assert pq_segments(100) == 10
+        assert build_search_params("IVF_PQ", {"nlist": 4000}, 1_000_000, limit=10)["params"]["nprobe"] == 125
+        assert not needs_rebuild("IVF_SQ8", {"nlist": 4000}, 1_200_000, "ivf_sq8")
+        assert needs_rebuild("IVF_FLAT", {"nlist": 4000}, 1_200_000, "ivf_sq8")
+
+
+class TestVectorTypes:
+    """Test suite for float16 vector storage"""
+
+    def test_float16_needs_server(self):
+        """Test that Milvus Lite rejects float16 vectors and unknown types are rejected"""
+        with pytest.raises(ValueError, match="Milvus Lite"):
+            MilvusClient(encoder=Mock(), vector_type="float16")
+        with pytest.raises(ValueError, match="Unknown vector type"):
+            MilvusServerClient(encoder=Mock(), vector_type="int8")
+
+    def test_float16_search_vectors(self):
+        """Test that query vectors are cast to float16 for float16 collections"""
+        client = MilvusServerClient(encoder=Mock(), vector_type="float16", numpy_search_max_rows=0)
+        client.encoder.encode_queries.side_effect = lambda queries: [np.ones(4, dtype=np.float32) for _ in queries]
+        client.client = Mock()
+        client.client.get_load_state.return_value = {"state": LoadState.Loaded}
+        client._index_info["Pizzas"] = {"index_type": "IVF_SQ8", "params": {"nlist": 16}, "row_count": 100}
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding", "type": DataType.FLOAT16_VECTOR}]}
+        client.client.search.return_value = [[]]
+
+        client.search_restaurants("papa johns", food_type="Pizzas")
+        kwargs = client.client.search.call_args.kwargs
+        assert kwargs["data"][0].dtype == np.float16
+        assert kwargs["search_params"]["params"] == {"nprobe": 8}
+
+    def test_vector_type_per_collection(self):
+        """Test that an existing float32 collection doesn't turn new collections into float32 ones"""
+        client = MilvusServerClient(encoder=small_encoder(), vector_type="float16", numpy_search_max_rows=0)
+        client.client = Mock()
+        client.client.get_load_state.return_value = {"state": LoadState.Loaded}
+        client.client.has_collection.side_effect = lambda name: name == "Pizzas"
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding", "type": DataType.FLOAT_VECTOR}]}
+        client.client.search.return_value = [[]]
+
+        client._initialize_collection("Pizzas")
+        client._initialize_collection("Completos")
+        schema = client.client.create_collection.call_args.kwargs["schema"]
+        assert next(f for f in schema.fields if f.name == "embedding").dtype == DataType.FLOAT16_VECTOR
+        assert client.vector_type == "float16"
+
+        for name in ("Pizzas", "Completos"):
+            client._index_info[name] = {"index_type": "FLAT", "params": {}, "row_count": 10}
+        client.search_restaurants("papa johns", food_type="Pizzas")
+        assert client.client.search.call_args.kwargs["data"][0].dtype == np.float32
+        client.search_restaurants("dominó", food_type="Completos")
+        assert client.client.search.call_args.kwargs["data"][0].dtype == np.float16
+
+
+def small_encoder(dim=8):
+    """Mock encoder returning a deterministic low-dimensional vector per text"""
+    def encode(texts):
+        return [np.random.default_rng(list(text.encode("utf-8"))).standard_normal(dim).astype(np.float32) for text in texts]
+    encoder = Mock()
+    encoder.dim = dim
+    encoder.encode_documents.side_effect = encode
+    encoder.encode_queries.side_effect = encode
+    return encoder
+
+
+def write_catalog(path, names, municipality="Ñuñoa"):
+    path.write_text(json.dumps([
+        {"name": name, "address": f"Av. Irarrázaval {i}, {municipality}, Santiago", "score": 4.0}
+        for i, name in enumerate(names)
+    ]), encoding="utf-8")
+    return str(path)
+
+
+class TestLiteIndexRebuild:
+    """Test suite for index rebuilds on Milvus Lite"""
+
+    def test_lite_auto_profile_skips_unsupported_types(self):
+        """Test that Lite never picks HNSW and rejects forced indexes it can't build"""
+        assert choose_index_type(100_000, "auto", LITE_INDEX_TYPES) == "IVF_FLAT"
+        assert not needs_rebuild("IVF_FLAT", {"nlist": 1264}, 100_000, "auto", LITE_INDEX_TYPES)
+        with pytest.raises(ValueError, match="Milvus Lite"):
+            MilvusClient(encoder=Mock(), index_profile="hnsw")
+
+    def test_lite_auto_profile_stays_flat(self):
+        """Test that auto keeps Lite collections on FLAT, since Lite searches IVF indexes exactly"""
+        assert choose_index_type(5_000_000, "auto", LITE_AUTO_INDEX_TYPES) == "FLAT"
+        assert not needs_rebuild("FLAT", {}, 100_000, "auto", LITE_AUTO_INDEX_TYPES)
+        # Collections indexed by earlier versions go back to FLAT
+        assert needs_rebuild("IVF_FLAT", {"nlist": 1264}, 100_000, "auto", LITE_AUTO_INDEX_TYPES)
+
+    def test_auto_profile_skips_rebuild(self, tmp_path, monkeypatch):
+        """Test that growing past the FLAT threshold doesn't release and rebuild Lite collections"""
+        monkeypatch.setattr(index_profiles, "FLAT_MAX_ROWS", 20)
+        client = MilvusClient(db_path=str(tmp_path / "milvus.db"), encoder=small_encoder(), numpy_search_max_rows=0)
+        names = [f"Papa Johns {i}" for i in range(30)]
+        client.load_restaurant_data([(write_catalog(tmp_path / "pizzas.json", names), RestaurantType.PIZZAS)])
+
+        assert client._get_index_info("Pizzas")["index_type"] == "FLAT"
+        assert not client.rebuild_index_if_needed("Pizzas")
+        client.client.close()
+
+    def test_forced_rebuild_keeps_collection_searchable(self, tmp_path):
+        """Test that a forced IVF_FLAT profile builds an index Lite supports"""
+        client = MilvusClient(
+            db_path=str(tmp_path / "milvus.db"), encoder=small_encoder(), numpy_search_max_rows=0, index_profile="ivf_flat"
+        )
+        names = [f"Papa Johns {i}" for i in range(30)]
+        client.load_restaurant_data([(write_catalog(tmp_path / "pizzas.json", names), RestaurantType.PIZZAS)])
+
+        assert client._get_index_info("Pizzas")["index_type"] == "IVF_FLAT"
+        assert client.search_restaurants("Papa Johns 3", food_type="Pizzas", limit=3)
+        client.client.close()
+
+    def test_failed_build_restores_old_index(self):
+        """Test that the previous index is rebuilt when the new one can't be created"""
+        client = MilvusClient(encoder=Mock(), index_profile="ivf_flat")
+        client.client = Mock()
+        client._index_info["Pizzas"] = {"index_type": "FLAT", "params": {}, "row_count": 10}
+        client.client.get_collection_stats.return_value = {"row_count": 50_000}
+        client.client.create_index.side_effect = [RuntimeError("invalid index type"), None]
+        client.client.describe_index.return_value = {"index_type": "FLAT"}
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding"}]}
+
+        assert not client.rebuild_index_if_needed("Pizzas")
+        built = client.client.prepare_index_params.return_value.add_index.call_args_list
+        assert [call.kwargs["index_type"] for call in built] == ["IVF_FLAT", "FLAT"]
+        assert client._index_info["Pizzas"]["index_type"] == "FLAT"
+        client.client.load_collection.assert_called_once_with("Pizzas")
+
+    @pytest.mark.parametrize("index_info", [
+        {"index_type": "IVF_FLAT", "params": {"nlist": 16}, "row_count": 16},
+        None,
+    ], ids=["recorded-params", "unreported-params"])
+    def test_ivf_retunes_nlist_as_rows_grow(self, index_info):
+        """Test that IVF indexes are compared against their build params, not the current size"""
+        client = MilvusClient(encoder=Mock(), index_profile="ivf_flat")
+        client.client = Mock()
+        if index_info:
+            client._index_info["Pizzas"] = index_info
+        # Milvus Lite may not report the build params of an index
+        client.client.describe_index.return_value = {"index_type": "IVF_FLAT"}
+        client.client.get_collection_stats.return_value = {"row_count": 6060}
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding"}]}
+
+        assert client.rebuild_index_if_needed("Pizzas")
+        assert client._index_info["Pizzas"] == {"index_type": "IVF_FLAT", "params": {"nlist": 311}, "row_count": 6060}
+        search_params = build_search_params("IVF_FLAT", client._index_info["Pizzas"]["params"], 6060, limit=10)
+        assert search_params["params"]["nprobe"] == 9
+
+        client.client.create_index.reset_mock()
+        assert not client.rebuild_index_if_needed("Pizzas")
+        client.client.create_index.assert_not_called()
+
+
+class TestBatchedIngest:
+    """Test suite for chunked encoding and inserts during ingest"""
+
+    def test_inserts_and_encoder_calls_are_chunked(self):
+        """Test that rows are inserted in insert_batch_size batches, each encoded in encode_batch_size chunks"""
+        client = MilvusClient(encoder=small_encoder(), encode_batch_size=2, insert_batch_size=3)
+        client.client = Mock()
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding"}]}
+        client.client.insert.side_effect = lambda collection_name, data, partition_name: {"insert_count": len(data)}
+        restaurants = [
+            Restaurant(name=f"Papa Johns {i}", street="", municipality="Ñuñoa",
+                       full_address=f"Av. Irarrázaval {i}", score=4.0, type=RestaurantType.PIZZAS)
+            for i in range(7)
+        ]
+
+        assert client._insert_restaurants("Pizzas", restaurants) == 7
+        assert [len(call.kwargs["data"]) for call in client.client.insert.call_args_list] == [3, 3, 1]
+        assert [len(call.args[0]) for call in client.encoder.encode_documents.call_args_list] == [2, 1, 2, 1, 1]
+        assert client.data_version == 1
+
+
+class TestUnifiedCollection:
+    """Test suite for the unified collection with one partition per restaurant type, on Milvus Lite"""
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        """Load two restaurant types into one partitioned collection, searched through Milvus"""
+        client = MilvusClient(
+            db_path=str(tmp_path / "milvus.db"),
+            encoder=small_encoder(),
+            unified_collection=True,
+            numpy_search_max_rows=0,
+        )
+        client.load_restaurant_data([
+            (write_catalog(tmp_path / "pizzas.json", ["Papa Johns", "Telepizza", "Pizza Hut"]), RestaurantType.PIZZAS),
+            (write_catalog(tmp_path / "completos.json", ["Dominó", "Fuente Alemana"], "Santiago"), RestaurantType.COMPLETOS),
+        ])
+        yield client
+        client.client.close()
+
+    def test_rows_loaded_per_type(self, client, tmp_path):
+        """Test that every type is loaded into the one collection and counted on its own"""
+        assert client.client.list_collections() == ["Restaurants"]
+        assert client._row_count("Restaurants", "Pizzas") == 3
+        assert client._row_count("Restaurants", "Completos") == 2
+
+        # Types that already have rows are skipped on the next load
+        client.load_restaurant_data([
+            (write_catalog(tmp_path / "pizzas.json", ["Domino's"]), RestaurantType.PIZZAS),
+        ])
+        assert client._row_count("Restaurants") == 5
+
+    def test_typed_search_only_returns_its_partition(self, client):
+        """Test that a food type restricts the search to its partition"""
+        results = client.search_restaurants("Dominó Santiago", food_type="Pizzas", limit=10)
+        assert sorted(r.name for r in results) == ["Papa Johns", "Pizza Hut", "Telepizza"]
+        assert {r.type for r in results} == {RestaurantType.PIZZAS}
+
+    def test_untyped_search_covers_every_partition(self, client):
+        """Test that a search without a food type covers the whole collection"""
+        results = client.search_restaurants("Dominó Santiago", limit=10)
+        assert sorted(r.name for r in results) == ["Dominó", "Fuente Alemana", "Papa Johns", "Pizza Hut", "Telepizza"]
+        assert {r.type for r in results} == {RestaurantType.PIZZAS, RestaurantType.COMPLETOS}
+
+    def test_server_searches_partitions(self):
+        """Test that the server backend searches type partitions instead of filtering on the type"""
+        client = MilvusServerClient(encoder=small_encoder(), unified_collection=True, numpy_search_max_rows=0)
+        client.client = Mock()
+        client.client.get_load_state.return_value = {"state": LoadState.Loaded}
+        client._index_info["Restaurants"] = {"index_type": "FLAT", "params": {}, "row_count": 10}
+        client.client.describe_collection.return_value = {"fields": [{"name": "embedding", "type": DataType.FLOAT_VECTOR}]}
+        client.client.search.return_value = [[]]
+
+        client.search_restaurants("papa johns", food_type="Pizzas")
+        kwargs = client.client.search.call_args.kwargs
+        assert kwargs["partition_names"] == ["Pizzas"]
+        assert kwargs["filter"] is None
+        assert MilvusClient(encoder=Mock())._build_filter(None, False, 4, ["Pizzas"]) == '(type == "Pizzas") and (score >= 4.0)'
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from agent.models import Restaurant, RestaurantType
+from agent.numpy_search import NumpySearchEngine
+
+
+def make_restaurant(i, municipality, score, restaurant_type=RestaurantType.PIZZAS):
+    return Restaurant(
+        name=f"Pizza {i}",
+        street="Av. Irarrázaval 3400",
+        municipality=municipality,
+        full_address=f"Av. Irarrázaval 3400, {municipality}, Santiago",
+        score=score,
+        type=restaurant_type,
+    )
+
+
+class TestNumpySearchEngine:
+    """Test suite for the in-memory NumPy search engine"""
+
+    @pytest.fixture
+    def data(self):
+        rng = np.random.default_rng(0)
+        municipalities = ["Ñuñoa", "Santiago", "Puente Alto", "La Florida"]
+        restaurants = [
+            make_restaurant(
+                i, municipalities[i % 4], 1.0 + (i % 5),
+                RestaurantType.PIZZAS if i % 2 else RestaurantType.COMPLETOS,
+            )
+            for i in range(200)
+        ]
+        embeddings = rng.standard_normal((200, 16)).astype(np.float32)
+        return restaurants, embeddings, rng.standard_normal((3, 16)).astype(np.float32)
+
+    def brute_force(self, embeddings, query, rows, k):
+        distances = ((embeddings[rows] - query) ** 2).sum(axis=1)
+        return [rows[i] for i in np.argsort(distances)[:k]]
+
+    def test_matches_brute_force(self, data):
+        """Test that top-k equals an exact L2 ranking for each query"""
+        restaurants, embeddings, queries = data
+        engine = NumpySearchEngine(restaurants, embeddings)
+        results = engine.search(queries, limit=10)
+
+        for query, hits in zip(queries, results):
+            expected = self.brute_force(embeddings, query, np.arange(200), 10)
+            assert [r.name for r in hits] == [restaurants[i].name for i in expected]
+
+    def test_exact_location_mask(self, data):
+        """Test that the exact municipality filter matches the brute force over the filtered rows"""
+        restaurants, embeddings, queries = data
+        engine = NumpySearchEngine(restaurants, embeddings)
+        hits = engine.search(queries[:1], limit=5, location="Ñuñoa", exact_location=True)[0]
+
+        rows = np.array([i for i, r in enumerate(restaurants) if r.municipality == "Ñuñoa"])
+        assert [r.name for r in hits] == [restaurants[i].name for i in self.brute_force(embeddings, queries[0], rows, 5)]
+
+    def test_substring_location_and_type_masks(self, data):
+        """Test like-style location matching combined with type and score filters"""
+        restaurants, embeddings, queries = data
+        engine = NumpySearchEngine(restaurants, embeddings)
+        hits = engine.search(queries[:1], limit=50, location="Alto", types=["Completos"], min_score=3.0)[0]
+
+        assert hits
+        assert all(r.municipality == "Puente Alto" and r.type == RestaurantType.COMPLETOS and r.score >= 3.0 for r in hits)
+
+    def test_location_list(self, data):
+        """Test that a list of locations matches any of them"""
+        restaurants, embeddings, queries = data
+        engine = NumpySearchEngine(restaurants, embeddings)
+        hits = engine.search(queries[:1], limit=200, location=["Ñuñoa", "Santiago"], exact_location=True)[0]
+        assert {r.municipality for r in hits} == {"Ñuñoa", "Santiago"}
+        assert len(hits) == 100
+
+    def test_no_matches_and_small_collections(self, data):
+        """Test empty filters and limits larger than the collection"""
+        restaurants, embeddings, queries = data
+        engine = NumpySearchEngine(restaurants[:3], embeddings[:3])
+        assert engine.search(queries, limit=10, location="Maipú", exact_location=True) == [[], [], []]
+        assert len(engine.search(queries[:1], limit=10)[0]) == 3
+
+    def test_extremes(self, data):
+        """Test that best and worst cover the whole filtered set, best first"""
+        restaurants, embeddings, _ = data
+        engine = NumpySearchEngine(restaurants, embeddings)
+        best, worst = engine.extremes(3, location="Ñuñoa", exact_location=True, types=["Pizzas"])
+
+        scores = sorted((r.score for r in restaurants if r.municipality == "Ñuñoa" and r.type == RestaurantType.PIZZAS), reverse=True)
+        assert [r.score for r in best] == scores[:3]
+        assert [r.score for r in worst] == scores[-3:]
+        assert engine.extremes(3, location="Maipú", exact_location=True) == ([], [])
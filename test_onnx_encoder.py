@@ -0,0 +1,144 @@
+from unittest.mock import Mock
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+onnxruntime = pytest.importorskip("onnxruntime")
+from onnx import TensorProto, helper, numpy_helper
+from agent.onnx_encoder import OnnxEncoder, QuantizedOnnxEncoder, default_num_threads, quantize_model
+from agent.vector_store import InMemoryVectorStore
+
+VOCABULARY = ["[PAD]", "hamburguesas", "pizzas", "completos", "puente", "alto", "ñuñoa", "santiago", "mcdonald's"]
+
+
+class WordTokenizer:
+    """Whitespace tokenizer with the call signature of a transformers tokenizer"""
+
+    def __call__(self, texts, padding, truncation, max_length, return_token_type_ids, return_tensors):
+        ids = [[VOCABULARY.index(word) for word in text.lower().split()][:max_length] for text in texts]
+        length = max(len(row) for row in ids)
+        input_ids = np.array([row + [0] * (length - len(row)) for row in ids], dtype=np.int64)
+        return {
+            "input_ids": input_ids,
+            "attention_mask": (input_ids > 0).astype(np.int64),
+            "token_type_ids": np.zeros_like(input_ids),
+        }
+
+
+def write_model(path, dim=16):
+    """Token embedding lookup followed by a dense layer: the shape of a transformer's output"""
+    rng = np.random.default_rng(0)
+    nodes = [
+        helper.make_node("Gather", ["embeddings", "input_ids"], ["tokens"]),
+        helper.make_node("MatMul", ["tokens", "dense"], ["last_hidden_state"]),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "encoder",
+        [
+            helper.make_tensor_value_info(name, TensorProto.INT64, ["batch", "sequence"])
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", dim])],
+        [
+            numpy_helper.from_array(rng.standard_normal((len(VOCABULARY), dim)).astype(np.float32), "embeddings"),
+            numpy_helper.from_array(rng.standard_normal((dim, dim)).astype(np.float32), "dense"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    # Oldest IR version for opset 17, readable by every onnxruntime that supports the opset
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+class TestQuantizedOnnxEncoder:
+    """Test suite for the int8 ONNX encoder"""
+
+    @pytest.fixture
+    def encoders(self, tmp_path):
+        """Float and int8 encoders over the same tiny model"""
+        float_path = str(tmp_path / "model.onnx")
+        int8_path = str(tmp_path / "cache" / "model-int8.onnx")
+        write_model(float_path)
+        quantize_model(float_path, int8_path)
+        sessions = [onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"]) for path in (float_path, int8_path)]
+        return [QuantizedOnnxEncoder(session, WordTokenizer(), dim=16, batch_size=2) for session in sessions]
+
+    def test_int8_embeddings_close_to_float(self, encoders):
+        """Test that quantization keeps embeddings close to the float model"""
+        texts = ["hamburguesas puente alto", "pizzas ñuñoa", "completos santiago"]
+        full, quantized = (np.array(encoder.encode_documents(texts)) for encoder in encoders)
+
+        assert quantized.shape == (3, 16)
+        np.testing.assert_allclose(np.linalg.norm(quantized, axis=1), 1.0, rtol=1e-5)
+        assert np.all(np.sum(full * quantized, axis=1) > 0.99)
+
+    def test_batching_and_padding_do_not_change_embeddings(self, encoders):
+        """Test that a text gets the same embedding alone or padded in a batch"""
+        encoder = encoders[1]
+        alone = encoder.encode_queries(["pizzas"])[0]
+        batched = encoder.encode_queries(["mcdonald's puente alto", "pizzas", "completos"])
+        np.testing.assert_allclose(batched[1], alone, rtol=1e-5, atol=1e-6)
+        assert len(batched) == 3
+
+    def test_one_inference_per_chunk(self, tmp_path):
+        """Test that the float encoder runs the model once per batch, not once per text"""
+        path = str(tmp_path / "model.onnx")
+        write_model(path)
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        encoder = OnnxEncoder(session, WordTokenizer(), dim=16, batch_size=2)
+        encoder.session = Mock(wraps=session)
+
+        embeddings = encoder.encode_documents(["pizzas", "completos santiago", "hamburguesas puente alto"])
+        assert len(embeddings) == 3
+        assert [call.args[1]["input_ids"].shape[0] for call in encoder.session.run.call_args_list] == [2, 1]
+
+    def test_batched_queries_share_one_inference(self, tmp_path):
+        """Test that a vector store batch (as sent by /query/batch and the coalescer) runs the model once"""
+        path = str(tmp_path / "model.onnx")
+        write_model(path)
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        encoder = OnnxEncoder(session, WordTokenizer(), dim=16)
+        encoder.session = Mock(wraps=session)
+        store = InMemoryVectorStore(encoder=encoder)
+
+        embeddings = store._encode_queries(["pizzas ñuñoa", "completos santiago", "hamburguesas puente alto"])
+        assert len(embeddings) == 3
+        encoder.session.run.assert_called_once()
+
+    def test_thread_count(self, monkeypatch):
+        """Test that threads are split among the agent workers unless configured"""
+        monkeypatch.setenv("ONNX_NUM_THREADS", "3")
+        assert default_num_threads() == 3
+        monkeypatch.delenv("ONNX_NUM_THREADS")
+        monkeypatch.setenv("AGENT_MAX_CONCURRENCY", "10000")
+        assert default_num_threads() == 1
+
+    def test_sessions_made_fork_safe(self, tmp_path):
+        """Test that serve.py rebuilds multi-threaded sessions with one thread before forking"""
+        from serve import single_threaded_sessions
+
+        path = str(tmp_path / "model.onnx")
+        write_model(path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 2
+        encoder = QuantizedOnnxEncoder(onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"]), WordTokenizer(), dim=16, model_path=path)
+        expected = encoder.encode_queries(["pizzas ñuñoa"])[0]
+
+        single_threaded_sessions(encoder)
+        assert encoder.session.get_session_options().intra_op_num_threads == 1
+        np.testing.assert_allclose(encoder.encode_queries(["pizzas ñuñoa"])[0], expected, rtol=1e-5)
+
+    def test_session_without_model_path_kept(self, tmp_path):
+        """Test that a session with no known model file is left as it is"""
+        from serve import single_threaded_sessions
+
+        path = str(tmp_path / "model.onnx")
+        write_model(path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 2
+        session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        encoder = OnnxEncoder(session, WordTokenizer(), dim=16)
+
+        single_threaded_sessions(encoder)
+        assert encoder.session is session
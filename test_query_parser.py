@@ -216,5 +216,26 @@ class TestQueryParser:
             assert best_worst == False
 
 
+    def test_keywords_match_whole_words(self, parser):
+        """Test that keywords inside other words are not matched"""
+        assert parser._check_ranking_filter("stop malones") == False
+        query, food_type = parser._extract_food_type("incompletos")
+        assert food_type is None
+
+    def test_longest_keyword_wins(self, parser):
+        """Test that overlapping keywords match the longest form"""
+        query, food_type = parser._extract_food_type("hot dogs dominó")
+        assert food_type == RestaurantType.COMPLETOS
+        assert query == "dominó"
+
+    def test_recompile_after_adding_keywords(self, parser):
+        """Test that new keywords are matched after recompiling"""
+        parser.location_keywords['Vitacura'] = ['vitacura']
+        parser._compile_keywords()
+        new_query, food_type, location, best_worst = parser.parse_query("pizzas vitacura")
+        assert location == "Vitacura"
+        assert parser.is_known_location(location)
+
+
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
@@ -0,0 +1,189 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+from agent.metrics import REGISTRY
+from agent.models import Restaurant, RestaurantType
+from agent.restaurant_agent import RestaurantAgent
+
+
+def make_restaurant(name, score, municipality="Puente Alto"):
+    return Restaurant(
+        name=name,
+        street="Av. Concha y Toro 1149",
+        municipality=municipality,
+        full_address=f"Av. Concha y Toro 1149, {municipality}, Santiago",
+        score=score,
+        type=RestaurantType.HAMBURGUESAS,
+    )
+
+
+class TestRestaurantAgent:
+    """Test suite for RestaurantAgent with a mocked vector database"""
+
+    @pytest.fixture
+    def agent(self):
+        """Create a RestaurantAgent whose vector store is mocked"""
+        with patch("agent.restaurant_agent.vector_store_from_env") as mock_factory:
+            mock_client = mock_factory.return_value
+            mock_client.data_version = 1
+            mock_client.search_restaurants.return_value = [
+                make_restaurant("McDonald's Puente Alto", 4.1),
+                make_restaurant("Burger King Puente Alto", 4.3),
+            ]
+            mock_client.search_restaurants_batch.side_effect = lambda requests: [
+                [make_restaurant(f"{request['query']} {request['location']}", 4.0, request["location"])]
+                for request in requests
+            ]
+            yield RestaurantAgent(execution_mode="inline")
+
+    @pytest.mark.asyncio
+    async def test_process_query_sorts_by_score(self, agent):
+        """Test that results come back ordered by score"""
+        response = await agent.process_query("Hamburguesas en Puente Alto")
+        assert response["type"] == "response"
+        assert [r["score"] for r in response["restaurants"]] == [4.3, 4.1]
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_is_served_from_cache(self, agent):
+        """Test that an equivalent query skips the vector search"""
+        first = await agent.process_query("Hamburguesas en Puente Alto")
+        second = await agent.process_query("hamburguesas en puente alto")
+
+        assert first == second
+        assert agent.milvus_client.search_restaurants.call_count == 1
+        assert agent.response_cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_response_is_a_copy(self, agent):
+        """Test that mutating a returned response doesn't change the cache"""
+        first = await agent.process_query("Hamburguesas en Puente Alto")
+        first["restaurants"].clear()
+        second = await agent.process_query("Hamburguesas en Puente Alto")
+        assert len(second["restaurants"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_invalidated_on_data_reload(self, agent):
+        """Test that new data versions force a fresh search"""
+        await agent.process_query("Hamburguesas en Puente Alto")
+        agent.milvus_client.data_version += 1
+        await agent.process_query("Hamburguesas en Puente Alto")
+        assert agent.milvus_client.search_restaurants.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, agent):
+        """Test that failed searches are retried on the next query"""
+        agent.milvus_client.search_restaurants.side_effect = RuntimeError("Vector database search failed")
+        response = await agent.process_query("Hamburguesas en Puente Alto")
+        assert "error" in response["explanation"]
+        assert len(agent.response_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_process_queries_in_order(self, agent):
+        """Test that a batch is searched once and answered in query order"""
+        responses = await agent.process_queries([
+            "Hamburguesas en Puente Alto",
+            "Pizzas en Ñuñoa",
+            "hamburguesas en puente alto",
+        ])
+
+        assert [r["restaurants"][0]["municipality"] for r in responses] == ["Puente Alto", "Ñuñoa", "Puente Alto"]
+        # Equivalent queries are searched once
+        requests = agent.milvus_client.search_restaurants_batch.call_args[0][0]
+        assert agent.milvus_client.search_restaurants_batch.call_count == 1
+        assert [r["food_type"] for r in requests] == ["Hamburguesas", "Pizzas"]
+
+    @pytest.mark.asyncio
+    async def test_process_queries_uses_response_cache(self, agent):
+        """Test that batches share the response cache with single queries"""
+        await agent.process_query("Hamburguesas en Puente Alto")
+        responses = await agent.process_queries(["Hamburguesas en Puente Alto", "Pizzas en Ñuñoa"])
+
+        assert [r["score"] for r in responses[0]["restaurants"]] == [4.3, 4.1]
+        requests = agent.milvus_client.search_restaurants_batch.call_args[0][0]
+        assert [r["food_type"] for r in requests] == ["Pizzas"]
+
+    @pytest.mark.asyncio
+    async def test_process_queries_errors(self, agent):
+        """Test that a failed batch returns an error response for every query"""
+        agent.milvus_client.search_restaurants_batch.side_effect = RuntimeError("Vector database search failed")
+        responses = await agent.process_queries(["Hamburguesas en Puente Alto", "Pizzas en Ñuñoa"])
+        assert len(responses) == 2
+        assert all("error" in r["explanation"] for r in responses)
+
+    @pytest.mark.asyncio
+    async def test_stream_query_events(self, agent):
+        """Test that streaming yields the intent, the raw search results and the final response"""
+        events = [event async for event in agent.stream_query("Hamburguesas en Puente Alto")]
+
+        assert [(e["type"], e.get("stage")) for e in events] == [
+            ("partial", "parse_query"), ("partial", "search_restaurants"), ("response", None),
+        ]
+        assert events[0]["intent"] == {"food_type": "Hamburguesas", "location": "Puente Alto", "best_and_worst": False}
+        # Search results arrive before ranking, the final response is sorted
+        assert [r["score"] for r in events[1]["restaurants"]] == [4.1, 4.3]
+        assert events[2] == await agent.process_query("Hamburguesas en Puente Alto")
+        assert agent.milvus_client.search_restaurants.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_query_cached(self, agent):
+        """Test that a cached query streams the intent and the cached response"""
+        response = await agent.process_query("Hamburguesas en Puente Alto")
+        events = [event async for event in agent.stream_query("Hamburguesas en Puente Alto")]
+
+        assert [e["type"] for e in events] == ["partial", "response"]
+        assert events[1] == response
+        assert agent.milvus_client.search_restaurants.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_node_latencies_are_recorded(self, agent):
+        """Test that every workflow node is timed"""
+        before = {
+            node: REGISTRY.get_summary("node_seconds", node=node)["count"]
+            for node in ("parse_query", "search_restaurants", "filter_and_rank", "generate_response")
+        }
+        await agent.process_query("Hamburguesas en Puente Alto")
+        for node, count in before.items():
+            assert REGISTRY.get_summary("node_seconds", node=node)["count"] == count + 1
+
+    @pytest.mark.asyncio
+    async def test_score_ranking_mode(self, agent):
+        """Test that best/worst queries rank the whole comuna in the vector store instead of searching"""
+        agent.ranking_mode = "score"
+        agent.milvus_client.rank_restaurants.return_value = (
+            [make_restaurant("Mejor", 4.9), make_restaurant("Segundo", 4.5)],
+            [make_restaurant("Segundo", 4.5), make_restaurant("Peor", 1.2)],
+        )
+        response = await agent.process_query("las mejores y peores hamburguesas de Puente Alto")
+        batch = await agent.process_queries(["los mejores y peores hamburguesas en Puente Alto", "Pizzas en Ñuñoa"])
+
+        assert [r["name"] for r in response["restaurants"]] == ["Mejor", "Segundo", "Peor"]
+        assert [r["name"] for r in batch[0]["restaurants"]] == ["Mejor", "Segundo", "Peor"]
+        agent.milvus_client.search_restaurants.assert_not_called()
+        requests = agent.milvus_client.search_restaurants_batch.call_args[0][0]
+        assert [r["food_type"] for r in requests] == ["Pizzas"]
+        assert agent.milvus_client.rank_restaurants.call_args.kwargs["location"] == "Puente Alto"
+
+    def test_unknown_ranking_mode(self):
+        """Test that an unknown ranking mode is rejected"""
+        with pytest.raises(ValueError, match="Unknown ranking mode"):
+            RestaurantAgent(milvus_client=Mock(), ranking_mode="random")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_are_coalesced(self):
+        """Test that concurrent queries in threadpool mode share batched searches"""
+        with patch("agent.restaurant_agent.vector_store_from_env") as mock_factory:
+            mock_client = mock_factory.return_value
+            mock_client.data_version = 1
+            mock_client.search_restaurants_batch.side_effect = lambda requests: [
+                [make_restaurant(request["query"], 4.0, request["location"])] for request in requests
+            ]
+            agent = RestaurantAgent(max_concurrency=4, coalesce_window_ms=100)
+
+        queries = ["Hamburguesas en Puente Alto", "Pizzas en Ñuñoa", "Completos en La Florida", "Pizzas en Maipú"]
+        responses = await asyncio.gather(*(agent.process_query(query) for query in queries))
+        agent.search_coalescer.close()
+
+        assert [r["restaurants"][0]["municipality"] for r in responses] == ["Puente Alto", "Ñuñoa", "La Florida", "Maipú"]
+        mock_client.search_restaurants.assert_not_called()
+        assert mock_client.search_restaurants_batch.call_count < len(queries)
+        assert agent.get_stats()["search_coalescer"]["requests"] == len(queries)
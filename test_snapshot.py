@@ -0,0 +1,159 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+import numpy as np
+import pytest
+from agent.ingest import write_snapshot_from_catalogs
+from agent.models import RestaurantType
+from agent.snapshot import read_manifest, read_snapshot
+from agent.vector_store import InMemoryVectorStore, vector_store_from_env
+from test_vector_store import hash_encoder, write_catalog
+
+
+class TestSnapshot:
+    """Test suite for read-only vector snapshots"""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        """In-memory store with two restaurant types, the one an ingest process exports"""
+        store = InMemoryVectorStore(encoder=hash_encoder(), unified_collection=True)
+        store.load_restaurant_data([
+            (write_catalog(tmp_path / "pizzas.json", ["Papa Johns", "Telepizza"]), RestaurantType.PIZZAS),
+            (write_catalog(tmp_path / "completos.json", ["Dominó"], "Santiago"), RestaurantType.COMPLETOS),
+        ])
+        return store
+
+    def test_round_trip(self, source, tmp_path):
+        """Test that the snapshot store answers like the store that wrote it, from a read-only map"""
+        path = str(tmp_path / "snapshot")
+        source.export_snapshot(path)
+        store = InMemoryVectorStore(encoder=source.encoder, unified_collection=True, snapshot_path=path)
+
+        for query in ("Papa Johns Ñuñoa", "Dominó"):
+            assert store.search_restaurants(query, limit=2) == source.search_restaurants(query, limit=2)
+        assert store.rank_restaurants("Pizzas") == source.rank_restaurants("Pizzas")
+        _, matrix, _ = read_snapshot(path)
+        assert isinstance(matrix, np.memmap)
+        assert not store._engine.matrix.flags.writeable
+        assert store.get_stats()["snapshot"] == path
+
+    def test_read_only(self, source, tmp_path):
+        """Test that serving processes never write rows"""
+        path = str(tmp_path / "snapshot")
+        source.export_snapshot(path)
+        store = InMemoryVectorStore(encoder=hash_encoder(), snapshot_path=path)
+
+        store.load_restaurant_data()
+        store.encoder.encode_documents.assert_not_called()
+        with pytest.raises(RuntimeError, match="read-only"):
+            store.sync_restaurant_data()
+
+    def test_new_version_keeps_previous_files(self, source, tmp_path):
+        """Test that a new export bumps the version, keeps the previous files and removes older ones"""
+        path = str(tmp_path / "snapshot")
+        first = source.export_snapshot(path)
+        second = source.export_snapshot(path)
+        third = source.export_snapshot(path)
+
+        assert third["version"] == first["version"] + 2
+        kept = ["manifest.json", second["embeddings"], second["restaurants"], third["embeddings"], third["restaurants"]]
+        assert sorted(os.listdir(path)) == sorted(kept)
+        assert InMemoryVectorStore(encoder=hash_encoder(), snapshot_path=path).data_version == third["version"]
+
+    def test_reader_retries_removed_version(self, source, tmp_path, monkeypatch):
+        """Test that a reader whose manifest was replaced twice before it opened the files reads the new one"""
+        import agent.snapshot as snapshot
+
+        path = str(tmp_path / "snapshot")
+        stale = source.export_snapshot(path)
+        manifests = iter([stale])
+        source.export_snapshot(path)
+        source.export_snapshot(path)
+        monkeypatch.setattr(snapshot, "read_manifest", lambda p: next(manifests, None) or read_manifest(p))
+
+        _, _, manifest = read_snapshot(path)
+        assert manifest["version"] == stale["version"] + 2
+
+    def test_encoder_mismatch(self, source, tmp_path):
+        """Test that a snapshot embedded by another encoder is rejected"""
+        path = str(tmp_path / "snapshot")
+        source.export_snapshot(path)
+        with pytest.raises(ValueError, match="was embedded with default"):
+            InMemoryVectorStore(encoder=hash_encoder(), encoder_name="minilm", snapshot_path=path)
+
+    def test_missing_snapshot(self, tmp_path):
+        """Test that a missing snapshot points at the ingest command"""
+        with pytest.raises(RuntimeError, match="agent.ingest --snapshot"):
+            read_manifest(str(tmp_path))
+
+    def test_from_env(self, source, tmp_path, monkeypatch):
+        """Test that the memory backend serves VECTOR_STORE_SNAPSHOT with an injected encoder"""
+        path = str(tmp_path / "snapshot")
+        source.export_snapshot(path)
+        monkeypatch.setenv("VECTOR_STORE_BACKEND", "memory")
+        monkeypatch.setenv("VECTOR_STORE_SNAPSHOT", path)
+        store = vector_store_from_env(encoder=source.encoder)
+        assert store.read_only
+        assert store.get_stats()["rows"] == 3
+
+
+# Worker processes can't share a Mock, so the served encoder is rebuilt from the text bytes
+SERVER_SCRIPT = textwrap.dedent("""
+    import sys
+    import numpy as np
+    import serve
+    from agent.vector_store import InMemoryVectorStore
+
+    class HashEncoder:
+        def encode_queries(self, texts):
+            return [np.random.default_rng(list(t.encode("utf-8"))).standard_normal(768).astype(np.float32) for t in texts]
+        encode_documents = encode_queries
+
+    store = InMemoryVectorStore(encoder=HashEncoder(), snapshot_path=sys.argv[1])
+    serve.serve(serve.bind_socket("127.0.0.1", int(sys.argv[2])), store, workers=2, log_level="warning")
+""")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+class TestMultiProcessServing:
+    """Test suite for serve.py workers sharing one snapshot"""
+
+    def test_workers_serve_snapshot(self, tmp_path):
+        """Test that forked workers answer queries from the snapshot and stop on SIGTERM"""
+        path = str(tmp_path / "snapshot")
+        write_snapshot_from_catalogs(path, encoder=hash_encoder())
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+
+        server = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, path, str(port)], cwd=os.path.dirname(__file__))
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as response:
+                        if response.status == 200:
+                            break
+                except OSError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise
+                    time.sleep(0.2)
+
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/query/batch",
+                data=json.dumps({"messages": ["pizzas en Ñuñoa"] * 4}).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                responses = json.loads(response.read())["responses"]
+            assert all(r["restaurants"] for r in responses)
+            assert {r["municipality"] for r in responses[0]["restaurants"]} == {"Ñuñoa"}
+        finally:
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=30) == 0
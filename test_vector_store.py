@@ -0,0 +1,156 @@
+import json
+import threading
+from unittest.mock import Mock, patch
+import numpy as np
+import pytest
+from agent.milvus_client import MilvusClient, MilvusServerClient, _ConnectionPool
+from agent.models import RestaurantType
+from agent.vector_store import BaseVectorStore, InMemoryVectorStore, VectorStore, create_vector_store, vector_store_from_env
+
+
+def hash_encoder():
+    """Mock encoder returning a deterministic vector per text"""
+    def encode(texts):
+        return [np.random.default_rng(list(text.encode("utf-8"))).standard_normal(768).astype(np.float32) for text in texts]
+    encoder = Mock()
+    encoder.encode_documents.side_effect = encode
+    encoder.encode_queries.side_effect = encode
+    return encoder
+
+
+def write_catalog(path, names, municipality="Ñuñoa"):
+    path.write_text(json.dumps([
+        {"name": name, "address": f"Av. Irarrázaval 3400, {municipality}, Santiago", "score": 4.0}
+        for name in names
+    ]), encoding="utf-8")
+    return str(path)
+
+
+class TestInMemoryVectorStore:
+    """Test suite for the in-memory vector store backend"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = InMemoryVectorStore(encoder=hash_encoder())
+        store.load_restaurant_data([
+            (write_catalog(tmp_path / "pizzas.json", ["Papa Johns", "Telepizza"]), RestaurantType.PIZZAS),
+            (write_catalog(tmp_path / "completos.json", ["Dominó"], "Santiago"), RestaurantType.COMPLETOS),
+        ])
+        return store
+
+    def test_implements_protocol(self, store):
+        """Test that the backend satisfies the VectorStore protocol"""
+        assert isinstance(store, VectorStore)
+
+    def test_search_filters_type_and_location(self, store):
+        """Test that searches only return rows of the requested type and municipality"""
+        hits = store.search_restaurants("Papa Johns Ñuñoa", food_type="Pizzas", location="Ñuñoa", exact_location=True)
+        assert sorted(r.name for r in hits) == ["Papa Johns", "Telepizza"]
+        assert store.search_restaurants("Dominó", food_type="Pizzas", location="Santiago") == []
+
+    def test_search_without_type_needs_unified_collection(self, store):
+        """Test that a missing food type returns nothing, like the per-type Milvus collections"""
+        assert store.search_restaurants("Dominó") == []
+        store.unified_collection = True
+        assert len(store.search_restaurants("Dominó")) == 3
+        assert [r.name for r in store.search_restaurants("Dominó", location="Santiago")] == ["Dominó"]
+
+    def test_rank_restaurants(self, store):
+        """Test that best and worst are ranked by score within the food type"""
+        best, worst = store.rank_restaurants("Pizzas", count=1)
+        assert {r.type for r in best + worst} == {RestaurantType.PIZZAS}
+        assert store.rank_restaurants(None) == ([], [])
+
+    def test_sync_only_encodes_new_rows(self, store, tmp_path):
+        """Test that a sync reuses embeddings of unchanged restaurants and bumps the data version"""
+        version = store.data_version
+        store.encoder.encode_documents.reset_mock()
+        filename = write_catalog(tmp_path / "pizzas.json", ["Papa Johns", "Domino's"])
+
+        report = store.sync_restaurant_data([(filename, RestaurantType.PIZZAS)])
+
+        assert report["Pizzas"]["inserted"] == 1
+        assert report["Pizzas"]["deleted"] == 1
+        assert report["Pizzas"]["unchanged"] == 1
+        assert store.encoder.encode_documents.call_count == 1
+        assert store.data_version > version
+        assert store.get_stats()["rows"] == 3
+
+
+class TestVectorStoreFactory:
+    """Test suite for backend selection"""
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected"""
+        with pytest.raises(ValueError, match="Unknown vector store backend"):
+            create_vector_store("faiss", encoder=Mock())
+
+    def test_backends_by_name(self):
+        """Test that each name builds its backend without connecting"""
+        assert type(create_vector_store("lite", encoder=Mock())) is MilvusClient
+        assert type(create_vector_store("server", encoder=Mock(), uri="http://milvus:19530")) is MilvusServerClient
+        assert type(create_vector_store("memory", encoder=Mock())) is InMemoryVectorStore
+
+    def test_from_env(self, monkeypatch):
+        """Test that the environment selects the server backend and its pool size"""
+        monkeypatch.setenv("VECTOR_STORE_BACKEND", "server")
+        monkeypatch.setenv("MILVUS_URI", "http://milvus:19530")
+        monkeypatch.setenv("MILVUS_POOL_SIZE", "8")
+        with patch("agent.encoders.OnnxEncoder.from_pretrained"):
+            store = vector_store_from_env()
+        assert isinstance(store, MilvusServerClient)
+        assert store.uri == "http://milvus:19530"
+        assert store.pool_size == 8
+
+
+class TestConnectionPool:
+    """Test suite for the Milvus server connection pool"""
+
+    def test_calls_use_distinct_connections(self):
+        """Test that concurrent calls check out different clients and return them afterwards"""
+        clients = []
+        barrier = threading.Barrier(2)
+
+        def factory():
+            client = Mock()
+            client.search.side_effect = lambda: (barrier.wait(timeout=5), id(client))[1]
+            clients.append(client)
+            return client
+
+        pool = _ConnectionPool(factory, size=2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pool.search())) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == sorted(id(client) for client in clients)
+        assert pool.get_stats() == {"size": 2, "available": 2, "waits": 0}
+
+    def test_pooled_clients_use_their_own_connections(self):
+        """Test that every pooled server client gets its own connection alias"""
+        with patch("agent.milvus_client.pyMilvusClient") as client_class:
+            store = MilvusServerClient(encoder=hash_encoder(), uri="http://milvus:19530", pool_size=3)
+            store._initialize_client()
+        aliases = [call.kwargs["alias"] for call in client_class.call_args_list]
+        assert len(aliases) == 3
+        assert len(set(aliases)) == 3
+
+    def test_base_store_needs_search_and_ranking(self):
+        """Test that a backend can't be created without the search methods"""
+        class PartialStore(BaseVectorStore):
+            def search_restaurants_batch(self, requests):
+                return [[] for _ in requests]
+
+        with pytest.raises(TypeError, match="rank_restaurants"):
+            PartialStore(encoder=hash_encoder())
+
+    def test_connection_returned_on_error(self):
+        """Test that a failing call doesn't leak its connection"""
+        client = Mock()
+        client.insert.side_effect = RuntimeError("unavailable")
+        pool = _ConnectionPool(lambda: client, size=1)
+        with pytest.raises(RuntimeError):
+            pool.insert()
+        assert pool.get_stats()["available"] == 1
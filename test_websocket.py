@@ -1,5 +1,7 @@
 import pytest
+import asyncio
 import json
+import time
 from unittest.mock import Mock, patch, AsyncMock
 from fastapi.testclient import TestClient
 from main import app
@@ -342,6 +344,219 @@ class TestWebSocketEndpoint:
                 assert mock_agent.process_query.call_count == 3
 
 
+class TestAgentReadiness:
+    """Test suite for background agent startup and readiness"""
+
+    @pytest.fixture
+    def client(self):
+        """Create test client (lifespan doesn't run, so the agent never warms up)"""
+        return TestClient(app)
+
+    def test_ready_while_starting(self, client):
+        """Test that readiness reports 503 until the agent is built"""
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+    def test_ready_after_startup_failure(self, client):
+        """Test that a failed warm-up is reported by the readiness endpoint"""
+        with patch("main.startup_error", "Failed to connect to Milvus server"):
+            response = client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["status"] == "failed"
+
+    def test_ready_when_agent_loaded(self, client):
+        """Test that readiness reports 200 once the agent exists"""
+        with patch("main.restaurant_agent"):
+            response = client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["status"] == "ready"
+
+    def test_metrics_endpoint(self, client):
+        """Test that /metrics serves the Prometheus text format, even during warm-up"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "restaurant_agent_ready 0.0" in response.text
+
+    def test_query_rejected_until_ready(self, client):
+        """Test that queries are rejected with an error if warm-up doesn't finish in time"""
+        with patch("main.AGENT_READY_TIMEOUT", 0.1):
+            with client.websocket_connect("/ws") as websocket:
+                websocket.send_text(json.dumps({"type": "query", "message": "pizzas"}))
+                response_data = json.loads(websocket.receive_text())
+                assert response_data["type"] == "error"
+                assert "not ready" in response_data["message"]
+
+    def test_background_warm_up(self):
+        """Test that the app serves requests while the agent warms up in the background"""
+        mock_agent = Mock()
+        mock_agent.process_query = AsyncMock(return_value={"type": "response", "restaurants": [], "explanation": "ok"})
+
+        def slow_create_agent():
+            time.sleep(0.3)
+            return mock_agent
+
+        with patch("main.create_agent", side_effect=slow_create_agent), patch("main.restaurant_agent", None):
+            with TestClient(app) as client:
+                assert client.get("/ready").status_code == 503
+
+                with client.websocket_connect("/ws") as websocket:
+                    websocket.send_text(json.dumps({"type": "query", "message": "pizzas"}))
+                    response_data = json.loads(websocket.receive_text())
+                    assert response_data["explanation"] == "ok"
+
+                assert client.get("/ready").status_code == 200
+
+
+class TestBatchQueries:
+    """Test suite for batch queries over WebSocket and HTTP"""
+
+    @pytest.fixture
+    def client(self):
+        """Create test client"""
+        return TestClient(app)
+
+    @pytest.fixture
+    def mock_agent(self):
+        """Patch the agent with one that echoes each query in its explanation"""
+        with patch("main.restaurant_agent") as mock_agent:
+            mock_agent.process_queries = AsyncMock(side_effect=lambda queries: [
+                {"type": "response", "restaurants": [], "explanation": query} for query in queries
+            ])
+            yield mock_agent
+
+    def test_websocket_batch_query(self, client, mock_agent):
+        """Test that a batch_query message returns one response per query, in order"""
+        queries = ["Hamburguesas McDonald's en Puente Alto", "Pizzas en Ñuñoa"]
+        with client.websocket_connect("/ws") as websocket:
+            websocket.send_text(json.dumps({"type": "batch_query", "messages": queries}))
+            response_data = json.loads(websocket.receive_text())
+
+        assert response_data["type"] == "batch_response"
+        assert [r["explanation"] for r in response_data["responses"]] == queries
+        mock_agent.process_queries.assert_called_once_with(queries)
+
+    def test_websocket_batch_query_invalid_messages(self, client, mock_agent):
+        """Test that a batch without a list of strings is rejected"""
+        with client.websocket_connect("/ws") as websocket:
+            websocket.send_text(json.dumps({"type": "batch_query", "messages": "pizzas"}))
+            response_data = json.loads(websocket.receive_text())
+
+        assert response_data["type"] == "error"
+        mock_agent.process_queries.assert_not_called()
+
+    def test_websocket_batch_query_too_large(self, client, mock_agent):
+        """Test that batches over the limit are rejected"""
+        with patch("main.MAX_BATCH_QUERIES", 2):
+            with client.websocket_connect("/ws") as websocket:
+                websocket.send_text(json.dumps({"type": "batch_query", "messages": ["a", "b", "c"]}))
+                response_data = json.loads(websocket.receive_text())
+
+        assert response_data["type"] == "error"
+        assert "at most 2" in response_data["message"]
+
+    def test_http_batch_query(self, client, mock_agent):
+        """Test the REST bulk endpoint"""
+        queries = ["Completos en Santiago", "Pizzas en Ñuñoa"]
+        response = client.post("/query/batch", json={"messages": queries})
+
+        assert response.status_code == 200
+        assert [r["explanation"] for r in response.json()["responses"]] == queries
+
+    def test_http_batch_query_too_large(self, client, mock_agent):
+        """Test that the REST bulk endpoint enforces the batch limit"""
+        with patch("main.MAX_BATCH_QUERIES", 1):
+            response = client.post("/query/batch", json={"messages": ["a", "b"]})
+        assert response.status_code == 400
+
+    def test_http_batch_query_not_ready(self, client):
+        """Test that the REST bulk endpoint returns 503 during warm-up"""
+        with patch("main.AGENT_READY_TIMEOUT", 0.1):
+            response = client.post("/query/batch", json={"messages": ["pizzas"]})
+        assert response.status_code == 503
+
+
+class TestStreamingQueries:
+    """Test suite for streamed queries and cancellation over WebSocket"""
+
+    @pytest.fixture
+    def client(self):
+        """Create test client"""
+        return TestClient(app)
+
+    def test_streamed_query_events(self, client):
+        """Test that partial events are forwarded in order before the final response"""
+        events = [
+            {"type": "partial", "stage": "parse_query", "intent": {"food_type": "Pizzas", "location": "Ñuñoa", "best_and_worst": False}},
+            {"type": "partial", "stage": "search_restaurants", "restaurants": []},
+            {"type": "response", "restaurants": [], "explanation": "ok"},
+        ]
+
+        async def stream_query(user_message):
+            for event in events:
+                yield event
+
+        with patch("main.restaurant_agent") as mock_agent:
+            mock_agent.stream_query = stream_query
+            with client.websocket_connect("/ws") as websocket:
+                websocket.send_text(json.dumps({"type": "query", "message": "Pizzas en Ñuñoa", "stream": True}))
+                received = [json.loads(websocket.receive_text()) for _ in events]
+
+        assert received == events
+
+    def test_cancel_streamed_query(self, client):
+        """Test that a cancel message stops a streamed query"""
+        async def stream_query(user_message):
+            yield {"type": "partial", "stage": "parse_query", "intent": {}}
+            await asyncio.sleep(10)
+            yield {"type": "response", "restaurants": [], "explanation": "too late"}
+
+        with patch("main.restaurant_agent") as mock_agent:
+            mock_agent.stream_query = stream_query
+            mock_agent.process_query = AsyncMock(return_value={"type": "response", "restaurants": [], "explanation": "next"})
+            with client.websocket_connect("/ws") as websocket:
+                websocket.send_text(json.dumps({"type": "query", "message": "pizzas", "stream": True}))
+                assert json.loads(websocket.receive_text())["type"] == "partial"
+
+                websocket.send_text(json.dumps({"type": "cancel"}))
+                assert json.loads(websocket.receive_text()) == {"type": "cancelled", "stopped": True}
+
+                # The connection keeps serving queries after a cancel
+                websocket.send_text(json.dumps({"type": "query", "message": "pizzas"}))
+                assert json.loads(websocket.receive_text())["explanation"] == "next"
+
+    def test_cancel_without_streamed_query(self, client):
+        """Test that a cancel is acknowledged even when no streamed query is running"""
+        with patch("main.restaurant_agent") as mock_agent:
+            mock_agent.process_query = AsyncMock(return_value={"type": "response", "restaurants": [], "explanation": "done"})
+            with client.websocket_connect("/ws") as websocket:
+                websocket.send_text(json.dumps({"type": "cancel"}))
+                assert json.loads(websocket.receive_text()) == {"type": "cancelled", "stopped": False}
+
+                # Also after a query has already been answered
+                websocket.send_text(json.dumps({"type": "query", "message": "pizzas"}))
+                assert json.loads(websocket.receive_text())["explanation"] == "done"
+                websocket.send_text(json.dumps({"type": "cancel"}))
+                assert json.loads(websocket.receive_text()) == {"type": "cancelled", "stopped": False}
+
+    def test_query_waits_for_streamed_query(self, client):
+        """Test that a query sent during a stream is answered after the stream finishes"""
+        async def stream_query(user_message):
+            await asyncio.sleep(0.1)
+            yield {"type": "response", "restaurants": [], "explanation": "streamed"}
+
+        with patch("main.restaurant_agent") as mock_agent:
+            mock_agent.stream_query = stream_query
+            mock_agent.process_query = AsyncMock(return_value={"type": "response", "restaurants": [], "explanation": "plain"})
+            with client.websocket_connect("/ws") as websocket:
+                websocket.send_text(json.dumps({"type": "query", "message": "pizzas", "stream": True}))
+                websocket.send_text(json.dumps({"type": "query", "message": "pizzas"}))
+                explanations = [json.loads(websocket.receive_text())["explanation"] for _ in range(2)]
+
+        assert explanations == ["streamed", "plain"]
+
+
 class TestWebSocketIntegration:
     """Integration tests for WebSocket with real components (but mocked data)"""
 